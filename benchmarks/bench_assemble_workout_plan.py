@@ -0,0 +1,61 @@
+"""
+Benchmark: per-muscle DataFrame scans vs the catalog's muscle bitsets in assemble_workout_plan.
+
+Run from the repository root:
+    python benchmarks/bench_assemble_workout_plan.py
+"""
+import contextlib
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from exercise_catalog import ExerciseCatalog
+from workout_planner import (
+    assemble_plan_from_bits,
+    assemble_workout_plan,
+    generate_plan_split_simple,
+    query_candidates,
+    sample_position,
+)
+
+FITNESS_LEVEL = "intermediate"
+GOAL = "muscle gain"
+EQUIPMENT = ["Bodyweight", "Dumbbell", "Barbell", "Kettlebell", "Bench (Flat)"]
+
+
+def best_of(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    catalog = ExerciseCatalog("exercise.csv")
+    with contextlib.redirect_stdout(io.StringIO()):
+        bits = query_candidates(catalog, FITNESS_LEVEL, GOAL, EQUIPMENT)
+    rows = catalog.index.positions(bits)
+    # The scan path works on a plain frame with the CSV's columns, as before the catalog existed
+    frame = pd.read_csv(catalog.csv_path).iloc[rows].reset_index(drop=True)
+
+    print(f"{len(rows)} candidate exercises")
+    # "cold" clears the memoized sample positions before every call
+    print(f"{'days':>4} {'scan':>10} {'index cold':>11} {'index warm':>11} {'speedup':>8}")
+    for days in range(1, 8):
+        split_plan = generate_plan_split_simple(days)
+        with contextlib.redirect_stdout(io.StringIO()):
+            scan = lambda: assemble_workout_plan(frame, split_plan, GOAL, FITNESS_LEVEL)
+            index = lambda: assemble_plan_from_bits(catalog, bits, split_plan, GOAL, FITNESS_LEVEL)
+            cold = lambda: (sample_position.cache_clear(), index())
+            assert scan() == index()
+            t_scan = best_of(scan, 10)
+            t_cold = best_of(cold, 100)
+            t_index = best_of(index, 100)
+        print(f"{days:>4} {t_scan * 1e3:>8.2f}ms {t_cold * 1e3:>9.3f}ms {t_index * 1e3:>9.3f}ms "
+              f"{t_scan / t_cold:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
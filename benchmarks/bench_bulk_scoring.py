@@ -0,0 +1,58 @@
+"""
+Throughput benchmark: bulk CSV/NDJSON scoring vs scoring the same sessions one record
+at a time (the work one /predict_calories call does per row, without the HTTP).
+
+Run from the repository root:
+    python benchmarks/bench_bulk_scoring.py
+    python benchmarks/bench_bulk_scoring.py --repeat 20   # ~300k rows
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from bulk_scoring import read_chunks, score_stream
+from calorie_predictor import FEATURES, encode_gender, predict_records
+
+SOURCE_CSV = "calorie_burned/exercise.csv"
+
+
+def rate(fn, rows):
+    start = time.perf_counter()
+    fn()
+    return rows / (time.perf_counter() - start)
+
+
+def consume(data, fmt):
+    for _ in score_stream(read_chunks(io.BytesIO(data)), fmt):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk calorie scoring.")
+    parser.add_argument("--repeat", type=int, default=10, help="copies of the 15000-row dataset to score")
+    args = parser.parse_args()
+
+    df = pd.concat([pd.read_csv(SOURCE_CSV)] * args.repeat, ignore_index=True)
+    csv_data = df.to_csv(index=False).encode()
+    ndjson_data = "".join(json.dumps(record) + "\n" for record in df.to_dict("records")).encode()
+    X = np.column_stack([df["Gender"].map(encode_gender)] + [df[name] for name in FEATURES[1:]]).astype(np.float64)
+    single = X[:2000]
+
+    print(f"{len(df)} sessions ({len(csv_data) / 1e6:.1f} MB CSV, {len(ndjson_data) / 1e6:.1f} MB NDJSON)")
+    print(f"{'path':<24} {'records/s':>12}")
+    per_record = rate(lambda: [predict_records(row[None]) for row in single], len(single))
+    print(f"{'one record at a time':<24} {per_record:>12,.0f}")
+    print(f"{'bulk CSV':<24} {rate(lambda: consume(csv_data, 'csv'), len(df)):>12,.0f}")
+    print(f"{'bulk NDJSON':<24} {rate(lambda: consume(ndjson_data, 'ndjson'), len(df)):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
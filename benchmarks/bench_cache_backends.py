@@ -0,0 +1,182 @@
+"""
+Hit latency of the plan and calorie caches on every cache backend (cache_backends.py),
+the size and speed of the binary encodings (cache_codec.py) against JSON, and a
+stampede of concurrent misses with single-flight.
+
+Each backend is filled with real plans (every availability of a few fitness levels,
+goals and equipment sets) and calorie cells, then every hit is timed separately; the
+times include the encoding, key building and, for Redis, the round trip. The Redis
+backend runs against the FakeRedisServer of tests/fake_redis.py in a separate process
+unless --redis points at a real server; the fake's Python request handling adds to its
+latencies.
+
+Run from the repository root:
+    python benchmarks/bench_cache_backends.py
+    python benchmarks/bench_cache_backends.py --redis redis://127.0.0.1:6379/0
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from cache_backends import MemoryBackend, SingleFlight, open_backend
+from cache_codec import decode_plan, encode_plan
+from calorie_cache import CalorieCache
+from calorie_models import calorie_models
+from exercise_catalog import get_catalog
+from plan_cache import PlanCache, plan_key, plan_size
+from workout_planner import build_workout_plan
+
+SETUPS = [["Barbell", "Dumbbell", "Cable", "Bodyweight"], ["Dumbbell", "Bodyweight"], ["Bodyweight"]]
+
+
+def start_fake_redis():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "tests", "fake_redis.py"), "--port", str(port)],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    process.stdout.readline()
+    return process, f"redis://127.0.0.1:{port}/0"
+
+
+def latencies(fn, args, rounds=5):
+    """
+    Per-call times in microseconds of fn(*a) for every a in `args`, `rounds` times.
+    """
+    times = []
+    for _ in range(rounds):
+        for arg in args:
+            start = time.perf_counter_ns()
+            fn(*arg)
+            times.append((time.perf_counter_ns() - start) / 1000)
+    return np.array(times)
+
+
+def make_plans(catalog):
+    plans = {}
+    for fitness_level in ("beginner", "intermediate", "advanced"):
+        for goal in ("fat loss", "muscle gain", "strength"):
+            for equipment in SETUPS:
+                for availability in range(1, 8):
+                    key = plan_key(fitness_level, goal, availability, equipment, catalog.equipment_vocabulary)
+                    plans[key] = build_workout_plan(catalog, fitness_level, goal, availability, equipment)
+    return plans
+
+
+def make_cells(cache, rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.integers(0, 2, rows), rng.integers(18, 70, rows), rng.uniform(150, 200, rows),
+                         rng.uniform(50, 110, rows), rng.uniform(10, 150, rows), rng.uniform(80, 160, rows),
+                         rng.uniform(38, 41, rows)])
+    return [cache.cells(record) for record in X]
+
+
+def codecs(plans):
+    plan = max(plans.values(), key=len)
+    encoded_plan = encode_plan(plan)
+
+    def per_call(fn):
+        return min(timeit.repeat(fn, number=2000, repeat=5)) / 2000 * 1e6
+
+    print(f"{'encoding':<24} {'bytes':>7} {'encode':>10} {'decode':>10}")
+    for name, value, encoded, encode, decode in (
+            ("plan, JSON", plan, json.dumps(plan).encode(), lambda: json.dumps(plan).encode(),
+             lambda: json.loads(json.dumps(plan))),
+            ("plan, binary", plan, encoded_plan, lambda: encode_plan(plan), lambda: decode_plan(encoded_plan))):
+        print(f"{name:<24} {len(encoded):>7} {per_call(encode):>8.2f}us {per_call(decode):>8.2f}us")
+    if decode_plan(encoded_plan) != plan:
+        sys.exit("Round trip changed the value")
+
+
+def stampede(backend, threads=16, build_seconds=0.02):
+    """
+    Builds performed when `threads` callers miss one plan at the same time.
+    """
+    builds = []
+    cache = PlanCache(backend)
+    cache.flights = SingleFlight()
+    barrier = threading.Barrier(threads)
+    key = ("beginner", "strength", 3, ("dumbbell",))
+
+    def build():
+        builds.append(1)
+        time.sleep(build_seconds)
+        return {"Day 1 - Full Body": []}
+
+    def caller():
+        barrier.wait()
+        if cache.get(key, "stampede") is None:
+            cache.get_or_build(key, "stampede", build)
+
+    workers = [threading.Thread(target=caller) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(builds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hit latency of the cache backends.")
+    parser.add_argument("--redis", help="URL of a Redis server to use instead of a fake one")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    version = calorie_models.current().source_digest
+    plans = make_plans(catalog)
+    codecs(plans)
+
+    fake = None
+    if args.redis is None:
+        fake, args.redis = start_fake_redis()
+    tmp = tempfile.TemporaryDirectory()
+    urls = {"memory": "memory", "sqlite": f"sqlite:///{os.path.join(tmp.name, 'cache.db')}", "redis": args.redis}
+    try:
+        print(f"\n{len(plans)} plans, 500 calorie sessions; hits per call")
+        print(f"{'backend':<10} {'cache':<9} {'p50':>9} {'p90':>9} {'p99':>9} {'mean':>9} {'builds':>7}")
+        for name, url in urls.items():
+            plan_cache = PlanCache(open_backend(url, "bench_plans", max_entries=len(plans) * 2, sizeof=plan_size))
+            calorie_cache = CalorieCache(enabled=True, backend=open_backend(url, "bench_calories", max_entries=10 ** 6))
+            plan_cache.clear()
+            calorie_cache.clear()
+            for key, plan in plans.items():
+                plan_cache.put(key, plan, catalog.checksum)
+            sessions = make_cells(calorie_cache)
+            for cells in sessions:
+                calorie_cache.fill(cells, [100.0] * len(cells), [0.5] * len(cells), version)
+
+            plan_times = latencies(plan_cache.get, [(key, catalog.checksum) for key in plans], args.rounds)
+            calorie_times = latencies(calorie_cache.lookup, [(cells, version) for cells in sessions], args.rounds)
+            if plan_cache.stats()["misses"] or calorie_cache.stats()["misses"]:
+                sys.exit(f"{name}: misses while timing hits")
+            builds = stampede(open_backend(url, "bench_stampede", sizeof=plan_size))
+            for cache, times in (("plans", plan_times), ("calories", calorie_times)):
+                p50, p90, p99 = np.percentile(times, [50, 90, 99])
+                print(f"{name:<10} {cache:<9} {p50:>7.1f}us {p90:>7.1f}us {p99:>7.1f}us "
+                      f"{statistics.fmean(times):>7.1f}us {builds if cache == 'plans' else '':>7}")
+            plan_cache.clear()
+            calorie_cache.clear()
+        print("builds: plan builds when 16 threads miss one plan together (single-flight: 1)")
+    finally:
+        if fake is not None:
+            fake.terminate()
+            fake.wait()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Load test of the /predict_calories micro-batcher: requests per second and latency
+percentiles at low and high concurrency, with batching off and on.
+
+CPU_MAX_PENDING is raised (unless set) so that unbatched high-concurrency runs are
+queued like batched ones instead of being rejected with 429.
+
+Run from the repository root:
+    python benchmarks/bench_calorie_batching.py
+    python benchmarks/bench_calorie_batching.py --concurrency 1,16,128 --window-ms 1 --max-batch 128
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CPU_MAX_PENDING", "4096")
+
+import load
+from calorie_batcher import calorie_batcher
+
+
+async def run(concurrency_levels, requests):
+    results = []
+    async with load.open_client() as client:
+        for concurrency in concurrency_levels:
+            for enabled in (False, True):
+                calorie_batcher.enabled = enabled
+                batches, records = calorie_batcher.batches, calorie_batcher.records
+                summary = (await load.run_scenario(client, "calorie", concurrency, requests))["all"]
+                batched = calorie_batcher.batches - batches
+                mean_batch = (calorie_batcher.records - records) / batched if batched else 1.0
+                results.append((concurrency, enabled, summary, mean_batch))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /predict_calories with and without micro-batching.")
+    parser.add_argument("--concurrency", default="1,8,64", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run")
+    parser.add_argument("--window-ms", type=float, default=calorie_batcher.window * 1e3)
+    parser.add_argument("--max-batch", type=int, default=calorie_batcher.max_batch)
+    args = parser.parse_args()
+
+    calorie_batcher.window = args.window_ms / 1e3
+    calorie_batcher.max_batch = args.max_batch
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = asyncio.run(run(levels, args.requests))
+
+    print(f"window {args.window_ms}ms, max batch {args.max_batch}")
+    print(f"{'concurrency':>11} {'batching':>9} {'rps':>9} {'p50':>9} {'p99':>9} {'errors':>6} {'batch':>6}")
+    for concurrency, enabled, summary, mean_batch in results:
+        print(f"{concurrency:>11} {'on' if enabled else 'off':>9} {summary['rps']:>9.1f} {summary['p50_ms']:>7.2f}ms "
+              f"{summary['p99_ms']:>7.2f}ms {summary['errors']:>6} {mean_batch:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Latency benchmark: sklearn pipeline vs the compiled NumPy calorie kernel.
+
+Run from the repository root:
+    python benchmarks/bench_calorie_kernel.py
+"""
+import os
+import sys
+import timeit
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings("ignore")
+
+import numpy as np
+import pandas as pd
+
+from calorie_kernel import compile_pipeline, load_pipeline
+from calorie_predictor import FEATURES, encode_gender
+
+BATCH_SIZES = [1, 10, 100, 1000, 15000]
+
+
+def best_of(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    scaler, poly, model = load_pipeline()
+    kernel = compile_pipeline(scaler, poly, model)
+
+    df = pd.read_csv("calorie_burned/exercise.csv")
+    df["Gender"] = df["Gender"].map(encode_gender)
+    X_all = df[FEATURES].to_numpy(dtype=np.float64)
+
+    def sklearn_predict(X):
+        return model.predict(poly.transform(scaler.transform(pd.DataFrame(X, columns=FEATURES))))
+
+    print(f"{'rows':>6} {'sklearn':>12} {'kernel':>12} {'speedup':>8} {'max abs diff':>13}")
+    for n in BATCH_SIZES:
+        X = X_all[:n]
+        number = max(1, 2000 // n)
+        t_sk = best_of(lambda: sklearn_predict(X), number)
+        t_k = best_of(lambda: kernel.predict(X), number)
+        diff = np.max(np.abs(sklearn_predict(X) - kernel.predict(X)))
+        print(f"{n:>6} {t_sk * 1e6:>10.1f}us {t_k * 1e6:>10.1f}us {t_sk / t_k:>7.1f}x {diff:>13.2e}")
+
+
+if __name__ == "__main__":
+    main()
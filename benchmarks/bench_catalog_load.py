@@ -0,0 +1,49 @@
+"""
+Cold-start benchmark: parsing exercise.csv vs loading the columnar catalog artifact.
+
+Run from the repository root:
+    python benchmarks/bench_catalog_load.py
+"""
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from exercise_catalog import ARTIFACT_PATH, EXERCISE_CSV, ExerciseCatalog, build_artifact, read_artifact
+
+
+def best_of(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def parse_csv():
+    with open(EXERCISE_CSV, "rb") as f:
+        df = pd.read_csv(io.BytesIO(f.read()))
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def main():
+    build_artifact()
+    catalog = ExerciseCatalog()
+    artifact_bytes = sum(os.path.getsize(os.path.join(ARTIFACT_PATH, name)) for name in os.listdir(ARTIFACT_PATH))
+    print(f"exercise.csv: {os.path.getsize(EXERCISE_CSV)} bytes, artifact: {artifact_bytes} bytes")
+
+    rows = [
+        ("read_csv (30 columns)", lambda: parse_csv(), 20),
+        ("build artifact", lambda: build_artifact(), 10),
+        ("read artifact (mmap)", lambda: read_artifact(), 200),
+        ("ExerciseCatalog() from artifact", lambda: ExerciseCatalog(), 50),
+        ("materialize catalog.df", lambda: (setattr(catalog, "_df", None), catalog.df), 50),
+    ]
+    print(f"{'step':<34} {'time':>12}")
+    for name, fn, number in rows:
+        print(f"{name:<34} {best_of(fn, number) * 1e3:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Throughput of cohort planning (cohort.py) against the sequential baseline of one
+/workout_planner plus one /nutrition_plan computation per profile, with per-group
+timing.
+
+Cohorts are drawn like a coach's client list: a few equipment setups, mostly no
+injuries. Plan caches start cold in every run and the precomputed plan table is not
+used, so both paths plan every distinct key; both serialize their results to JSON
+(one response per profile, one NDJSON line per group). Pool start-up is not timed.
+
+Run from the repository root:
+    python benchmarks/bench_cohort.py
+    python benchmarks/bench_cohort.py --profiles 2000 --workers 4
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["PLAN_LOOKUP_PATH"] = os.devnull + ".absent"
+
+import numpy as np
+
+from cohort import encode_record, group_profiles, plan_cohort, plan_group
+from cpu_pool import CpuExecutor
+from exercise_catalog import get_catalog
+from nutrient import MACRO_TABLES, activity_level_for_training, get_macros_from_user_input
+from plan_cache import plan_cache
+from workout_planner import main as plan_workout_main, weekly_volume
+
+SETUPS = ["Barbell,Dumbbell,Cable,Bodyweight", "Dumbbell,Bodyweight", "Bodyweight", "Kettlebell,Bodyweight"]
+INJURIES = ["", "", "", "", "Shoulder", "Knee"]
+
+
+def make_cohort(n, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "client_id": f"client-{i}",
+        "age": rng.randint(18, 70),
+        "gender": rng.choice(["Male", "Female"]),
+        "height": round(rng.uniform(150, 200), 1),
+        "weight": round(rng.uniform(50, 110), 1),
+        "fitness_level": rng.choice(["beginner", "intermediate", "advanced"]),
+        "goal": rng.choice(["fat loss", "muscle gain", "strength", "endurance"]),
+        "availability": rng.randint(2, 6),
+        "equipment_str": rng.choice(SETUPS),
+        "injury_str": rng.choice(INJURIES),
+    } for i in range(n)]
+
+
+def sequential(profiles):
+    for profile in profiles:
+        request = SimpleNamespace(**{**profile, "fitness_level": MACRO_TABLES.canonical("fitness_level",
+                                                                                        profile["fitness_level"]),
+                                     "goal": MACRO_TABLES.canonical("goal", profile["goal"])})
+        plan = plan_workout_main(request)
+        nutrition = get_macros_from_user_input({
+            **{field: profile[field] for field in ("weight", "height", "age", "gender")},
+            "goal": request.goal, "fitness_level": request.fitness_level,
+            "activity_level": activity_level_for_training(weekly_volume(plan)["training_days"]),
+        })
+        json.dumps(plan)
+        json.dumps(nutrition)
+
+
+def grouped(profiles):
+    seconds = []
+    for group in group_profiles(profiles, get_catalog().equipment_vocabulary):
+        record = plan_group(group)
+        encode_record(record)
+        seconds.append(record["seconds"])
+    return seconds
+
+
+def pooled(profiles, workers):
+    executor = CpuExecutor("process", workers, timeout=600.0)
+    executor.start()
+    try:
+        start = time.perf_counter()
+        asyncio.run(plan_cohort(profiles, executor, io.StringIO()))
+        return time.perf_counter() - start
+    finally:
+        executor.shutdown()
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        plan_cache.clear()
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cohort planning with sequential per-profile planning.")
+    parser.add_argument("--profiles", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    profiles = make_cohort(args.profiles)
+    get_catalog()
+    group_seconds = np.array(grouped(profiles))
+
+    runs = [
+        ("sequential per profile", timed(sequential, profiles)),
+        ("grouped, in process", timed(grouped, profiles)),
+        (f"grouped, {args.workers} process workers", min(pooled(profiles, args.workers) for _ in range(3))),
+    ]
+    print(f"{len(profiles)} profiles in {len(group_seconds)} groups")
+    print(f"per group: p50 {np.percentile(group_seconds, 50) * 1e3:.2f}ms, "
+          f"p95 {np.percentile(group_seconds, 95) * 1e3:.2f}ms, max {group_seconds.max() * 1e3:.2f}ms")
+    print(f"{'':<30} {'time':>10} {'profiles/s':>11} {'speedup':>8}")
+    for name, seconds in runs:
+        print(f"{name:<30} {seconds * 1e3:>8.1f}ms {len(profiles) / seconds:>11.0f} {runs[0][1] / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark: row-wise vs vectorized filter_by_equipment on the shipped exercise.csv,
+and the catalog's equipment bitset query.
+
+Run from the repository root:
+    python benchmarks/bench_equipment_filter.py
+"""
+import contextlib
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from exercise_catalog import ExerciseCatalog
+from workout_planner import filter_by_equipment
+
+EQUIPMENT_LISTS = [
+    ["Bodyweight"],
+    ["Bodyweight", "Dumbbell"],
+    ["Dumbbell", "Barbell", "Bench (Flat)", "Kettlebell"],
+    ["Barbell", "Dumbbell", "Kettlebell", "Bodyweight", "Bench (Flat)", "Bench (Incline)", "Cable", "Pull Up Bar"],
+]
+
+
+def filter_by_equipment_rowwise(df, equipment_list):
+    """The original df.apply(axis=1) implementation, kept as the reference."""
+    avail = set(eq.strip().lower() for eq in equipment_list)
+
+    def equipment_ok(row):
+        primary = str(row.get('Primary Equipment ', '')).strip().lower()
+        secondary = str(row.get('Secondary Equipment', '')).strip().lower()
+        if primary not in avail:
+            return False
+        if secondary in ('', 'none', 'nan'):
+            return True
+        if secondary in avail:
+            return True
+        return False
+
+    mask = df.apply(equipment_ok, axis=1)
+    return df[mask].reset_index(drop=True)
+
+
+def best_of(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    raw = pd.read_csv("exercise.csv")
+    # The filters reset the index, so the catalog position travels as a column
+    raw["position"] = range(len(raw))
+    catalog = ExerciseCatalog("exercise.csv")
+
+    print(f"{'equipment':<40} {'rows':>5} {'row-wise':>11} {'vectorized':>11} {'bitset':>11} {'speedup':>8}")
+    for equipment in EQUIPMENT_LISTS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = filter_by_equipment_rowwise(raw, equipment)
+            vectorized = filter_by_equipment(raw, equipment)
+            indexed = lambda: catalog.index.positions(catalog.index.match(equipment=equipment))
+            assert expected["Exercise"].tolist() == vectorized["Exercise"].tolist()
+            assert expected["position"].tolist() == indexed().tolist()
+
+            t_row = best_of(lambda: filter_by_equipment_rowwise(raw, equipment), 3)
+            t_vec = best_of(lambda: filter_by_equipment(raw, equipment), 20)
+            t_cat = best_of(indexed, 200)
+
+        label = ",".join(equipment)
+        label = label if len(label) <= 40 else label[:37] + "..."
+        print(f"{label:<40} {len(expected):>5} {t_row * 1e3:>9.2f}ms {t_vec * 1e3:>9.2f}ms "
+              f"{t_cat * 1e3:>9.3f}ms {t_row / t_cat:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: the planner's candidate filters as chained DataFrame filters over the CSV vs
+one bitset query, plus multi-facet searches with injury exclusions.
+
+Run from the repository root:
+    python benchmarks/bench_exercise_query.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from exercise_catalog import get_catalog
+from workout_planner import candidate_bits, filter_by_difficulty, filter_by_equipment, primary_classification
+
+FITNESS_LEVEL = "intermediate"
+GOAL = "muscle gain"
+EQUIPMENT = ["Bodyweight", "Dumbbell", "Barbell", "Kettlebell", "Bench (Flat)"]
+SEARCHES = [
+    ("3 facets", {"difficulty": ["beginner", "intermediate"], "equipment": EQUIPMENT, "mechanics": ["compound"]}),
+    ("6 facets + injuries", {"difficulty": ["beginner", "intermediate"], "equipment": EQUIPMENT,
+                             "body_region": ["upper body"], "force_type": ["push", "pull"],
+                             "mechanics": ["compound"], "laterality": ["bilateral", "unilateral"],
+                             "exclude_injuries": ["shoulder", "lower back"]}),
+]
+
+
+def best_of(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def dataframe_chain(raw):
+    filtered = filter_by_difficulty(raw, FITNESS_LEVEL)
+    filtered = filter_by_equipment(filtered, EQUIPMENT)
+    return primary_classification(filtered, GOAL)["position"].to_numpy()
+
+
+def main():
+    catalog = get_catalog()
+    index = catalog.index
+    # The filters reset the index, so the catalog position travels as a column
+    raw = pd.read_csv(catalog.csv_path)
+    raw["position"] = np.arange(len(raw))
+    bitset = lambda: index.positions(candidate_bits(catalog, FITNESS_LEVEL, GOAL, EQUIPMENT))
+    assert np.array_equal(dataframe_chain(raw), bitset())
+
+    print(f"{len(catalog)} exercises, {index.words} words per bitset")
+    print(f"{'query':<40} {'matches':>8} {'time':>10}")
+    rows = [
+        ("planner filters, DataFrame chain", lambda: dataframe_chain(raw), 100),
+        ("planner filters, bitset query", bitset, 2000),
+        ("planner filters + injuries, bitset", lambda: index.positions(
+            candidate_bits(catalog, FITNESS_LEVEL, GOAL, EQUIPMENT, ["shoulder", "lower back"])), 2000),
+    ] + [(f"search: {name}", lambda constraints=constraints: index.positions(index.match(**constraints)), 2000)
+         for name, constraints in SEARCHES]
+    for name, fn, number in rows:
+        print(f"{name:<40} {len(fn()):>8} {best_of(fn, number) * 1e6:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
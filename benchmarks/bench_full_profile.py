@@ -0,0 +1,66 @@
+"""
+Benchmark: /predict_calories + /workout_planner + /nutrition_plan called one after
+another (as the client does today) vs a single /full_profile call, in-process through
+the ASGI app. The plan cache is cleared before every round so planning is not free
+(in the default thread mode; process workers keep their own caches).
+
+Run from the repository root:
+    python benchmarks/bench_full_profile.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from main import app, lifespan
+from plan_cache import plan_cache
+
+ROUNDS = 200
+
+PROFILE = {"age": 28, "gender": "female", "height": 168.0, "weight": 62.0, "fitness_level": "intermediate",
+           "goal": "muscle gain", "availability": 6, "equipment_str": "Bodyweight,Dumbbell,Barbell,Kettlebell"}
+SESSION = {"duration": 50.0, "heart_rate": 118.0, "body_temp": 40.2}
+
+
+async def separate(client):
+    await client.post("/predict_calories", json={
+        "Gender": PROFILE["gender"], "Age": PROFILE["age"], "Height": PROFILE["height"], "Weight": PROFILE["weight"],
+        "Duration": SESSION["duration"], "Heart_Rate": SESSION["heart_rate"], "Body_Temp": SESSION["body_temp"]})
+    await client.post("/workout_planner", json=PROFILE)
+    await client.post("/nutrition_plan", json={**PROFILE, "activity_level": "active"})
+
+
+async def combined(client):
+    response = await client.post("/full_profile", json={**PROFILE, **SESSION, "activity_level": "active"})
+    response.raise_for_status()
+
+
+async def measure(client, fn):
+    latencies = []
+    for _ in range(ROUNDS):
+        plan_cache.clear()
+        start = time.perf_counter()
+        await fn(client)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies), statistics.quantiles(latencies, n=100)[94]
+
+
+async def main():
+    async with lifespan(app), httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                                 base_url="http://bench") as client:
+        # Warm-up round for both paths
+        await separate(client)
+        await combined(client)
+        print(f"{'path':<10} {'p50':>9} {'p95':>9}")
+        for name, fn in (("separate", separate), ("combined", combined)):
+            p50, p95 = await measure(client, fn)
+            print(f"{name:<10} {p50 * 1e3:>7.2f}ms {p95 * 1e3:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""
+Benchmark: per-user get_macros_from_user_input vs the vectorized get_macros_batch.
+
+Run from the repository root:
+    python benchmarks/bench_nutrition_batch.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from nutrient import get_macros_batch, get_macros_from_user_input
+
+BATCH_SIZES = [100, 10000, 1000000]
+
+
+def random_users(n, rng):
+    return pd.DataFrame({
+        "weight": rng.uniform(40, 150, n).round(1),
+        "height": rng.uniform(145, 205, n).round(1),
+        "age": rng.integers(16, 80, n),
+        "gender": rng.choice(["male", "female"], n),
+        "activity_level": rng.choice(["sedentary", "light", "moderate", "active"], n),
+        "goal": rng.choice(["fat loss", "muscle gain", "strength", "endurance"], n),
+        "fitness_level": rng.choice(["beginner", "intermediate", "advanced"], n),
+    })
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'users':>8} {'scalar':>10} {'batch':>10} {'speedup':>8}")
+    for n in BATCH_SIZES:
+        users = random_users(n, rng)
+        records = users.to_dict("records")
+        expected, t_scalar = timed(lambda: [get_macros_from_user_input(r) for r in records])
+        columns, t_batch = timed(lambda: get_macros_batch(users))
+        rows = pd.DataFrame(columns).to_dict("records")
+        assert rows == expected
+        print(f"{n:>8} {t_scalar * 1e3:>8.1f}ms {t_batch * 1e3:>8.1f}ms {t_scalar / t_batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
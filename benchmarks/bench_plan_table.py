@@ -0,0 +1,88 @@
+"""
+Benchmark: the memory-mapped plan table vs the JSON lookup file it replaced and live
+planning - size on disk, lookup latency, and the private memory a worker pays for
+serving every key.
+
+Run from the repository root:
+    python benchmarks/bench_plan_table.py
+    python benchmarks/bench_plan_table.py --top-equipment 10
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exercise_catalog import get_catalog
+from plan_cache import key_string
+from plan_table import PlanTable, write_table
+from precompute_plans import precompute
+from workout_planner import build_workout_plan
+
+
+def memory():
+    """
+    (private, shared) resident bytes of this process; mapped file pages count as shared.
+    """
+    with open("/proc/self/statm") as f:
+        _, resident, shared = (int(value) for value in f.read().split()[:3])
+    page = os.sysconf("SC_PAGE_SIZE")
+    return (resident - shared) * page, shared * page
+
+
+def best_of(fn, number=2000):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the plan table with the JSON lookup and live planning.")
+    parser.add_argument("--top-equipment", type=int, default=8)
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    counts = sorted(catalog.by_primary_equipment.items(), key=lambda item: -len(item[1]))
+    equipment = [name for name, _ in counts[:args.top_equipment]]
+    plans = precompute(catalog, equipment)
+    keys = list(plans)
+    sample = random.Random(0).sample(keys, min(len(keys), 1000))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table_path, json_path = os.path.join(tmp, "plan_table.bin"), os.path.join(tmp, "plan_lookup.json")
+        _, distinct, table_size = write_table(table_path, plans, catalog.checksum, equipment)
+        with open(json_path, "w") as f:
+            json.dump({"catalog_checksum": catalog.checksum, "plans": {key_string(key): plan
+                                                                       for key, plan in plans.items()}}, f)
+        json_size = os.path.getsize(json_path)
+        del plans
+
+        before = memory()
+        table = PlanTable(table_path)
+        for key in keys:
+            table.get(key, catalog.checksum)
+        table_private, table_shared = (now - then for now, then in zip(memory(), before))
+
+        before = memory()
+        with open(json_path) as f:
+            lookup = json.load(f)["plans"]
+        json_private, _ = (now - then for now, then in zip(memory(), before))
+
+    print(f"{len(keys)} keys, {distinct} distinct plans over {len(equipment)} equipment values")
+    print(f"{'':<22} {'file':>9} {'private':>9} {'shared':>9} {'lookup':>10}")
+    lookups = iter(sample * 1000)
+    table_time = best_of(lambda: table.get(next(lookups), catalog.checksum))
+    json_time = best_of(lambda: lookup.get(key_string(next(lookups))))
+    live_time = best_of(lambda: build_workout_plan(catalog, *(lambda k: (k[0], k[1], k[2], k[3]))(next(lookups))),
+                        number=200)
+    print(f"{'plan table (mmap)':<22} {table_size / 1e6:>7.1f}MB {table_private / 1e6:>7.1f}MB "
+          f"{table_shared / 1e6:>7.1f}MB {table_time * 1e6:>8.1f}us")
+    print(f"{'JSON lookup (loaded)':<22} {json_size / 1e6:>7.1f}MB {json_private / 1e6:>7.1f}MB "
+          f"{0:>7.1f}MB {json_time * 1e6:>8.1f}us")
+    print(f"{'live planning':<22} {'':>9} {'':>9} {'':>9} {live_time * 1e6:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Startup cost of the service: `import main` time, the time to the first successful
+response of each endpoint in a fresh process without warm-up (what a cold worker's
+first caller waits for), and the time until /readyz turns 200 with the warm-up on.
+Every measurement runs in a new interpreter; the median of --repeat runs is reported.
+
+--check turns it into a regression test: it exits non-zero when `import main` loads a
+heavy module, when the first /nutrition_plan or /healthz call loads NumPy or pandas, or
+when any time exceeds its threshold in THRESHOLDS (times --scale, for slower machines).
+tests/test_startup.py runs the same checks under pytest (STARTUP_SCALE=2 for --scale 2).
+
+Run from the repository root:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --check --scale 2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules `import main` must leave to the subsystems that need them (see readiness.py)
+HEAVY_MODULES = ["pandas", "numpy", "sklearn", "joblib", "exercise_catalog", "calorie_kernel", "workout_planner"]
+# Endpoints whose first call must not load NumPy or pandas either
+LIGHT_ENDPOINTS = {"/healthz", "/nutrition_plan"}
+
+PROFILE = {"age": 30, "gender": "Male", "height": 180, "weight": 80, "fitness_level": "Beginner", "goal": "fat loss"}
+SESSION = {"Gender": "male", "Age": 30, "Height": 180, "Weight": 80, "Duration": 30, "Heart_Rate": 100, "Body_Temp": 39}
+ENDPOINTS = {
+    "/healthz": ("get", None),
+    "/nutrition_plan": ("post", {**PROFILE, "activity_level": "moderate"}),
+    "/predict_calories": ("post", SESSION),
+    "/workout_planner": ("post", {**PROFILE, "availability": 4, "equipment_str": "Dumbbell,Bodyweight"}),
+    "/full_profile": ("post", {**PROFILE, "availability": 4, "equipment_str": "Dumbbell,Bodyweight", "duration": 30,
+                               "heart_rate": 100, "body_temp": 39}),
+    "/exercises/search?q=press": ("get", None),
+}
+
+# Seconds, on a single core of the reference machine; several times the measured values
+THRESHOLDS = {
+    "import": 1.5,
+    "ready": 4.0,
+    "/healthz": 0.1,
+    "/nutrition_plan": 0.1,
+    "/predict_calories": 2.0,
+    "/workout_planner": 2.0,
+    "/full_profile": 2.5,
+    "/exercises/search?q=press": 2.0,
+}
+
+
+def child(target):
+    """
+    Measure one target in this (fresh) process and print the result as JSON.
+    """
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    result = {"import": imported - start, "heavy": [name for name in HEAVY_MODULES if name in sys.modules]}
+
+    from fastapi.testclient import TestClient
+
+    with TestClient(main.app) as client:
+        begin = time.perf_counter()
+        if target == "ready":
+            while client.get("/readyz").status_code != 200:
+                time.sleep(0.01)
+        else:
+            method, body = ENDPOINTS[target]
+            response = client.request(method.upper(), target, json=body)
+            if response.status_code != 200:
+                raise SystemExit(f"{target} answered {response.status_code}: {response.text}")
+        result["seconds"] = time.perf_counter() - begin
+        result["heavy_after"] = [name for name in ("numpy", "pandas") if name in sys.modules]
+    print(json.dumps(result))
+
+
+def measure(target, repeat):
+    env = {**os.environ, "MODEL_WARMUP": "1" if target == "ready" else "0"}
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", target], env=env, cwd=ROOT,
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            raise SystemExit(f"{target}: {out.stderr.strip() or out.stdout.strip()}")
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "import": statistics.median(run["import"] for run in runs),
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "heavy": runs[-1]["heavy"],
+        "heavy_after": runs[-1]["heavy_after"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and first-response times of the service.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", action="store_true", help="exit 1 when a threshold is exceeded")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every threshold")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child)
+
+    results = {target: measure(target, args.repeat) for target in list(ENDPOINTS) + ["ready"]}
+    failures = []
+    imports = [result["import"] for result in results.values()]
+    import_seconds = statistics.median(imports)
+    heavy = results["ready"]["heavy"]
+    print(f"import main: {import_seconds * 1e3:.0f}ms, heavy modules loaded: {', '.join(heavy) or 'none'}")
+    if heavy:
+        failures.append(f"import main loads {', '.join(heavy)}")
+    if import_seconds > THRESHOLDS["import"] * args.scale:
+        failures.append(f"import main took {import_seconds:.3f}s")
+
+    print(f"{'first response (cold, no warm-up)':<36} {'time':>9} {'limit':>9}  loaded")
+    for target, result in results.items():
+        name = "time to ready (warm-up)" if target == "ready" else target
+        limit = THRESHOLDS[target] * args.scale
+        print(f"{name:<36} {result['seconds'] * 1e3:>7.0f}ms {limit * 1e3:>7.0f}ms  "
+              f"{', '.join(result['heavy_after']) or '-'}")
+        if result["seconds"] > limit:
+            failures.append(f"{name} took {result['seconds']:.3f}s (limit {limit:.3f}s)")
+        if target in LIGHT_ENDPOINTS and result["heavy_after"]:
+            failures.append(f"{target} loads {', '.join(result['heavy_after'])}")
+
+    if args.check:
+        if failures:
+            sys.exit("FAILED: " + "; ".join(failures))
+        print("OK")
+
+
+if __name__ == "__main__":
+    main()
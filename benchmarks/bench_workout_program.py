@@ -0,0 +1,58 @@
+"""
+Cost of periodized programs by length, and of WorkoutProgram.update() vs rebuilding
+the program after one parameter changes.
+
+Run from the repository root:
+    python benchmarks/bench_workout_program.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exercise_catalog import get_catalog
+from workout_planner import build_workout_plan
+from workout_program import WorkoutProgram
+
+PROFILE = ("intermediate", "muscle gain")
+EQUIPMENT = ["Barbell", "Dumbbell", "Bodyweight"]
+
+
+def best_of(fn, number=50):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    catalog = get_catalog()
+    build = lambda days, weeks, equipment=EQUIPMENT: WorkoutProgram(catalog, *PROFILE, days, equipment, weeks).plan()
+
+    print(f"{'program (5 days)':<36} {'time':>10}")
+    single = best_of(lambda: build_workout_plan(catalog, *PROFILE, 5, EQUIPMENT))
+    print(f"{'single-week plan (/workout_planner)':<36} {single * 1e3:>8.3f}ms")
+    for weeks in (1, 4, 12, 52):
+        print(f"{f'{weeks}-week program':<36} {best_of(lambda: build(5, weeks)) * 1e3:>8.3f}ms")
+
+    base = WorkoutProgram(catalog, *PROFILE, 5, EQUIPMENT, 12)
+    base.plan()
+    changes = [
+        ("add a day (5 -> 6)", {"availability": 6}),
+        # EZ Bar only adds candidates for the arm muscles; Kettlebell adds some for every muscle
+        ("add equipment (EZ Bar)", {"equipment_available": EQUIPMENT + ["EZ Bar"]}),
+        ("add equipment (Kettlebell)", {"equipment_available": EQUIPMENT + ["Kettlebell"]}),
+        ("extend to 16 weeks", {"weeks": 16}),
+    ]
+    print(f"\n{'change to a 12-week program':<30} {'rebuild':>10} {'update':>10} {'days rebuilt':>14}")
+    for name, change in changes:
+        args = {"availability": 5, "equipment_available": EQUIPMENT, "weeks": 12, **change}
+        rebuild = best_of(lambda: build(args["availability"], args["weeks"], args["equipment_available"]))
+        update = best_of(lambda: base.update(**change).plan())
+        program = base.update(**change)
+        program.plan()
+        total = program.weeks * len(program.split)
+        print(f"{name:<30} {rebuild * 1e3:>8.3f}ms {update * 1e3:>8.3f}ms "
+              f"{program.stats['days_built']:>6} of {total:<5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: per-request cost of the /workout_planner response path, before and after
+returning the plan dict and serializing it once through the WorkoutPlan response model.
+
+"legacy" replays what the handler used to do around the plan: print the request, the
+equipment list, the plan and its indented JSON, then json.loads it back and render a
+JSONResponse. Printing goes to an in-memory buffer, so the figures understate the
+legacy cost under a real terminal or log collector.
+
+Run from the repository root:
+    python benchmarks/bench_workout_response.py
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from main import WorkoutPlan
+from plan_cache import plan_cache
+from workout_planner import main as plan_workout
+
+EQUIPMENT = "Bodyweight, Dumbbell, Barbell, Kettlebell, Bench (Flat), Cable, Resistance Band"
+
+
+def legacy(request):
+    with contextlib.redirect_stdout(io.StringIO()):
+        print("Received Request:", request)
+        print([eq.strip() for eq in request.equipment_str.split(',') if eq.strip()])
+        workout_plan = plan_workout(request)
+        print("\nFinal Workout Plan (Day-by-day):")
+        print(workout_plan)
+        workout_json = json.dumps(workout_plan, indent=4)
+        print("\nWorkout Plan in JSON format:")
+        print(workout_json)
+    return JSONResponse(content=json.loads(workout_json)).body
+
+
+def structured(request, adapter=TypeAdapter(WorkoutPlan)):
+    # What FastAPI does with a response_model: validate, then serialize to JSON bytes
+    return adapter.dump_json(adapter.validate_python(plan_workout(request)))
+
+
+def main():
+    print(f"{'days':>4} {'plan cache':>10} {'bytes':>6} {'legacy':>10} {'structured':>11} {'speedup':>8}")
+    for days in range(1, 8):
+        request = SimpleNamespace(fitness_level="intermediate", goal="muscle gain", availability=days,
+                                  equipment_str=EQUIPMENT, age=25, gender="Male", height=175, weight=70)
+        assert json.loads(legacy(request)) == json.loads(structured(request))
+        size = len(structured(request))
+        for warm in (False, True):
+            # A miss clears the plan cache first, so the plan is rebuilt on every call
+            prepare, number = ("", 200) if warm else ("plan_cache.clear();", 20)
+            timer = lambda fn: min(timeit.repeat(f"{prepare}fn(request)", number=number, repeat=5,
+                                                 globals={**globals(), "fn": fn, "request": request})) / number
+            t_legacy = timer(legacy)
+            t_structured = timer(structured)
+            print(f"{days:>4} {'hit' if warm else 'miss':>10} {size:>6} {t_legacy * 1e6:>8.1f}us "
+                  f"{t_structured * 1e6:>9.1f}us {t_legacy / t_structured:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
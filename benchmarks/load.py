@@ -0,0 +1,213 @@
+"""
+Load generator for the API: closed-loop workers sending a payload mix at a fixed
+concurrency, reporting p50/p95/p99 latency and requests per second per endpoint.
+
+Runs in-process against main.app through an ASGI transport by default, or against a
+running server (e.g. `uvicorn main:app --workers 4`) with --url.
+
+Run from the repository root:
+    python benchmarks/load.py --scenario mixed --concurrency 16 --requests 2000
+or as part of the suite (see benchmarks/suite.py).
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+
+EQUIPMENT = ["Bodyweight", "Dumbbell", "Barbell", "Kettlebell", "Bench (Flat)", "Cable", "Resistance Band",
+             "Pull Up Bar", "Plyo Box", "Sliders"]
+GOALS = ["fat loss", "muscle gain", "strength", "endurance"]
+LEVELS = ["beginner", "intermediate", "advanced"]
+ACTIVITY_LEVELS = ["sedentary", "light", "moderate", "active", "very active"]
+
+
+def profile(rng):
+    return {"age": rng.randint(16, 75), "gender": rng.choice(["male", "female"]),
+            "height": round(rng.uniform(150, 200), 1), "weight": round(rng.uniform(45, 130), 1)}
+
+
+def calorie_payload(rng, duration):
+    user = profile(rng)
+    return {"Gender": user["gender"], "Age": user["age"], "Height": user["height"], "Weight": user["weight"],
+            "Duration": duration, "Heart_Rate": round(rng.uniform(80, 160), 1),
+            "Body_Temp": round(rng.uniform(37.5, 41), 1)}
+
+
+def calorie(rng):
+    return "/predict_calories", calorie_payload(rng, round(rng.uniform(10, 90), 1))
+
+
+def calorie_long(rng):
+    # Multi-hour sessions are scored as many 60-minute chunks
+    return "/predict_calories", calorie_payload(rng, round(rng.uniform(180, 720), 1))
+
+
+def calorie_batch(rng):
+    return "/predict_calories_batch", [calorie_payload(rng, round(rng.uniform(10, 300), 1)) for _ in range(100)]
+
+
+def workout(rng, availability=None):
+    equipment = rng.sample(EQUIPMENT, rng.randint(1, 6))
+    return "/workout_planner", {**profile(rng), "fitness_level": rng.choice(LEVELS), "goal": rng.choice(GOALS),
+                                "availability": availability or rng.randint(1, 7),
+                                "equipment_str": ",".join(equipment)}
+
+
+def workout_7day(rng):
+    return workout(rng, availability=7)
+
+
+def nutrition(rng):
+    return "/nutrition_plan", {**profile(rng), "fitness_level": rng.choice(LEVELS), "goal": rng.choice(GOALS),
+                               "activity_level": rng.choice(ACTIVITY_LEVELS)}
+
+
+def full_profile(rng):
+    _, plan_request = workout(rng)
+    return "/full_profile", {**plan_request, "duration": round(rng.uniform(20, 90), 1),
+                             "heart_rate": round(rng.uniform(90, 150), 1), "body_temp": round(rng.uniform(38, 41), 1)}
+
+
+# Scenario name -> [(weight, payload generator)]
+SCENARIOS = {
+    "calorie": [(1, calorie)],
+    "calorie_long": [(1, calorie_long)],
+    "calorie_batch": [(1, calorie_batch)],
+    "workout": [(1, workout)],
+    "workout_7day": [(1, workout_7day)],
+    "nutrition": [(1, nutrition)],
+    "full_profile": [(1, full_profile)],
+    "mixed": [(4, calorie), (1, calorie_long), (3, workout), (1, workout_7day), (3, nutrition), (1, full_profile)],
+}
+
+
+def summarize(latencies, statuses, elapsed):
+    """
+    Latency percentiles and rate of the successful responses; rejected (429), timed
+    out (504) or failed requests only count towards `errors`.
+    """
+    latencies = np.asarray(latencies)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        "requests": sum(statuses.values()),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(float(latencies.mean()) * 1e3, 3) if len(latencies) else 0.0,
+        "p50_ms": round(float(p50) * 1e3, 3),
+        "p95_ms": round(float(p95) * 1e3, 3),
+        "p99_ms": round(float(p99) * 1e3, 3),
+    }
+
+
+@contextlib.asynccontextmanager
+async def open_client(url=None):
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+            yield client
+        return
+    from main import app, lifespan
+
+    async with lifespan(app), httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load",
+                                                timeout=60) as client:
+        # Start once the background warm-up is done, as traffic gated by a readiness probe would
+        while (response := await client.get("/readyz")).status_code != 200:
+            if response.json()["warmup"] == "failed":
+                raise RuntimeError(f"Warm-up failed: {response.json()['error']}")
+            await asyncio.sleep(0.01)
+        yield client
+
+
+async def run_scenario(client, scenario, concurrency=8, requests=1000, duration=None, seed=0, warmup=20):
+    """
+    Drive `scenario` with `concurrency` closed-loop workers until `requests` requests
+    (or `duration` seconds, if given) have been sent; returns per-endpoint and overall
+    summaries.
+    """
+    rng = random.Random(seed)
+    weights, generators = zip(*SCENARIOS[scenario])
+    payloads = [rng.choices(generators, weights)[0](rng) for _ in range(max(requests, 1000))]
+
+    for path, payload in payloads[:warmup]:
+        await client.post(path, json=payload)
+
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    sent = 0
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    async def worker():
+        nonlocal sent
+        while (deadline is None and sent < requests) or (deadline is not None and time.perf_counter() < deadline):
+            path, payload = payloads[sent % len(payloads)]
+            sent += 1
+            request_start = time.perf_counter()
+            response = await client.post(path, json=payload)
+            if response.status_code < 400:
+                latencies[path].append(time.perf_counter() - request_start)
+            statuses[path][response.status_code] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    result = {path: summarize(latencies[path], statuses[path], elapsed) for path in sorted(statuses)}
+    overall = defaultdict(int)
+    for counts in statuses.values():
+        for status, count in counts.items():
+            overall[status] += count
+    result["all"] = summarize([t for path in sorted(latencies) for t in latencies[path]], overall, elapsed)
+    return result
+
+
+async def run(scenarios, concurrency=8, requests=1000, duration=None, url=None, seed=0):
+    async with open_client(url) as client:
+        return {scenario: await run_scenario(client, scenario, concurrency, requests, duration, seed)
+                for scenario in scenarios}
+
+
+def print_results(results):
+    print(f"{'scenario':<14} {'endpoint':<26} {'requests':>8} {'errors':>6} {'rps':>9} "
+          f"{'p50':>9} {'p95':>9} {'p99':>9}")
+    for scenario, endpoints in results.items():
+        for path, summary in endpoints.items():
+            print(f"{scenario:<14} {path:<26} {summary['requests']:>8} {summary['errors']:>6} {summary['rps']:>9.1f} "
+                  f"{summary['p50_ms']:>7.2f}ms {summary['p95_ms']:>7.2f}ms {summary['p99_ms']:>7.2f}ms")
+
+
+def add_arguments(parser):
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="payload mix to run (repeatable; default: mixed)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--duration", type=float, help="seconds per scenario (overrides --requests)")
+    parser.add_argument("--url", help="base URL of a running server instead of the in-process app")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API and report latency percentiles.")
+    add_arguments(parser)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.scenario or ["mixed"], args.concurrency, args.requests, args.duration, args.url,
+                              args.seed))
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Micro-benchmarks of the hot-path functions, called directly (no HTTP).
+
+Run from the repository root:
+    python benchmarks/micro.py
+or as part of the suite (see benchmarks/suite.py).
+"""
+import os
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from calorie_cache import CalorieCache
+from calorie_predictor import FEATURES, predict_for_duration, predict_records
+from exercise_catalog import get_catalog
+from metrics import metrics
+from nutrient import get_macros_batch, get_macros_from_user_input
+from workout_planner import (
+    assemble_plan_from_bits,
+    build_workout_plan,
+    filter_by_equipment,
+    generate_plan_split_simple,
+    query_candidates,
+    sample_position,
+)
+
+EQUIPMENT = ["Bodyweight", "Dumbbell", "Barbell", "Kettlebell", "Bench (Flat)", "Cable"]
+CALORIE_ROW = {"Gender": 0, "Age": 30, "Height": 175.0, "Weight": 72.0, "Duration": 45.0, "Heart_Rate": 110.0,
+               "Body_Temp": 40.1}
+NUTRITION_INPUT = {"weight": 72.0, "height": 175.0, "age": 30, "gender": "male", "activity_level": "moderate",
+                   "goal": "muscle gain", "fitness_level": "intermediate"}
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """
+    Best and median seconds per call over `repeat` timing runs of an auto-ranged loop.
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"best_us": round(min(runs) * 1e6, 3), "median_us": round(statistics.median(runs) * 1e6, 3),
+            "number": number}
+
+
+def empty_stage():
+    with metrics.stage("bench"):
+        pass
+
+
+def cases():
+    """
+    (name, zero-argument callable) for every micro-benchmark.
+    """
+    catalog = get_catalog()
+    # The DataFrame path expects the raw CSV column names (catalog.df has them normalized)
+    raw = pd.read_csv(catalog.csv_path)
+    bits = query_candidates(catalog, "intermediate", "muscle gain", EQUIPMENT)
+    split_7 = generate_plan_split_simple(7)
+    rng = np.random.default_rng(0)
+
+    memo = CalorieCache(enabled=True)
+    calorie_record = np.array([CALORIE_ROW[name] for name in FEATURES], dtype=np.float64)
+    calorie_record[FEATURES.index("Duration")] = 150.0
+    memo.predict(calorie_record)
+
+    long_sessions = np.tile([[0, 30, 175.0, 72.0, 0, 110.0, 40.1]], (1000, 1))
+    long_sessions[:, 4] = rng.uniform(60, 600, len(long_sessions))
+    users = pd.DataFrame({
+        "weight": rng.uniform(45, 130, 10000), "height": rng.uniform(150, 200, 10000),
+        "age": rng.integers(16, 80, 10000), "gender": rng.choice(["male", "female"], 10000),
+        "activity_level": rng.choice(["sedentary", "light", "moderate", "active", "very active"], 10000),
+        "goal": rng.choice(["fat loss", "muscle gain", "strength", "endurance"], 10000),
+        "fitness_level": rng.choice(["beginner", "intermediate", "advanced"], 10000),
+    })
+
+    return [
+        ("predict_for_duration", lambda: predict_for_duration(CALORIE_ROW)),
+        ("predict_records_1000_long_sessions", lambda: predict_records(long_sessions)),
+        ("predict_records_single_long_session", lambda: predict_records(calorie_record[None])),
+        ("calorie_cache_hit_long_session", lambda: memo.predict(calorie_record)),
+        ("equipment_query_bitset", lambda: catalog.index.positions(catalog.index.match(equipment=EQUIPMENT))),
+        ("filter_by_equipment_dataframe", lambda: filter_by_equipment(raw, EQUIPMENT)),
+        ("assemble_plan_from_bits_7day", lambda: assemble_plan_from_bits(catalog, bits, split_7, "muscle gain",
+                                                                        "intermediate")),
+        ("assemble_plan_from_bits_7day_cold", lambda: (sample_position.cache_clear(),
+                                                       assemble_plan_from_bits(catalog, bits, split_7, "muscle gain",
+                                                                               "intermediate"))),
+        ("build_workout_plan_7day", lambda: build_workout_plan(catalog, "intermediate", "muscle gain", 7, EQUIPMENT)),
+        ("get_macros_from_user_input", lambda: get_macros_from_user_input(NUTRITION_INPUT)),
+        ("get_macros_batch_10000", lambda: get_macros_batch(users)),
+        ("metrics_stage_overhead", empty_stage),
+    ]
+
+
+def run(selected=None, min_time=0.2):
+    results = {}
+    for name, fn in cases():
+        if selected and name not in selected:
+            continue
+        results[name] = measure(fn, min_time=min_time)
+    return results
+
+
+def main():
+    results = run()
+    print(f"{'benchmark':<38} {'best':>12} {'median':>12}")
+    for name, result in results.items():
+        print(f"{name:<38} {result['best_us']:>10.2f}us {result['median_us']:>10.2f}us")
+
+
+if __name__ == "__main__":
+    main()
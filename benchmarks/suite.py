@@ -0,0 +1,123 @@
+"""
+Benchmark suite: micro-benchmarks plus load scenarios, written to one JSON file and
+optionally compared against an earlier run to catch regressions.
+
+Run from the repository root:
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --output new.json --baseline bench.json --tolerance 0.25
+
+The comparison flags every micro-benchmark whose best time, and every load endpoint
+whose p50/p95/p99 latency, grew by more than `tolerance` (a fraction), or whose
+requests per second dropped by more than it, and exits with status 1 if any did.
+Compare runs taken on the same machine with the same options.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load
+import micro
+
+# Load metrics compared against the baseline: (key, True if higher is worse)
+LOAD_METRICS = [("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("rps", False)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                               check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    [(benchmark, metric, baseline value, new value, relative change, regressed)] for
+    every measurement present in both runs.
+    """
+    rows = []
+
+    def check(name, metric, old, new, higher_is_worse):
+        if not old:
+            return
+        change = (new - old) / old
+        regressed = change > tolerance if higher_is_worse else change < -tolerance
+        rows.append((name, metric, old, new, change, regressed))
+
+    for name, result in results.get("micro", {}).items():
+        if name in baseline.get("micro", {}):
+            check(f"micro/{name}", "best_us", baseline["micro"][name]["best_us"], result["best_us"], True)
+    for scenario, endpoints in results.get("load", {}).items():
+        for path, summary in endpoints.items():
+            old = baseline.get("load", {}).get(scenario, {}).get(path)
+            if old is None:
+                continue
+            for metric, higher_is_worse in LOAD_METRICS:
+                check(f"load/{scenario}:{path}", metric, old[metric], summary[metric], higher_is_worse)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the micro-benchmarks and load scenarios.")
+    load.add_arguments(parser)
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per micro-benchmark timing run")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "execution_mode": os.environ.get("EXECUTION_MODE", "thread"),
+            "options": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        },
+    }
+
+    if not args.skip_micro:
+        results["micro"] = micro.run(min_time=args.min_time)
+        print(f"{'benchmark':<38} {'best':>12} {'median':>12}")
+        for name, result in results["micro"].items():
+            print(f"{name:<38} {result['best_us']:>10.2f}us {result['median_us']:>10.2f}us")
+        print()
+
+    if not args.skip_load:
+        results["load"] = asyncio.run(load.run(args.scenario or list(load.SCENARIOS), args.concurrency, args.requests,
+                                               args.duration, args.url, args.seed))
+        load.print_results(results["load"])
+        print()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.tolerance)
+        regressions = [row for row in rows if row[5]]
+        print(f"Compared {len(rows)} measurements against {args.baseline} "
+              f"(commit {baseline.get('meta', {}).get('commit')}), tolerance {args.tolerance:.0%}")
+        for name, metric, old, new, change, _ in regressions:
+            print(f"REGRESSION {name} {metric}: {old:g} -> {new:g} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Bulk calorie scoring of session records (CSV or NDJSON), streamed back as NDJSON.
+
+Input is consumed in blocks of whole lines of about BLOCK_BYTES each, so memory stays
+flat however large the upload is. Every block is parsed in one vectorized pass and
+scored with predict_records, which applies the same 60-minute chunking rule as
+/predict_calories. Each input record produces one output line keyed by its User_ID,
+or by its 0-based row number when the record has none, in CSV and NDJSON alike:
+
+    {"User_ID": 14733363, "predicted_calories": 218.32}
+    {"User_ID": 14861698, "error": "invalid record"}
+    {"row": 2, "predicted_calories": 97.5}
+
+Records with a missing or non-numeric feature, or without a Gender string, get the
+error line instead of a prediction. CSV input needs a header row naming at least the
+FEATURES columns; quoted fields must not contain line breaks.
+
+Usage (from the repository root):
+    python bulk_scoring.py calorie_burned/exercise.csv --output calories.ndjson
+    python bulk_scoring.py sessions.ndjson
+    cat sessions.csv | python bulk_scoring.py - --format csv
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from calorie_predictor import FEATURES, predict_records, round2
+from metrics import metrics
+
+ID_COLUMN = "User_ID"
+FORMATS = ("csv", "ndjson")
+
+# Target size of a parsed block; a block always ends on a line break
+BLOCK_BYTES = 4 * 1024 * 1024
+# Bytes read from a file per read() call by the CLI
+READ_BYTES = 1024 * 1024
+
+
+def detect_format(content_type):
+    """
+    Input format for a request Content-Type; anything that is not CSV is read as NDJSON.
+    """
+    return "csv" if "csv" in (content_type or "").lower() else "ndjson"
+
+
+class BlockReader:
+    """
+    Splits a byte stream into blocks of whole lines of about `block_bytes` each.
+
+    feed() and close() return the completed blocks as (block, first_row) pairs, where
+    first_row is the 0-based index of the block's first record. For CSV, the header
+    line is consumed first and exposed as `columns`.
+    """
+
+    def __init__(self, fmt="csv", block_bytes=BLOCK_BYTES):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+        self.fmt = fmt
+        self.block_bytes = block_bytes
+        self.columns = None if fmt == "csv" else []
+        self.rows = 0
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        self._buffer += data
+        if self.columns is None:
+            end = self._buffer.find(b"\n")
+            if end < 0:
+                return []
+            self.columns = parse_header(bytes(self._buffer[:end]))
+            del self._buffer[:end + 1]
+        blocks = []
+        while len(self._buffer) >= self.block_bytes:
+            end = self._buffer.rfind(b"\n", 0, self.block_bytes)
+            if end < 0:
+                # A single line longer than a block: take it whole
+                end = self._buffer.find(b"\n", self.block_bytes)
+                if end < 0:
+                    break
+            blocks.append(self._take(end + 1))
+        return blocks
+
+    def close(self):
+        if self.columns is None:
+            # Header without a trailing line break (and so no records)
+            self.columns = parse_header(bytes(self._buffer))
+            self._buffer.clear()
+        return [self._take(len(self._buffer))] if self._buffer.strip() else []
+
+    def _take(self, size):
+        block = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        first_row = self.rows
+        self.rows += block.count(b"\n") + (not block.endswith(b"\n"))
+        return block, first_row
+
+
+def parse_header(line):
+    columns = [name.strip() for name in next(csv.reader([line.decode("utf-8-sig")]), [])]
+    missing = [name for name in FEATURES if name not in columns]
+    if missing:
+        raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+    return columns
+
+
+def read_csv_block(block, columns):
+    wanted = [i for i, name in enumerate(columns) if name in FEATURES or name == ID_COLUMN]
+    # IDs stay text so that blank cells or lines do not turn integer IDs into floats
+    ids = [i for i in wanted if columns[i] == ID_COLUMN]
+    df = pd.read_csv(io.BytesIO(block), header=None, usecols=wanted, dtype={i: str for i in ids},
+                     skip_blank_lines=False)
+    df.columns = [columns[i] for i in wanted]
+    return df
+
+
+def read_ndjson_block(block):
+    lines = block.split(b"\n")
+    if block.endswith(b"\n"):
+        lines.pop()
+    try:
+        records = json.loads(b"[" + b",".join(line if line.strip() else b"null" for line in lines) + b"]")
+    except ValueError:
+        # Parse line by line so one malformed line only invalidates its own record
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                records.append(None)
+    records = [record if isinstance(record, dict) else {} for record in records]
+    df = pd.DataFrame.from_records(records, columns=FEATURES, nrows=len(records))
+    # Kept as objects: a column mixing integer IDs and missing ones would turn into floats
+    df[ID_COLUMN] = pd.Series([record.get(ID_COLUMN) for record in records], index=df.index, dtype=object)
+    return df
+
+
+def feature_matrix(df):
+    """
+    (X, valid): the (n_rows, 7) feature matrix of a parsed block and a mask of the rows
+    that can be scored.
+    """
+    X = np.empty((len(df), len(FEATURES)))
+    try:
+        # Non-string cells come back missing
+        gender = df["Gender"].str.lower()
+    except AttributeError:
+        # No strings in the column at all
+        gender = pd.Series(np.nan, index=df.index)
+    is_text = gender.notna().to_numpy(dtype=bool)
+    # encode_gender, vectorized: 0 for "male" in any case, 1 for anything else
+    X[:, 0] = np.where(gender.to_numpy(dtype=object) == "male", 0.0, 1.0)
+    for j, name in enumerate(FEATURES[1:], start=1):
+        X[:, j] = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return X, is_text & np.isfinite(X).all(axis=1)
+
+
+def format_ids(df, fmt, first_row):
+    """
+    JSON text of each row's key: "User_ID":<id>, or "row":<0-based row number> for a
+    record without an ID (no User_ID column, a blank cell, a missing or null field).
+    Integer IDs are written as JSON numbers.
+    """
+    rows = range(first_row, first_row + len(df))
+    if ID_COLUMN not in df.columns:
+        return [f'"row":{row}' for row in rows]
+    ids = df[ID_COLUMN].tolist()
+    if fmt == "csv":
+        integer = df[ID_COLUMN].str.fullmatch(r"-?\d+").fillna(False).to_numpy(dtype=bool).tolist()
+        return [f'"row":{row}' if not isinstance(value, str) else
+                f'"{ID_COLUMN}":{value if bare else json.dumps(value)}'
+                for row, value, bare in zip(rows, ids, integer)]
+    return [f'"row":{row}' if value is None or value != value else
+            f'"{ID_COLUMN}":{value if type(value) is int else json.dumps(value)}'
+            for row, value in zip(rows, ids)]
+
+
+def score_block(fmt, columns, block, first_row=0):
+    """
+    NDJSON output lines (as bytes) for one block of input records.
+    """
+    with metrics.stage("bulk_parse"):
+        df = read_csv_block(block, columns) if fmt == "csv" else read_ndjson_block(block)
+        X, valid = feature_matrix(df)
+    calories = np.full(len(X), np.nan)
+    calories[valid] = predict_records(X[valid])
+    with metrics.stage("bulk_format"):
+        keys = format_ids(df, fmt, first_row)
+        values = round2(calories).tolist()
+        lines = [f'{{{key},"predicted_calories":{value!r}}}' if ok else f'{{{key},"error":"invalid record"}}'
+                 for key, value, ok in zip(keys, values, valid.tolist())]
+    return ("\n".join(lines) + "\n").encode() if lines else b""
+
+
+def score_stream(chunks, fmt="csv", block_bytes=BLOCK_BYTES):
+    """
+    Score an iterable of byte chunks, yielding the NDJSON output block by block.
+    """
+    reader = BlockReader(fmt, block_bytes)
+    for chunk in chunks:
+        for block, first_row in reader.feed(chunk):
+            yield score_block(fmt, reader.columns, block, first_row)
+    for block, first_row in reader.close():
+        yield score_block(fmt, reader.columns, block, first_row)
+
+
+def read_chunks(f, size=READ_BYTES):
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score calorie sessions from a CSV or NDJSON file as NDJSON.")
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="input format (default: from the file extension)")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    parser.add_argument("--block-bytes", type=int, default=BLOCK_BYTES)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "ndjson")
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    target = open(args.output, "wb") if args.output else sys.stdout.buffer
+    start = time.perf_counter()
+    rows = 0
+    try:
+        for output in score_stream(read_chunks(source), fmt, args.block_bytes):
+            rows += output.count(b"\n")
+            target.write(output)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout.buffer:
+            target.close()
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} records in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} records/s)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
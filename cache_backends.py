@@ -0,0 +1,631 @@
+"""
+Storage backends of the plan and calorie caches, and the single-flight that keeps a
+burst of misses for one key from computing it once per caller.
+
+Every backend offers the same small interface (CacheBackend): get_many/set_many with
+a time-to-live, add (set if absent, the building block of the single-flight lock),
+delete, clear, stats. A backend is opened from a URL with open_backend():
+
+- memory (default): MemoryBackend, a thread-safe LRU in the process. It stores the
+  cached objects themselves, so a hit costs a dict lookup, but every worker keeps its
+  own copy and starts cold after a restart.
+- sqlite:///path/to/cache.db: SQLiteBackend, a WAL-mode SQLite file shared by every
+  worker of the node. Values are bytes (cache_codec.py), entries expire by TTL and the
+  oldest are dropped beyond max_entries.
+- redis://host:port/db: RedisBackend, a minimal client of the Redis protocol (RESP)
+  shared by every worker of every node. Entries expire by TTL; the server's
+  maxmemory policy bounds its size.
+
+Each cache opens its backend under its own name: the SQLite table or the Redis key
+prefix, so the plan and calorie caches can share one file or database. Shared backends
+fail open: an unreachable server or a locked file counts an error and reads as a miss,
+never as a failed request.
+
+Conformance of every backend: tests/test_cache_backends.py, which runs RedisBackend
+against the fake server of tests/fake_redis.py. Hit latency per backend:
+benchmarks/bench_cache_backends.py
+"""
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the lock entries taken by SingleFlight, next to the entries they guard
+LOCK_PREFIX = b"lock:"
+# The counters in the stats() of a backend and of a SingleFlight
+BACKEND_COUNTERS = ("evictions", "expirations", "errors")
+FLIGHT_COUNTERS = ("computed", "coalesced", "remote", "lock_timeouts")
+
+
+class CacheBackend(ABC):
+    """
+    Interface of a cache backend. Keys and values are bytes, except for backends with
+    shared = False, which take any hashable key and store any object as is.
+    """
+
+    shared = True
+
+    @abstractmethod
+    def get_many(self, keys):
+        """
+        The value of each key, None for missing or expired ones.
+        """
+
+    @abstractmethod
+    def set_many(self, items, ttl=None):
+        """
+        Store {key: value}, expiring after `ttl` seconds (None: never).
+        """
+
+    @abstractmethod
+    def add(self, key, value, ttl):
+        """
+        Store the value only if the key is absent or expired; True when stored.
+        """
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """
+        Drop every entry of this backend's name.
+        """
+
+    @abstractmethod
+    def stats(self):
+        pass
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Thread-safe LRU with a time-to-live, an entry cap and an optional cap on the total
+    size of the values, measured by `sizeof`.
+    """
+
+    shared = False
+
+    def __init__(self, name="cache", max_entries=4096, max_bytes=None, sizeof=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        # get_many() for one key, on every in-process hit
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] < now:
+                    self._remove(key)
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+        return values
+
+    def set_many(self, items, ttl=None):
+        expires = time.monotonic() + ttl if ttl is not None else float("inf")
+        sizes = {key: self.sizeof(value) for key, value in items.items()}
+        with self._lock:
+            self._store(items, sizes, expires)
+
+    def add(self, key, value, ttl):
+        size = self.sizeof(value)
+        # Checked and stored under one acquisition, or two callers could both take a lock entry
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] >= now:
+                return False
+            self._store({key: value}, {key: size}, now + ttl)
+        return True
+
+    def _store(self, items, sizes, expires):
+        # Called with _lock held
+        for key, value in items.items():
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and sizes[key] > self.max_bytes:
+                continue
+            self._entries[key] = (value, sizes[key], expires)
+            self._bytes += sizes[key]
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None
+                                                        and self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._entries), "bytes": self._bytes,
+                    "evictions": self.evictions, "expirations": self.expirations}
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Entries in table `name` of a SQLite file, shared by every process opening it. Each
+    thread of each process has its own connection. Every EVICT_EVERY writes of a
+    process, expired entries are deleted and, beyond max_entries, the ones expiring
+    first (the oldest written, as a cache uses one TTL).
+    """
+
+    EVICT_EVERY = 256
+
+    def __init__(self, name, path, max_entries=100000, timeout=1.0):
+        if not name.isidentifier():
+            raise ValueError(f"Invalid cache name '{name}'")
+        self.name = name
+        # Quoted: names such as "check" are SQL keywords
+        self.table = f'"{name}"'
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        # A forked worker must not use its parent's connection
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} "
+                     "(key BLOB PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL) WITHOUT ROWID")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS \"{self.name}_expires\" ON {self.table} (expires)")
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _failed(self, exc):
+        self.errors += 1
+        logger.warning("SQLite cache %s:%s unavailable: %s", self.path, self.name, exc)
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def get_many(self, keys):
+        keys = list(keys)
+        try:
+            rows = dict(self._connection().execute(
+                f"SELECT key, value FROM {self.table} WHERE key IN ({','.join('?' * len(keys))}) AND expires > ?",
+                (*keys, time.time())).fetchall())
+        except sqlite3.Error as exc:
+            self._failed(exc)
+            return [None] * len(keys)
+        return [rows.get(key) for key in keys]
+
+    def set_many(self, items, ttl=None):
+        expires = time.time() + ttl if ttl is not None else float("inf")
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)",
+                                 [(key, value, expires) for key, value in items.items()])
+        except sqlite3.Error as exc:
+            self._failed(exc)
+            return
+        with self._lock:
+            self._writes += len(items)
+            evict = self._writes >= self.EVICT_EVERY
+            if evict:
+                self._writes = 0
+        if evict:
+            self._evict()
+
+    def _evict(self):
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                expired = conn.execute(f"DELETE FROM {self.table} WHERE expires <= ?", (time.time(),)).rowcount
+                excess = conn.execute(f"SELECT count(*) FROM {self.table}").fetchone()[0] - self.max_entries
+                evicted = conn.execute(f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+                                       "ORDER BY expires LIMIT ?)", (excess,)).rowcount if excess > 0 else 0
+        except sqlite3.Error as exc:
+            self._failed(exc)
+            return
+        with self._lock:
+            self.expirations += expired
+            self.evictions += evicted
+
+    def add(self, key, value, ttl):
+        now = time.time()
+        try:
+            return self._connection().execute(
+                f"INSERT INTO {self.table} VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE "
+                f"SET value = excluded.value, expires = excluded.expires WHERE {self.table}.expires <= ?",
+                (key, value, now + ttl, now)).rowcount == 1
+        except sqlite3.Error as exc:
+            self._failed(exc)
+            # Fail open: the caller computes the value itself
+            return True
+
+    def delete(self, key):
+        try:
+            self._connection().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        except sqlite3.Error as exc:
+            self._failed(exc)
+
+    def clear(self):
+        try:
+            self._connection().execute(f"DELETE FROM {self.table}")
+        except sqlite3.Error as exc:
+            self._failed(exc)
+
+    def stats(self):
+        stats = {"backend": "sqlite", "path": self.path, "evictions": self.evictions,
+                 "expirations": self.expirations, "errors": self.errors}
+        try:
+            entries, size = self._connection().execute(
+                f"SELECT count(*), coalesce(sum(length(value)), 0) FROM {self.table}").fetchone()
+        except sqlite3.Error as exc:
+            self._failed(exc)
+            return stats
+        return {**stats, "entries": entries, "bytes": size}
+
+
+class RedisError(Exception):
+    """
+    Error reply of a Redis server.
+    """
+
+
+def encode_command(*args):
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def read_reply(reader):
+    """
+    One RESP value from a buffered binary reader: simple strings and bulk strings as
+    bytes, integers as int, arrays as lists, nil as None; error replies raise RedisError.
+    """
+    line = reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest
+    if kind == b"-":
+        raise RedisError(rest.decode(errors="replace"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Connection closed")
+        return data[:-2]
+    if kind == b"*":
+        length = int(rest)
+        return None if length < 0 else [read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Invalid reply {line[:32]!r}")
+
+
+class RedisBackend(CacheBackend):
+    """
+    Entries under the key prefix "<name>:" of a Redis server, one connection per
+    thread of each process, requests of one call pipelined. After a connection error
+    the server is considered down for `retry_seconds`: calls return misses at once
+    rather than waiting for a connect timeout on every request.
+    """
+
+    def __init__(self, name, host="127.0.0.1", port=6379, db=0, timeout=0.5, retry_seconds=1.0):
+        self.name = name
+        self.prefix = f"{name}:".encode()
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self._local = threading.local()
+        self._down_until = 0.0
+        self.errors = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = self._local.conn = (sock, sock.makefile("rb"))
+        self._local.pid = os.getpid()
+        if self.db:
+            self._send(conn, [("SELECT", self.db)])
+        return conn
+
+    @staticmethod
+    def _send(conn, commands):
+        sock, reader = conn
+        sock.sendall(b"".join(encode_command(*command) for command in commands))
+        return [read_reply(reader) for _ in commands]
+
+    def execute(self, *commands):
+        """
+        Replies to the pipelined commands, or None when the server cannot be reached.
+        """
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return self._send(self._connection(), commands)
+        except (OSError, RedisError) as exc:
+            # Also covers ConnectionError and timeouts; the connection may be mid-reply
+            self.errors += 1
+            self._down_until = time.monotonic() + self.retry_seconds
+            logger.warning("Redis cache %s:%d unavailable: %s", self.host, self.port, exc)
+            conn = getattr(self._local, "conn", None)
+            self._local.conn = None
+            if conn is not None:
+                conn[0].close()
+            return None
+
+    def get_many(self, keys):
+        keys = list(keys)
+        replies = self.execute(("MGET", *(self.prefix + key for key in keys)))
+        return [None] * len(keys) if replies is None else replies[0]
+
+    def set_many(self, items, ttl=None):
+        expiry = ("PX", max(int(ttl * 1000), 1)) if ttl is not None else ()
+        self.execute(*(("SET", self.prefix + key, value, *expiry) for key, value in items.items()))
+
+    def add(self, key, value, ttl):
+        replies = self.execute(("SET", self.prefix + key, value, "NX", "PX", max(int(ttl * 1000), 1)))
+        # Fail open: the caller computes the value itself
+        return replies is None or replies[0] is not None
+
+    def delete(self, key):
+        self.execute(("DEL", self.prefix + key))
+
+    def clear(self):
+        cursor = b"0"
+        while True:
+            replies = self.execute(("SCAN", cursor, "MATCH", self.prefix + b"*", "COUNT", 1000))
+            if replies is None:
+                return
+            cursor, keys = replies[0]
+            if keys:
+                self.execute(("DEL", *keys))
+            if cursor == b"0":
+                return
+
+    def stats(self):
+        return {"backend": "redis", "address": f"{self.host}:{self.port}/{self.db}", "errors": self.errors}
+
+
+async def call_backend(backend, fn, *args):
+    """
+    fn(*args), a call that uses `backend`, from a coroutine: in a thread for a shared
+    backend, whose file or socket I/O would otherwise stall the event loop (up to the
+    Redis timeout), and directly for the in-process one, where a thread would cost
+    more than the dict lookups it saves.
+    """
+    if backend.shared:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+def open_backend(url, name, max_entries=4096, max_bytes=None, sizeof=None):
+    """
+    Backend for a URL: "memory", "sqlite:///path" (or "sqlite://relative/path") or
+    "redis://host:port/db". max_bytes and sizeof only apply to the memory backend.
+    """
+    parsed = urlsplit(url or "memory")
+    scheme = parsed.scheme or parsed.path
+    if scheme == "memory":
+        return MemoryBackend(name, max_entries, max_bytes, sizeof)
+    if scheme == "sqlite" and parsed.netloc + parsed.path:
+        return SQLiteBackend(name, parsed.netloc + parsed.path, max_entries)
+    if scheme == "redis":
+        return RedisBackend(name, parsed.hostname or "127.0.0.1", parsed.port or 6379, int(parsed.path.strip("/") or 0))
+    raise ValueError(f"Unknown cache backend '{url}', expected memory, sqlite:///path or redis://host:port/db")
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Computes a missing value once however many callers miss it at the same time.
+
+    Within a process, the first caller for a key computes it and the others wait for
+    its result (or its exception). On a shared backend the computing caller also takes
+    a lock entry with add(): callers of other workers that find it taken poll the
+    backend for the value instead of computing it, and compute it themselves if the
+    lock expires first (a crashed or slow worker). The lock is only a hint: a value is
+    computed twice at worst, never served wrong.
+
+    run() serves threads; run_async() coroutines of one event loop, whose computation
+    runs as its own task so that a caller going away does not fail the others, and
+    whose calls to a shared backend run in threads (see call_backend()).
+    """
+
+    def __init__(self, lock_ttl=10.0, poll_seconds=0.002):
+        self.lock_ttl = lock_ttl
+        self.poll_seconds = poll_seconds
+        self._flights = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.coalesced = 0
+        self.remote = 0
+        self.lock_timeouts = 0
+
+    def run(self, key, backend, fetch, compute):
+        """
+        The value of `key`: compute() when this caller leads the flight, otherwise the
+        leader's result. fetch() returns the cached value or None (for shared backends).
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            with self._lock:
+                self.coalesced += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._lead(key, backend, fetch, compute)
+            return flight.value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _lead(self, key, backend, fetch, compute):
+        if not backend.shared:
+            return self._compute(compute)
+        lock = LOCK_PREFIX + key
+        deadline = time.monotonic() + self.lock_ttl
+        while not backend.add(lock, b"1", self.lock_ttl):
+            # Another worker is computing it
+            value = fetch()
+            if value is not None:
+                with self._lock:
+                    self.remote += 1
+                return value
+            if time.monotonic() > deadline:
+                with self._lock:
+                    self.lock_timeouts += 1
+                return self._compute(compute)
+            time.sleep(self.poll_seconds)
+        try:
+            # Filled by a worker that released the lock between our miss and add()
+            value = fetch()
+            if value is None:
+                return self._compute(compute)
+            with self._lock:
+                self.remote += 1
+            return value
+        finally:
+            backend.delete(lock)
+
+    def _compute(self, compute):
+        with self._lock:
+            self.computed += 1
+        return compute()
+
+    async def run_async(self, key, backend, fetch, compute):
+        """
+        run() for coroutines: `compute` is a coroutine function.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(self._lead_async(key, backend, fetch, compute))
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            with self._lock:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        del self._tasks[key]
+        # Retrieved here in case every caller went away before it finished
+        if not task.cancelled():
+            task.exception()
+
+    async def _lead_async(self, key, backend, fetch, compute):
+        if not backend.shared:
+            return await self._compute(compute)
+        lock = LOCK_PREFIX + key
+        deadline = time.monotonic() + self.lock_ttl
+        # The lock and fetch() do file or socket I/O: run in threads, off the event loop
+        while not await asyncio.to_thread(backend.add, lock, b"1", self.lock_ttl):
+            value = await asyncio.to_thread(fetch)
+            if value is not None:
+                with self._lock:
+                    self.remote += 1
+                return value
+            if time.monotonic() > deadline:
+                with self._lock:
+                    self.lock_timeouts += 1
+                return await self._compute(compute)
+            await asyncio.sleep(self.poll_seconds)
+        try:
+            value = await asyncio.to_thread(fetch)
+            if value is None:
+                return await self._compute(compute)
+            with self._lock:
+                self.remote += 1
+            return value
+        finally:
+            await asyncio.to_thread(backend.delete, lock)
+
+    def stats(self):
+        with self._lock:
+            return {"computed": self.computed, "coalesced": self.coalesced, "remote": self.remote,
+                    "lock_timeouts": self.lock_timeouts, "in_flight": len(self._flights) + len(self._tasks)}
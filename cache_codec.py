@@ -0,0 +1,66 @@
+"""
+Compact binary encodings of the values the caches store as bytes (see cache_backends.py).
+
+- Plans (/workout_planner): a string table holding every day label, exercise name,
+  muscle, rest and intensity text of the plan once, followed by little-endian uint16
+  words: [n_days, then per day: label, n_exercises, then per exercise the
+  EXERCISE_FIELDS with text as string ids]. A five-day plan takes about a third of
+  its JSON, and decoding it is a single struct.unpack plus dict building.
+- Calorie cache entries: (prediction, error bound) as two float64.
+
+Decoding returns new objects every time; nothing is shared between callers.
+"""
+import struct
+
+PLAN_FORMAT = 1
+EXERCISE_FIELDS = ("exercise_name", "primary_muscle", "sets", "reps", "rest", "intensity")
+# Fields stored as string ids rather than integers
+TEXT_FIELDS = {"exercise_name", "primary_muscle", "rest", "intensity"}
+
+# Format byte and length of the string table
+_PLAN_HEADER = struct.Struct("<BI")
+
+_CALORIE_ENTRY = struct.Struct("<dd")
+
+
+def encode_plan(plan):
+    strings = {}
+    words = [len(plan)]
+    for label, exercises in plan.items():
+        words += (strings.setdefault(label, len(strings)), len(exercises))
+        for exercise in exercises:
+            words += [strings.setdefault(exercise[field], len(strings)) if field in TEXT_FIELDS
+                      else int(exercise[field]) for field in EXERCISE_FIELDS]
+    # Catalog texts never contain NUL, which separates them
+    blob = "\0".join(strings).encode()
+    return _PLAN_HEADER.pack(PLAN_FORMAT, len(blob)) + blob + struct.pack(f"<{len(words)}H", *words)
+
+
+def decode_plan(data):
+    fmt, length = _PLAN_HEADER.unpack_from(data)
+    if fmt != PLAN_FORMAT:
+        raise ValueError(f"Plan encoded with format {fmt}, expected {PLAN_FORMAT}")
+    start = _PLAN_HEADER.size + length
+    strings = data[_PLAN_HEADER.size:start].decode().split("\0")
+    words = struct.unpack_from(f"<{(len(data) - start) // 2}H", data, start)
+    plan = {}
+    i = 1
+    for _ in range(words[0]):
+        label, count = words[i], words[i + 1]
+        i += 2
+        exercises = []
+        for _ in range(count):
+            name, muscle, sets, reps, rest, intensity = words[i:i + 6]
+            i += 6
+            exercises.append({"exercise_name": strings[name], "primary_muscle": strings[muscle], "sets": sets,
+                              "reps": reps, "rest": strings[rest], "intensity": strings[intensity]})
+        plan[strings[label]] = exercises
+    return plan
+
+
+def encode_calorie_entry(value, bound):
+    return _CALORIE_ENTRY.pack(value, bound)
+
+
+def decode_calorie_entry(data):
+    return _CALORIE_ENTRY.unpack(data)
@@ -0,0 +1,125 @@
+"""
+Micro-batching of concurrent single-record /predict_calories calls.
+
+Each call costs one CPU-pool round trip and one kernel invocation whose time is
+almost all fixed overhead (see benchmarks/bench_calorie_kernel.py: one row costs about
+as much as a hundred). While enabled, calls are queued on the event loop instead: the
+first call of a batch opens a window, and when it closes (or max_batch calls have
+arrived) the whole queue is scored as one matrix by a single predict_records task and
+every caller's future is resolved with its own row's result. A rejected (429) or timed
+out (504) batch fails each of its callers the same way.
+
+A call arriving while no batch is being scored is dispatched at once, so at low
+concurrency batching adds no waiting; under load the window fills while earlier
+batches are scored. The added latency per call is bounded by the window, and a batch
+counts as one task against CPU_MAX_PENDING.
+
+Configured through environment variables:
+- CALORIE_BATCHING: "1" to enable (default: off).
+- CALORIE_BATCH_WINDOW_MS: how long the first call of a batch waits for others
+  (default: 2).
+- CALORIE_BATCH_MAX: calls scored together at most (default: 64).
+
+Batch sizes and the time each call spent queued are recorded on /metrics
+(calorie_batch_size, calorie_batch_queue_seconds).
+
+Load test (from the repository root):
+    python benchmarks/bench_calorie_batching.py
+"""
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from calorie_predictor import predict_records
+from cpu_pool import cpu
+from metrics import metrics
+
+# Bucket upper bounds for batch sizes
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class MicroBatcher:
+    """
+    Event-loop side queue of pending single-record predictions; not thread-safe, every
+    method must be called from the event loop.
+    """
+
+    def __init__(self, window=0.002, max_batch=64, enabled=False):
+        self.window = window
+        self.max_batch = max_batch
+        self.enabled = enabled
+        # [(feature row, future, enqueue time)]
+        self._queue = []
+        self._timer = None
+        # Batches being scored, kept referenced until they finish
+        self._tasks = set()
+        self.batches = 0
+        self.records = 0
+
+    async def predict(self, record):
+        """
+        Total predicted calories for one feature row, scored together with the other
+        rows queued within the window.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((record, future, time.perf_counter()))
+        if len(self._queue) >= self.max_batch or not self._tasks:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        if batch:
+            task = asyncio.ensure_future(self._score(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, batch):
+        now = time.perf_counter()
+        self.batches += 1
+        self.records += len(batch)
+        metrics.observe("calorie_batch_size", len(batch))
+        for _, _, enqueued in batch:
+            metrics.observe("calorie_batch_queue_seconds", now - enqueued)
+
+        try:
+            totals = await cpu.run(predict_records, np.stack([record for record, _, _ in batch]))
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        # Callers that went away (client disconnects) have cancelled their futures
+        for (_, future, _), total in zip(batch, totals):
+            if not future.done():
+                future.set_result(total)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1e3,
+            "max_batch": self.max_batch,
+            "queued": len(self._queue),
+            "batches": self.batches,
+            "records": self.records,
+            "mean_batch_size": round(self.records / self.batches, 3) if self.batches else 0.0,
+        }
+
+
+metrics.family("calorie_batch_size", "Calls scored together by the /predict_calories micro-batcher.",
+               BATCH_SIZE_BUCKETS)
+metrics.family("calorie_batch_queue_seconds", "Time a /predict_calories call waited for its batch to be scored.")
+
+calorie_batcher = MicroBatcher(
+    window=float(os.environ.get("CALORIE_BATCH_WINDOW_MS", 2)) / 1e3,
+    max_batch=int(os.environ.get("CALORIE_BATCH_MAX", 64)),
+    enabled=os.environ.get("CALORIE_BATCHING", "0") == "1",
+)
@@ -0,0 +1,363 @@
+"""
+Closed-form NumPy scoring kernel for the calorie model.
+
+The fitted StandardScaler -> PolynomialFeatures -> Lasso pipeline is a fixed polynomial
+in the 7 input features, so it is compiled into a small coefficient table:
+
+    y = intercept + sum_k coef[k] * prod_j ((x[j] - mean[j]) / scale[j]) ** powers[k, j]
+
+keeping only the monomials whose Lasso coefficient is non-zero. The table is stored as
+a directory of .npy arrays plus a JSON header, so workers can memory-map it read-only
+and share the pages instead of each holding a private copy.
+
+Gradient-boosted trees (the notebooks' GradientBoostingRegressor) are compiled the same
+way into padded node arrays evaluated by TreeEnsembleKernel; the header's "kind" tells
+load_table() which evaluator a directory holds.
+
+Usage (from the repository root):
+    python calorie_kernel.py            # export calorie_burned/calorie_kernel/
+    python calorie_kernel.py --check    # also verify parity against the sklearn pipeline
+
+Parity is tested in tests/test_calorie_kernel.py (python -m pytest tests).
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from metrics import metrics
+
+MODEL_DIR = "calorie_burned"
+KERNEL_PATH = os.path.join(MODEL_DIR, "calorie_kernel")
+PIPELINE_FILES = ["scaler.pkl", "poly.pkl", "lasso_model.pkl"]
+
+# Arrays stored as one .npy file each
+ARRAYS = ["mean", "scale", "powers", "coef"]
+
+# Rows evaluated at a time, bounding the (rows x terms) work array
+BLOCK_ROWS = 8192
+
+# Arrays of a tree ensemble, (n_trees, n_nodes) each
+TREE_ARRAYS = ["feature", "threshold", "left", "right", "value"]
+
+# Rows evaluated at a time by a tree ensemble, bounding the (trees x rows) work arrays
+TREE_BLOCK_ROWS = 2048
+
+
+class CalorieKernel:
+    """
+    Pure-NumPy evaluator for a compiled coefficient table.
+    """
+
+    kind = "polynomial"
+
+    def __init__(self, mean, scale, powers, coef, intercept, source_digest=""):
+        # np.asarray keeps memory-mapped arrays mapped when the dtype already matches
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.powers = np.asarray(powers, dtype=np.intp)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.max_power = int(self.powers.max()) if self.powers.size else 0
+        # SHA-256 of the pickles the table was compiled from
+        self.source_digest = source_digest
+        # Derivative table for gradient_bound, built on first use
+        self._gradient = None
+
+    @classmethod
+    def load(cls, path=KERNEL_PATH, mmap=True):
+        with open(os.path.join(path, "kernel.json")) as f:
+            header = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in ARRAYS}
+        return cls(arrays["mean"], arrays["scale"], arrays["powers"], arrays["coef"], header["intercept"],
+                   header["source_digest"])
+
+    def save(self, path=KERNEL_PATH):
+        os.makedirs(path, exist_ok=True)
+        # Stored in the dtypes the evaluator uses so loading never copies the mapping
+        for name in ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "kernel.json"), "w") as f:
+            json.dump({"kind": self.kind, "intercept": self.intercept, "source_digest": self.source_digest}, f,
+                      indent=2)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    def predict(self, X):
+        """
+        Score a (n_rows, 7) feature matrix; columns follow calorie_predictor.FEATURES.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        out = np.empty(len(X))
+        for start in range(0, len(X), BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = self._predict_block(X[start:start + BLOCK_ROWS])
+        return out
+
+    def _predict_block(self, X):
+        # The three steps of the sklearn pipeline: scaling, polynomial expansion, linear model
+        with metrics.stage("calorie_scale"):
+            # Feature-major layout so every gather below copies contiguous rows
+            Z = ((X - self.mean) / self.scale).T
+        with metrics.stage("calorie_expand"):
+            # Zp[p, j] = Z[j] ** p for every power used by the table
+            Zp = np.empty((self.max_power + 1,) + Z.shape)
+            Zp[0] = 1.0
+            for p in range(1, self.max_power + 1):
+                np.multiply(Zp[p - 1], Z, out=Zp[p])
+            terms = np.ones((len(self.coef), Z.shape[1]))
+            for j in range(Z.shape[0]):
+                terms *= Zp[self.powers[:, j], j]
+        with metrics.stage("calorie_predict"):
+            return self.coef @ terms + self.intercept
+
+    def gradient_bound(self, lo, hi):
+        """
+        Upper bound on |d prediction / d x[j]| over every point of the box lo <= x <= hi,
+        for each feature j; lo and hi are (n_boxes, 7), the result too.
+
+        Interval arithmetic on the table: each standardized feature is enclosed in an
+        interval, powers and products of intervals enclose every monomial's partial
+        derivative, and their weighted sum encloses the gradient. The bound is rigorous
+        (up to float rounding) but may overestimate.
+        """
+        zlo = (np.atleast_2d(lo) - self.mean) / self.scale
+        zhi = (np.atleast_2d(hi) - self.mean) / self.scale
+        # [plo, phi][..., p, j] encloses Z[j] ** p over the box
+        plo = np.empty(zlo.shape[:1] + (self.max_power + 1,) + zlo.shape[1:])
+        phi = np.empty_like(plo)
+        for p in range(self.max_power + 1):
+            a, b = zlo ** p, zhi ** p
+            plo[:, p], phi[:, p] = np.minimum(a, b), np.maximum(a, b)
+            if p % 2 == 0:
+                # Even powers reach 0 when the interval straddles it
+                plo[:, p] = np.where((zlo < 0) & (zhi > 0), 0.0, plo[:, p])
+
+        powers, weight = self._gradient_table()
+        lo_acc = np.ones((len(zlo),) + weight.shape)
+        hi_acc = np.ones_like(lo_acc)
+        for i in range(len(self.mean)):
+            flo, fhi = plo[:, powers[:, :, i], i], phi[:, powers[:, :, i], i]
+            a, b, c, d = lo_acc * flo, lo_acc * fhi, hi_acc * flo, hi_acc * fhi
+            lo_acc = np.minimum(np.minimum(a, b), np.minimum(c, d))
+            hi_acc = np.maximum(np.maximum(a, b), np.maximum(c, d))
+        total_lo = np.where(weight >= 0, weight * lo_acc, weight * hi_acc).sum(axis=2)
+        total_hi = np.where(weight >= 0, weight * hi_acc, weight * lo_acc).sum(axis=2)
+        # Chain rule through the standardization Z[j] = (x[j] - mean[j]) / scale[j]
+        return np.maximum(np.abs(total_lo), np.abs(total_hi)) / self.scale
+
+    def _gradient_table(self):
+        """
+        (powers, weight) of the partial derivatives: d/dZ[j] of coef * prod Z ** powers
+        is weight[j, k] * prod_i Z[i] ** powers[j, k, i].
+        """
+        if self._gradient is None:
+            n_features = len(self.mean)
+            powers = np.repeat(self.powers[None], n_features, axis=0)
+            diagonal = np.arange(n_features)
+            powers[diagonal, :, diagonal] = np.maximum(self.powers.T - 1, 0)
+            self._gradient = powers, self.coef * self.powers.T
+        return self._gradient
+
+
+class TreeEnsembleKernel:
+    """
+    Pure-NumPy evaluator for a compiled ensemble of regression trees whose predictions
+    are summed (a squared-error GradientBoostingRegressor, learning rate folded into the
+    leaf values).
+
+    Trees are padded to a common node count; leaves send every row back to themselves,
+    so each block of rows descends all trees at once in max_depth vectorized steps.
+    """
+
+    kind = "tree_ensemble"
+
+    def __init__(self, feature, threshold, left, right, value, intercept, max_depth, source_digest=""):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.max_depth = int(max_depth)
+        self.source_digest = source_digest
+        # Flattened (n_trees * n_nodes) node arrays; _child[node + size * went_left] is the
+        # next node, as an index into the same arrays
+        n_trees, n_nodes = self.feature.shape
+        offsets = np.arange(n_trees)[:, None] * n_nodes
+        self._roots = offsets[:, 0]
+        self._size = self.feature.size
+        self._child = np.concatenate([(self.right + offsets).ravel(), (self.left + offsets).ravel()])
+        self._feature, self._threshold, self._value = self.feature.ravel(), self.threshold.ravel(), self.value.ravel()
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, "kernel.json")) as f:
+            header = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in TREE_ARRAYS}
+        return cls(**arrays, intercept=header["intercept"], max_depth=header["max_depth"],
+                   source_digest=header["source_digest"])
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in TREE_ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "kernel.json"), "w") as f:
+            json.dump({"kind": self.kind, "intercept": self.intercept, "max_depth": self.max_depth,
+                       "source_digest": self.source_digest}, f, indent=2)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in TREE_ARRAYS)
+
+    def predict(self, X):
+        """
+        Score a (n_rows, 7) feature matrix; columns follow calorie_predictor.FEATURES.
+        """
+        # sklearn compares float32 features against float64 thresholds; so does this
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty(len(X))
+        for start in range(0, len(X), TREE_BLOCK_ROWS):
+            out[start:start + TREE_BLOCK_ROWS] = self._predict_block(X[start:start + TREE_BLOCK_ROWS])
+        return out
+
+    def _predict_block(self, X):
+        with metrics.stage("calorie_trees"):
+            n = len(X)
+            # Feature-major, so row i's feature j sits at j * n + i
+            flat = np.ascontiguousarray(X.T).ravel()
+            columns = np.arange(n)
+            node = np.repeat(self._roots[:, None], n, axis=1)
+            for _ in range(self.max_depth):
+                went_left = flat[self._feature[node] * n + columns] <= self._threshold[node]
+                node = self._child[node + went_left * self._size]
+            return self._value[node].sum(axis=0) + self.intercept
+
+    def gradient_bound(self, lo, hi):
+        """
+        Trees are piecewise constant, so no finite bound holds across a split: every
+        box is reported unbounded and calorie_cache never serves this model from memory.
+        """
+        return np.full(np.atleast_2d(lo).shape, np.inf)
+
+
+# Evaluator of each header "kind"; tables written before kinds existed are polynomial
+KERNEL_KINDS = {kernel.kind: kernel for kernel in (CalorieKernel, TreeEnsembleKernel)}
+
+
+def load_table(path, mmap=True):
+    """
+    Load a compiled table of any kind from a directory written by its save().
+    """
+    with open(os.path.join(path, "kernel.json")) as f:
+        kind = json.load(f).get("kind", CalorieKernel.kind)
+    return KERNEL_KINDS[kind].load(path, mmap=mmap)
+
+
+def compile_pipeline(scaler, poly, model, source_digest=""):
+    """
+    Compile fitted scaler, polynomial features and Lasso into a CalorieKernel,
+    dropping the monomials with a zero coefficient.
+    """
+    coef = np.ravel(model.coef_)
+    keep = np.flatnonzero(coef)
+    return CalorieKernel(scaler.mean_, scaler.scale_, poly.powers_[keep], coef[keep], np.ravel(model.intercept_)[0],
+                         source_digest)
+
+
+def compile_boosted_trees(model, source_digest=""):
+    """
+    Compile a fitted squared-error GradientBoostingRegressor into a TreeEnsembleKernel.
+    """
+    trees = [estimator.tree_ for estimator in np.ravel(model.estimators_)]
+    shape = (len(trees), max(tree.node_count for tree in trees))
+    feature = np.zeros(shape, dtype=np.intp)
+    threshold = np.full(shape, np.inf)
+    value = np.zeros(shape)
+    # Padding nodes and leaves point at themselves
+    left = np.repeat(np.arange(shape[1])[None], shape[0], axis=0)
+    right = left.copy()
+    for i, tree in enumerate(trees):
+        n = tree.node_count
+        split = tree.children_left >= 0
+        feature[i, :n] = np.where(split, tree.feature, 0)
+        threshold[i, :n] = np.where(split, tree.threshold, np.inf)
+        left[i, :n] = np.where(split, tree.children_left, np.arange(n))
+        right[i, :n] = np.where(split, tree.children_right, np.arange(n))
+        value[i, :n] = tree.value[:, 0, 0] * model.learning_rate
+    intercept = float(np.ravel(model.init_.constant_)[0])
+    return TreeEnsembleKernel(feature, threshold, left, right, value, intercept,
+                              max(tree.max_depth for tree in trees), source_digest)
+
+
+def pipeline_digest(model_dir=MODEL_DIR):
+    digest = hashlib.sha256()
+    for name in PIPELINE_FILES:
+        with open(os.path.join(model_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_pipeline(model_dir=MODEL_DIR):
+    import joblib
+
+    return tuple(joblib.load(os.path.join(model_dir, name)) for name in PIPELINE_FILES)
+
+
+def load_kernel(path=KERNEL_PATH, model_dir=MODEL_DIR):
+    """
+    Load the exported table, recompiling it from the pickles when it is missing or was
+    compiled from different pickles.
+    """
+    digest = pipeline_digest(model_dir)
+    if os.path.exists(os.path.join(path, "kernel.json")):
+        kernel = CalorieKernel.load(path)
+        if kernel.source_digest == digest:
+            return kernel
+    return compile_pipeline(*load_pipeline(model_dir), digest)
+
+
+def check_parity(kernel, pipeline, csv_path=os.path.join(MODEL_DIR, "exercise.csv")):
+    """
+    Maximum absolute difference between the kernel and the sklearn pipeline over
+    every row of the training dataset.
+    """
+    import pandas as pd
+
+    from calorie_predictor import FEATURES, encode_gender
+
+    df = pd.read_csv(csv_path)
+    df["Gender"] = df["Gender"].map(encode_gender)
+    X = df[FEATURES]
+    scaler, poly, model = pipeline
+    expected = model.predict(poly.transform(scaler.transform(X)))
+    return float(np.max(np.abs(kernel.predict(X.to_numpy(dtype=np.float64)) - expected)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the calorie pipeline as a NumPy coefficient table.")
+    parser.add_argument("--output", default=KERNEL_PATH)
+    parser.add_argument("--check", action="store_true", help="verify parity against the sklearn pipeline")
+    parser.add_argument("--tolerance", type=float, default=1e-8)
+    args = parser.parse_args()
+
+    pipeline = load_pipeline()
+    kernel = compile_pipeline(*pipeline, pipeline_digest())
+    kernel.save(args.output)
+    print(f"Wrote {args.output}: {len(kernel.coef)} non-zero terms out of {pipeline[1].powers_.shape[0]}")
+
+    if args.check:
+        max_diff = check_parity(kernel, pipeline)
+        print(f"Max abs difference vs sklearn pipeline: {max_diff:.3e}")
+        if max_diff > args.tolerance:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
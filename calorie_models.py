@@ -0,0 +1,305 @@
+"""
+Versioned store of compiled calorie models, and the production / shadow model of the
+running service.
+
+Store layout (calorie_burned/models/, or CALORIE_MODEL_STORE):
+    <version>/kernel.json, *.npy   compiled table, read by calorie_kernel.load_table
+    <version>/manifest.json        training parameters, data digest and holdout scores
+    serving.json                   {"active": version, "shadow": version or null}
+
+Versions are written by train_calorie_models.py. BASELINE ("pipeline") names the
+pickled scaler -> poly -> lasso pipeline (calorie_kernel.load_kernel); it is the active
+model while serving.json does not exist, so a checkout without a store serves exactly
+what it did before.
+
+Hot swap: serving.json is only ever replaced whole (os.replace), and every scoring call
+stats it. When it changed, the process loads the new version once and swaps it into
+the registry in a single assignment. A call keeps the model it started with until it
+returns, so in-flight requests finish on the old version while later ones use the new
+one, in the main process and in every process-pool worker alike. A version that fails
+to load leaves the previous one serving.
+
+Shadow scoring: while a shadow version is set, a CALORIE_SHADOW_SAMPLE fraction
+(default: 1.0) of scoring calls also runs it on the same rows after production, and
+records both latencies and the per-call mean and max absolute difference on /metrics
+(summarized on /admin/models). Its output is never returned.
+
+Usage (from the repository root):
+    python calorie_models.py                        # list versions and the serving choice
+    python calorie_models.py --activate <version>
+    python calorie_models.py --shadow <version>     # --shadow "" stops shadow scoring
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+
+from calorie_kernel import MODEL_DIR, load_kernel, load_table
+from metrics import metrics
+from model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+STORE_PATH = os.path.join(MODEL_DIR, "models")
+SERVING_FILE = "serving.json"
+MANIFEST_FILE = "manifest.json"
+
+# The pickled pipeline in calorie_burned/, available without a store
+BASELINE = "pipeline"
+
+# Bucket upper bounds (kcal) for shadow differences
+DIFF_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0)
+
+
+class ModelStore:
+    """
+    Directory of model versions plus the serving.json pointer.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def versions(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name for name in os.listdir(self.path)
+                      if os.path.exists(os.path.join(self.path, name, MANIFEST_FILE)))
+
+    def manifest(self, version):
+        if version == BASELINE:
+            return {"version": BASELINE, "kind": "polynomial", "source": "calorie_burned/*.pkl"}
+        try:
+            with open(os.path.join(self.path, version, MANIFEST_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise ValueError(f"Unknown calorie model version '{version}'") from None
+
+    def load(self, version):
+        """
+        The compiled kernel of a version, tagged with its name as `kernel.version`.
+        """
+        if version == BASELINE:
+            kernel = load_kernel()
+        else:
+            self.manifest(version)
+            kernel = load_table(os.path.join(self.path, version))
+        kernel.version = version
+        return kernel
+
+    def add(self, kernel, manifest):
+        """
+        Store a compiled kernel under manifest["version"]. The directory is written
+        aside and renamed into place, so readers never see a partial version.
+        """
+        version = manifest["version"]
+        final = os.path.join(self.path, version)
+        staging = os.path.join(self.path, f".{version}.{os.getpid()}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        kernel.save(staging)
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        # Versions are named after their inputs; an existing one is the same model retrained
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(staging, final)
+        return final
+
+    def signature(self):
+        """
+        Identity of the current serving.json (None while there is none); changes on
+        every replacement.
+        """
+        try:
+            st = os.stat(os.path.join(self.path, SERVING_FILE))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def serving(self):
+        """
+        (signature, {"active": version, "shadow": version or None}), read consistently.
+        """
+        try:
+            with open(os.path.join(self.path, SERVING_FILE)) as f:
+                st = os.fstat(f.fileno())
+                serving = json.load(f)
+        except FileNotFoundError:
+            return None, {"active": BASELINE, "shadow": None}
+        return (st.st_ino, st.st_mtime_ns, st.st_size), {"active": serving["active"], "shadow": serving.get("shadow")}
+
+    def activate(self, version):
+        """
+        Make `version` the production model of every process serving from this store.
+        """
+        self.load(version)
+        self._update(active=version)
+
+    def set_shadow(self, version):
+        """
+        Score `version` alongside production (None stops shadow scoring).
+        """
+        if version is not None:
+            self.load(version)
+        self._update(shadow=version)
+
+    def _update(self, **changes):
+        with self._lock:
+            serving = {**self.serving()[1], **changes}
+            os.makedirs(self.path, exist_ok=True)
+            staging = os.path.join(self.path, f".{SERVING_FILE}.{os.getpid()}.tmp")
+            with open(staging, "w") as f:
+                json.dump(serving, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(staging, os.path.join(self.path, SERVING_FILE))
+
+
+class ServingModels:
+    """
+    The production and shadow kernels of this process, following the store's
+    serving.json. The production kernel is the registry's "calorie_kernel" entry.
+    """
+
+    def __init__(self, store, shadow_sample=1.0):
+        self.store = store
+        self.shadow_sample = shadow_sample
+        self.swaps = 0
+        self.failed_swaps = 0
+        self._signature = None
+        self._shadow = None
+        # version -> kernel of the versions currently serving, reused across swaps
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def load_active(self):
+        """
+        Registry loader: the active kernel named by serving.json (also loads the shadow).
+        """
+        signature, serving = self.store.serving()
+        loaded = {version: self._loaded.get(version) or self.store.load(version)
+                  for version in (serving["active"], serving["shadow"]) if version is not None}
+        self._loaded = loaded
+        self._shadow = loaded.get(serving["shadow"])
+        self._signature = signature
+        return loaded[serving["active"]]
+
+    def current(self):
+        """
+        The production kernel, swapped first if serving.json changed since last time.
+        """
+        if self.store.signature() != self._signature and registry.is_loaded("calorie_kernel"):
+            with self._lock:
+                signature = self.store.signature()
+                if signature != self._signature:
+                    try:
+                        registry.reload("calorie_kernel")
+                        self.swaps += 1
+                    except Exception:
+                        # Keep serving the previous version until serving.json changes again
+                        logger.exception("Could not load the calorie models named by serving.json")
+                        self.failed_swaps += 1
+                        self._signature = signature
+        return registry.get("calorie_kernel")
+
+    def shadow(self):
+        """
+        The shadow kernel if one is set and this call is sampled, else None.
+        """
+        shadow = self._shadow
+        if shadow is None or random.random() >= self.shadow_sample:
+            return None
+        return shadow
+
+    def compare(self, kernel, shadow, X, expected, seconds):
+        """
+        Score X with the shadow kernel and record it against the production result
+        `expected`, which took `seconds`. Failures are logged, never raised.
+        """
+        try:
+            start = time.perf_counter()
+            predicted = shadow.predict(X)
+            elapsed = time.perf_counter() - start
+        except Exception:
+            logger.exception("Shadow calorie model %s failed", shadow.version)
+            return
+        metrics.observe("calorie_model_seconds", seconds, model=kernel.version, role="production")
+        metrics.observe("calorie_model_seconds", elapsed, model=shadow.version, role="shadow")
+        if len(X):
+            diff = abs(predicted - expected)
+            metrics.observe("calorie_shadow_mean_abs_diff", float(diff.mean()), model=shadow.version)
+            metrics.observe("calorie_shadow_max_abs_diff", float(diff.max()), model=shadow.version)
+
+    def stats(self):
+        """
+        Serving choice of this process, plus the shadow comparison recorded so far.
+        """
+        kernel = self.current()
+        shadow = self._shadow
+        report = None
+        if shadow is not None:
+            seconds = metrics.totals("calorie_model_seconds")
+            production = seconds.get((("model", kernel.version), ("role", "production")), (0, 0.0))
+            candidate = seconds.get((("model", shadow.version), ("role", "shadow")), (0, 0.0))
+            mean_diff = metrics.totals("calorie_shadow_mean_abs_diff").get((("model", shadow.version),), (0, 0.0))
+            max_diff = metrics.totals("calorie_shadow_max_abs_diff").get((("model", shadow.version),), (0, 0.0))
+            report = {
+                "calls": candidate[0],
+                "production_mean_seconds": production[1] / production[0] if production[0] else None,
+                "shadow_mean_seconds": candidate[1] / candidate[0] if candidate[0] else None,
+                "mean_abs_diff_kcal": mean_diff[1] / mean_diff[0] if mean_diff[0] else None,
+                "mean_max_abs_diff_kcal": max_diff[1] / max_diff[0] if max_diff[0] else None,
+            }
+        return {
+            "active": kernel.version,
+            "shadow": shadow.version if shadow is not None else None,
+            "shadow_sample": self.shadow_sample,
+            "swaps": self.swaps,
+            "failed_swaps": self.failed_swaps,
+            "shadow_report": report,
+        }
+
+
+metrics.family("calorie_model_seconds", "Scoring time of sampled calls, production and shadow model.")
+metrics.family("calorie_shadow_mean_abs_diff", "Mean |shadow - production| kcal per sampled call.", DIFF_BUCKETS)
+metrics.family("calorie_shadow_max_abs_diff", "Max |shadow - production| kcal per sampled call.", DIFF_BUCKETS)
+
+calorie_models = ServingModels(
+    ModelStore(os.environ.get("CALORIE_MODEL_STORE", STORE_PATH)),
+    shadow_sample=float(os.environ.get("CALORIE_SHADOW_SAMPLE", 1.0)),
+)
+
+# The active calorie model of the store, by default the scaler -> poly -> lasso
+# pipeline compiled into a NumPy coefficient table (see calorie_kernel.py),
+# memory-mapped on first use
+registry.register("calorie_kernel", calorie_models.load_active)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List calorie model versions and choose the serving ones.")
+    parser.add_argument("--store", default=os.environ.get("CALORIE_MODEL_STORE", STORE_PATH))
+    parser.add_argument("--activate", metavar="VERSION")
+    parser.add_argument("--shadow", metavar="VERSION", help='version to shadow-score, "" to stop')
+    args = parser.parse_args()
+
+    store = ModelStore(args.store)
+    if args.activate:
+        store.activate(args.activate)
+    if args.shadow is not None:
+        store.set_shadow(args.shadow or None)
+
+    serving = store.serving()[1]
+    print(f"{'version':<32} {'kind':<14} {'MAE':>7} {'us/row':>8} {'us/call':>8}")
+    for version in [BASELINE] + store.versions():
+        manifest = store.manifest(version)
+        scores = manifest.get("metrics", {})
+        role = "active" if version == serving["active"] else "shadow" if version == serving["shadow"] else ""
+        print(f"{version:<32} {manifest['kind']:<14} {scores.get('mae', float('nan')):>7.3f} "
+              f"{scores.get('row_us', float('nan')):>8.2f} {scores.get('call_us', float('nan')):>8.1f} {role}")
+
+
+if __name__ == "__main__":
+    main()
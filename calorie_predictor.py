@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+
+from calorie_models import calorie_models
+from metrics import metrics
+
+# Feature order the scaler was fitted with
+FEATURES = ['Gender', 'Age', 'Height', 'Weight', 'Duration', 'Heart_Rate', 'Body_Temp']
+DURATION = FEATURES.index('Duration')
+
+# Max chunk size (minutes); longer sessions are scored as 60-minute chunks plus a remainder
+MAX_DURATION = 60
+
+
+def encode_gender(gender: str) -> int:
+    return 0 if gender.lower() == "male" else 1
+
+
+def records_matrix(records):
+    """
+    Build the (n_records, 7) feature matrix for a list of CalorieInput-like objects.
+    """
+    return np.array(
+        [[encode_gender(r.Gender), r.Age, r.Height, r.Weight, r.Duration, r.Heart_Rate, r.Body_Temp] for r in records],
+        dtype=np.float64,
+    ).reshape(-1, len(FEATURES))
+
+
+def round2(values):
+    """
+    Elementwise round(x, 2) with Python's (correctly rounded) semantics.
+
+    np.round(x, 2) agrees with it except where x * 100 lies within rounding error of a
+    half-way point, so only those elements are re-rounded in Python.
+    """
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9 * np.maximum(np.abs(scaled), 1)
+    for i in np.flatnonzero(near_tie).tolist():
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def predict_matrix(X):
+    """
+    Run the active calorie model once over a feature matrix whose columns follow FEATURES,
+    and the shadow model too when this call is sampled for shadow scoring.
+    """
+    # One kernel for the whole call, even if another version is activated meanwhile
+    kernel = calorie_models.current()
+    start = time.perf_counter()
+    predicted = kernel.predict(X)
+    shadow = calorie_models.shadow()
+    if shadow is not None:
+        calorie_models.compare(kernel, shadow, X, predicted, time.perf_counter() - start)
+    return predicted
+
+
+def predict_for_duration(data_dict):
+    """Helper function to predict calories for a given input dict"""
+    X = np.array([[data_dict[f] for f in FEATURES]], dtype=np.float64)
+    # Opt-in memoization; imported here because calorie_cache builds on this module
+    from calorie_cache import calorie_cache
+
+    if calorie_cache.enabled:
+        return calorie_cache.predict(X[0], chunked=False)
+    return predict_matrix(X)[0]
+
+
+def chunk_matrix(X):
+    """
+    Expand each record row into one row per full 60-minute chunk plus one for the
+    remainder (if any), mirroring the chunking rule of /predict_calories.
+
+    Returns (chunks, owner) where owner[i] is the record index of chunk row i.
+    """
+    duration = X[:, DURATION]
+    full_chunks = np.maximum(np.floor_divide(duration, MAX_DURATION), 0).astype(np.int64)
+    remainder = np.mod(duration, MAX_DURATION)
+    counts = full_chunks + (remainder > 0)
+
+    owner = np.repeat(np.arange(len(X)), counts)
+    chunks = X[owner]
+    # Position of each chunk within its record: full chunks first, remainder last
+    position = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    chunks[:, DURATION] = np.where(position < full_chunks[owner], MAX_DURATION, remainder[owner])
+    return chunks, owner
+
+
+def predict_records(X):
+    """
+    Total predicted calories per record, scoring every chunk of every record in a
+    single model pass and summing the chunk predictions back per record.
+    """
+    with metrics.stage("calorie_chunk"):
+        chunks, owner = chunk_matrix(X)
+    if len(chunks) == 0:
+        return np.zeros(len(X))
+    return np.bincount(owner, weights=predict_matrix(chunks), minlength=len(X))
+
+
+def predict_series(attributes, heart_rate, body_temp, timestamps=None, max_points=None):
+    """
+    Per-interval and cumulative calorie curve for a heart-rate / body-temperature trace.
+
+    Args:
+        attributes (dict): Fixed 'Gender', 'Age', 'Height', 'Weight' of the user.
+        heart_rate (list): Heart rate reading per sample.
+        body_temp (list): Body temperature reading per sample.
+        timestamps (list): Seconds since session start at which each sample was taken;
+            sample k covers (timestamps[k-1], timestamps[k]]. Defaults to one sample per minute.
+        max_points (int): If given, evenly downsample the returned series to at most this
+            many points (the last sample is always kept) for charting.
+
+    The cumulative value at a sample is the session prediction for the elapsed time so
+    far at the duration-weighted mean heart rate and body temperature, all samples being
+    scored in one model pass; per-interval values are its differences.
+    """
+    heart_rate = np.asarray(heart_rate, dtype=np.float64)
+    body_temp = np.asarray(body_temp, dtype=np.float64)
+    if timestamps is None:
+        elapsed = np.arange(1, len(heart_rate) + 1, dtype=np.float64)
+    else:
+        elapsed = np.asarray(timestamps, dtype=np.float64) / 60
+    interval = np.diff(elapsed, prepend=0.0)
+
+    X = np.empty((len(heart_rate), len(FEATURES)))
+    X[:, 0] = encode_gender(attributes['Gender'])
+    X[:, 1] = attributes['Age']
+    X[:, 2] = attributes['Height']
+    X[:, 3] = attributes['Weight']
+    X[:, DURATION] = elapsed
+    X[:, 5] = np.cumsum(heart_rate * interval) / elapsed
+    X[:, 6] = np.cumsum(body_temp * interval) / elapsed
+    cumulative = predict_records(X)
+
+    keep = np.arange(len(cumulative))
+    if max_points is not None and len(keep) > max_points:
+        keep = np.unique(np.linspace(0, len(keep) - 1, max_points).round().astype(np.int64))
+
+    return {
+        "minute": elapsed[keep].round(4).tolist(),
+        "calories": np.diff(cumulative[keep], prepend=0.0).round(2).tolist(),
+        "cumulative_calories": cumulative[keep].round(2).tolist(),
+        "total_calories": round(float(cumulative[-1]), 2) if len(cumulative) else 0.0,
+    }
@@ -0,0 +1,231 @@
+"""
+Workout and nutrition plans for a whole cohort of client profiles in one call.
+
+Profiles are grouped by their effective planning key: fitness level, goal, equipment
+set (normalized like plan_key, so "Dumbbell, barbell" and "Barbell,Dumbbell" share a
+group) and injury zones. A group is one unit of work: its catalog query runs once, each
+distinct availability among its members is assembled once (or served from the plan
+cache/table), and the nutrition targets of a large group are computed in one
+vectorized pass. Groups are spread over the CPU pool, which also encodes each group's
+NDJSON line, and the lines are streamed back in completion order:
+
+    {"group": 0, "fitness_level": "beginner", "goal": "fatloss", "equipment": [...],
+     "injury_zones": [...], "clients": 12, "seconds": 0.0012,
+     "plans": {"3": {"Day 1 - Full Body": [...], ...}, "5": {...}},
+     "results": [{"index": 3, "client_id": "c-3", "availability": 3, "weekly_volume": {...},
+                  "activity_level": "moderate", "nutrition": {...}}, ...]}
+
+Each distinct plan of a group is sent once, under its availability; members of a
+cohort mostly share them, and repeating the plan per member made up most of the output.
+`index` is the profile's position in the input and `seconds` the time the group took
+in its worker. A group that cannot be planned gets an "error" instead of "results". The
+stream ends with {"summary": {"groups", "clients", "seconds"}}.
+
+plans[availability] of a result equals /workout_planner for that profile and its
+nutrition /nutrition_plan, with the activity level derived from the plan's training
+days when the profile has none (as in /full_profile).
+
+Usage (from the repository root):
+    python cohort.py profiles.json                    # JSON list or NDJSON of profiles
+    python cohort.py profiles.json --output plans.ndjson --workers 4
+
+Benchmark against sequential per-profile planning: benchmarks/bench_cohort.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from exercise_catalog import get_catalog
+from metrics import metrics
+from nutrient import MACRO_TABLES, activity_level_for_training, get_macros_batch, get_macros_from_user_input
+from plan_cache import plan_key
+from workout_planner import get_workout_plans, weekly_volume
+
+# Fields of a profile sent to the group's worker besides the planning key
+MEMBER_FIELDS = ("client_id", "availability", "age", "gender", "height", "weight", "activity_level")
+BODY_FIELDS = ("weight", "height", "age", "gender")
+
+# Group size from which nutrition targets are computed with get_macros_batch: about
+# 5us per user for get_macros_from_user_input against 200us fixed for the batch
+NUTRITION_BATCH_MIN = 48
+
+
+def split_list(text):
+    return [item.strip() for item in (text or "").split(",") if item.strip()]
+
+
+def group_profiles(profiles, vocabulary):
+    """
+    Profiles (dicts with the /full_profile planning and body fields, optional
+    client_id and activity_level) grouped by planning key, as task dicts for
+    plan_group() in order of first appearance. Raises ValueError for an unknown fitness
+    level, goal or activity level.
+    """
+    groups = {}
+    for index, profile in enumerate(profiles):
+        fitness_level = MACRO_TABLES.canonical("fitness_level", profile["fitness_level"])
+        goal = MACRO_TABLES.canonical("goal", profile["goal"])
+        activity_level = profile.get("activity_level")
+        # The key without its availability: everything the catalog query depends on
+        fitness_key, goal_key, _, equipment, *injuries = plan_key(
+            fitness_level, goal, 0, split_list(profile["equipment_str"]), vocabulary,
+            split_list(profile.get("injury_str")))
+        key = (fitness_key, goal_key, equipment, injuries[0] if injuries else ())
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"group": len(groups), "fitness_level": fitness_level, "goal": goal,
+                                   "equipment": list(equipment), "injury_zones": list(key[3]), "members": []}
+        group["members"].append({
+            "index": index,
+            **{field: profile.get(field) for field in MEMBER_FIELDS},
+            "availability": int(profile["availability"]),
+            "activity_level": activity_level and MACRO_TABLES.canonical("activity_level", activity_level),
+        })
+    return list(groups.values())
+
+
+def group_nutrition(members, activity_levels, goal, fitness_level):
+    """
+    get_macros_from_user_input result of every member; large groups take the
+    vectorized path, whose fixed cost outweighs per-user calls below NUTRITION_BATCH_MIN.
+    """
+    if len(members) < NUTRITION_BATCH_MIN:
+        return [get_macros_from_user_input({**{field: m[field] for field in BODY_FIELDS}, "goal": goal,
+                                            "fitness_level": fitness_level, "activity_level": activity_level})
+                for m, activity_level in zip(members, activity_levels)]
+    columns = {field: [m[field] for m in members] for field in BODY_FIELDS}
+    nutrition = get_macros_batch({**columns, "activity_level": activity_levels, "goal": [goal] * len(members),
+                                  "fitness_level": [fitness_level] * len(members)})
+    nutrition = {field: values.tolist() for field, values in nutrition.items()}
+    return [{field: values[i] for field, values in nutrition.items()} for i in range(len(members))]
+
+
+def plan_group(group):
+    """
+    Plans and nutrition targets of every member of a group from group_profiles(), as
+    the group's NDJSON record.
+    """
+    start = time.perf_counter()
+    members = group["members"]
+    header = {field: group[field] for field in ("group", "fitness_level", "goal", "equipment", "injury_zones")}
+    try:
+        plans = get_workout_plans(group["fitness_level"], group["goal"], [m["availability"] for m in members],
+                                  group["equipment"], group["injury_zones"])
+        volumes = {availability: weekly_volume(plan) for availability, plan in plans.items()}
+        activity_levels = [m["activity_level"] or activity_level_for_training(volumes[m["availability"]]
+                                                                              ["training_days"]) for m in members]
+        with metrics.stage("cohort_nutrition"):
+            nutrition = group_nutrition(members, activity_levels, group["goal"], group["fitness_level"])
+    except ValueError as exc:
+        return {**header, "clients": len(members), "error": str(exc)}
+
+    results = [{
+        "index": m["index"],
+        "client_id": m["client_id"],
+        "availability": m["availability"],
+        "weekly_volume": volumes[m["availability"]],
+        "activity_level": activity_level,
+        "nutrition": targets,
+    } for m, activity_level, targets in zip(members, activity_levels, nutrition)]
+    seconds = time.perf_counter() - start
+    metrics.observe("cohort_group_seconds", seconds)
+    return {**header, "clients": len(members), "seconds": round(seconds, 6), "plans": plans, "results": results}
+
+
+def encode_record(record):
+    return json.dumps(record) + "\n"
+
+
+async def stream_groups(groups, run, window):
+    """
+    NDJSON lines of `groups` in completion order, keeping at most `window` of them in
+    flight; `run` is a coroutine function taking a group and returning its line. A
+    group whose task fails yields an error line; closing the generator cancels the
+    groups still in flight.
+    """
+    async def run_group(group):
+        try:
+            return await run(group)
+        except Exception as exc:
+            return encode_record({"group": group["group"], "clients": len(group["members"]),
+                                  "error": str(exc) or type(exc).__name__})
+
+    queued = iter(groups)
+    in_flight = set()
+    try:
+        while True:
+            for group in queued:
+                in_flight.add(asyncio.ensure_future(run_group(group)))
+                if len(in_flight) >= window:
+                    break
+            if not in_flight:
+                return
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+def summary_record(groups, start):
+    return {"summary": {"groups": len(groups), "clients": sum(len(group["members"]) for group in groups),
+                        "seconds": round(time.perf_counter() - start, 6)}}
+
+
+def read_profiles(path):
+    """
+    Profiles from a JSON list or an NDJSON file.
+    """
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+async def plan_cohort(profiles, executor, out):
+    """
+    Write the NDJSON records of a cohort to `out`, planning its groups on `executor`.
+    """
+    from cpu_pool import plan_cohort_group
+
+    start = time.perf_counter()
+    groups = group_profiles(profiles, get_catalog().equipment_vocabulary)
+    window = min(executor.max_pending, executor.workers * 2)
+    async for line in stream_groups(groups, lambda group: executor.run_when_free(plan_cohort_group, group), window):
+        out.write(line)
+    out.write(encode_record(summary_record(groups, start)))
+
+
+metrics.family("cohort_group_seconds", "Time to plan one cohort group in its worker.")
+
+
+def main():
+    from cpu_pool import CpuExecutor
+
+    parser = argparse.ArgumentParser(description="Workout and nutrition plans for a cohort of profiles.")
+    parser.add_argument("profiles", help="JSON list or NDJSON file of profiles")
+    parser.add_argument("--output", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--mode", choices=["thread", "process"], default="process")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    executor = CpuExecutor(args.mode, args.workers, timeout=600.0)
+    executor.start()
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        asyncio.run(plan_cohort(read_profiles(args.profiles), executor, out))
+    except (KeyError, ValueError) as exc:
+        sys.exit(f"Invalid profiles: {exc}")
+    finally:
+        executor.shutdown()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
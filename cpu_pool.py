@@ -0,0 +1,260 @@
+"""
+Execution of the CPU-bound request work (workout planning, calorie and nutrition
+scoring) off the event loop.
+
+Configured through environment variables:
+- EXECUTION_MODE: "thread" (default) runs tasks in a dedicated thread pool; "process"
+  runs them in a pre-warmed process pool so throughput scales with cores instead of
+  being serialized by the GIL.
+- CPU_WORKERS: pool size (default: number of cores).
+- CPU_MAX_PENDING: tasks allowed in flight (running or queued) before new ones are
+  rejected with PoolSaturated (default: 16 per worker, at least 64, about what the
+  default thread pool of the event loop queued before).
+- CPU_TIMEOUT: seconds a caller waits for its task before TaskTimeout (default: 30).
+- CPU_START_METHOD: multiprocessing start method for process mode (default: spawn).
+
+Each process worker loads every subsystem (see readiness.py), including the calorie
+kernel and the exercise catalog, once in its initializer before it accepts work; the
+main process then only warms the parts it serves itself (MAIN_PROCESS_SUBSYSTEMS).
+Tasks import their modules when first run, so importing this module stays cheap.
+Workers buffer their stage metrics and return them with every result, together with
+the increments of the plan cache, plan table and calorie cache counters (hits, misses,
+builds...), so /metrics and the /admin cache stats in the main process cover the work
+of all workers. Gauges such as the entries of an in-process cache stay per process.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import SimpleNamespace
+
+from metrics import metrics
+from profiler import profile_call, request_profiles
+from readiness import Subsystems
+
+
+class PoolSaturated(Exception):
+    """Raised when CPU_MAX_PENDING tasks are already in flight."""
+
+
+class TaskTimeout(Exception):
+    """Raised when a task does not finish within CPU_TIMEOUT seconds."""
+
+
+# ========== Tasks (top-level so they can be pickled to process workers) ==========
+def plan_workout(request):
+    """Run workout_planner.main for a WorkoutRequest given as a plain dict."""
+    from workout_planner import main as plan_workout_main
+
+    return plan_workout_main(SimpleNamespace(**request))
+
+
+def plan_program(request):
+    """Periodized program for a WorkoutProgramRequest given as a plain dict."""
+    from workout_program import recent_programs
+
+    equipment_available = [eq.strip() for eq in request["equipment_str"].split(",") if eq.strip()]
+    injury_zones = [zone.strip() for zone in request["injury_str"].split(",") if zone.strip()]
+    return recent_programs.get_plan(request["fitness_level"], request["goal"], request["availability"],
+                                    equipment_available, request["weeks"], injury_zones)
+
+
+def score_series(attributes, heart_rate, body_temp, timestamps, max_points):
+    from calorie_predictor import predict_series
+
+    return predict_series(attributes, heart_rate, body_temp, timestamps=timestamps, max_points=max_points)
+
+
+def nutrition_batch(columns):
+    """get_macros_batch over request columns, as JSON-ready lists."""
+    from nutrient import get_macros_batch
+
+    return {field: values.tolist() for field, values in get_macros_batch(columns).items()}
+
+
+def search_catalog(text, limit, offset, constraints):
+    """exercise_query.search over the shared catalog, for /exercises/search."""
+    from exercise_catalog import get_catalog
+    from exercise_query import search
+
+    return search(get_catalog(), text=text, limit=limit, offset=offset, **constraints)
+
+
+def group_cohort(profiles):
+    """Groups of a cohort's profiles (dicts), keyed against the catalog's equipment (see cohort.py)."""
+    from cohort import group_profiles
+    from exercise_catalog import get_catalog
+
+    return group_profiles(profiles, get_catalog().equipment_vocabulary)
+
+
+def plan_cohort_group(group):
+    """NDJSON line of plans and nutrition targets for one group of a cohort (see cohort.py)."""
+    from cohort import encode_record, plan_group
+
+    return encode_record(plan_group(group))
+
+
+def _run_task(fn, args, profile):
+    """
+    fn(*args) as run in the pool: returns (result, metrics and counter increments
+    buffered by a process worker, collapsed profile of the call if `profile`).
+    """
+    if profile:
+        result, collapsed = profile_call(fn, *args)
+    else:
+        result, collapsed = fn(*args), None
+    return result, metrics.drain(), collapsed
+
+
+def _init_worker():
+    metrics.buffer()
+    # Everything the tasks use, whatever part of it the main process warms
+    worker = Subsystems()
+    if not worker.warm():
+        raise RuntimeError(f"Worker warm-up failed: {worker.error}")
+
+
+def _ready():
+    return os.getpid()
+
+
+class CpuExecutor:
+    def __init__(self, mode="thread", workers=None, max_pending=None, timeout=30.0, start_method="spawn"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown execution mode '{mode}', expected 'thread' or 'process'")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or max(64, self.workers * 16)
+        self.timeout = timeout
+        self.start_method = start_method
+        self._pool = None
+        self._started = []
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def start(self, wait=True):
+        """
+        Create the pool; in process mode also start every worker and its initializer,
+        blocking until they are done unless `wait` is False (see wait_ready()), so the
+        first requests do not pay for it.
+        """
+        if self._pool is not None:
+            return
+        if self.mode == "process":
+            context = multiprocessing.get_context(self.start_method)
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker)
+            self._started = [self._pool.submit(_ready) for _ in range(self.workers)]
+        else:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="cpu")
+        if wait:
+            self.wait_ready()
+
+    def wait_ready(self):
+        for future in self._started:
+            future.result()
+
+    @property
+    def ready(self):
+        """Whether the pool exists and its workers have run their initializer."""
+        return self._pool is not None and all(future.done() and future.exception() is None
+                                              for future in self._started)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) in the pool and await its result.
+
+        Raises PoolSaturated without queueing when max_pending tasks are already in
+        flight, and TaskTimeout when the result takes longer than `timeout` seconds.
+        The call is profiled when the current request asked for a profile.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolSaturated()
+        if self._pool is None:
+            self.start()
+
+        # pending is only touched from the event loop thread, so no lock is needed
+        profiles = request_profiles.get()
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        future = self._pool.submit(_run_task, fn, args, profiles is not None)
+        # The slot is held until the task is done, not until the caller stops waiting:
+        # cancel() cannot stop a task that is already running after a timeout or a
+        # client disconnect
+        future.add_done_callback(lambda _: self._release(loop))
+        try:
+            result, drained, profile = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            raise TaskTimeout()
+        self.completed += 1
+        metrics.merge(drained)
+        if profile is not None:
+            profiles.append({"task": fn.__name__, "collapsed": profile})
+        return result
+
+    def _release(self, loop):
+        try:
+            loop.call_soon_threadsafe(self._release_slot)
+        except RuntimeError:
+            # The loop has been closed; nothing waits on the count any more
+            pass
+
+    def _release_slot(self):
+        self.pending -= 1
+
+    async def run_when_free(self, fn, *args, poll=0.01):
+        """
+        run(), waiting for a free slot instead of raising PoolSaturated; for work a
+        streaming response has already committed to.
+        """
+        while True:
+            try:
+                return await self.run(fn, *args)
+            except PoolSaturated:
+                await asyncio.sleep(poll)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "ready": self.ready,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+cpu = CpuExecutor(
+    mode=os.environ.get("EXECUTION_MODE", "thread"),
+    workers=int(os.environ.get("CPU_WORKERS", 0)) or None,
+    max_pending=int(os.environ.get("CPU_MAX_PENDING", 0)) or None,
+    timeout=float(os.environ.get("CPU_TIMEOUT", 30)),
+    start_method=os.environ.get("CPU_START_METHOD", "spawn"),
+)
+
+
+def _collect():
+    stats = cpu.stats()
+    labels = {"mode": stats["mode"]}
+    return [
+        ("cpu_pool_workers", "gauge", "Worker threads or processes.", [(labels, stats["workers"])]),
+        ("cpu_pool_pending", "gauge", "Tasks running or queued.", [(labels, stats["pending"])]),
+        ("cpu_pool_completed_total", "counter", "Tasks completed.", [(labels, stats["completed"])]),
+        ("cpu_pool_rejected_total", "counter", "Tasks rejected with 429.", [(labels, stats["rejected"])]),
+        ("cpu_pool_timeouts_total", "counter", "Tasks that timed out with 504.", [(labels, stats["timeouts"])]),
+    ]
+
+
+metrics.register_collector(_collect)
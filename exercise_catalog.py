@@ -0,0 +1,317 @@
+"""
+Shared exercise catalog, loaded from a compact columnar build of exercise.csv.
+
+The CSV has 30 columns with padded headers. The build step keeps the ones the planner
+and the query engine (exercise_query.py) use, under normalized column names
+(COLUMNS), and stores each one as an array of integer codes (.npy) into a string
+dictionary held in a JSON header. Missing cells get code -1. The header also records
+the SHA-256 of the source CSV, and loading rebuilds the artifact whenever that no
+longer matches, so editing exercise.csv is enough to refresh it.
+
+Loading memory-maps the code arrays read-only (workers share the pages) and derives
+the lookup indexes and query bitsets from them; no CSV parsing happens and no
+DataFrame is built unless ExerciseCatalog.df is used.
+
+Usage (from the repository root):
+    python exercise_catalog.py            # build exercise_columns/ from exercise.csv
+    python exercise_catalog.py --check    # also verify the artifact against the CSV
+"""
+import argparse
+import hashlib
+import io
+import itertools
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from exercise_query import ExerciseIndex
+from model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+EXERCISE_CSV = "exercise.csv"
+ARTIFACT_PATH = os.environ.get("CATALOG_ARTIFACT_PATH", "exercise_columns")
+
+# Bumped whenever the artifact layout or COLUMNS change, forcing a rebuild
+ARTIFACT_FORMAT = 2
+
+# Normalized column name -> CSV header it is built from
+COLUMNS = {
+    "exercise": "Exercise",
+    "difficulty_level": "Difficulty Level",
+    "target_muscle_group": "Target Muscle Group ",
+    "primary_equipment": "Primary Equipment ",
+    "secondary_equipment": "Secondary Equipment",
+    "primary_exercise_classification": "Primary Exercise Classification",
+    "prime_mover_muscle": "Prime Mover Muscle",
+    "secondary_muscle": "Secondary Muscle",
+    "tertiary_muscle": "Tertiary Muscle",
+    "posture": "Posture",
+    "movement_pattern_1": "Movement Pattern #1",
+    "movement_pattern_2": "Movement Pattern #2",
+    "movement_pattern_3": "Movement Pattern #3",
+    "plane_of_motion_1": "Plane Of Motion #1",
+    "plane_of_motion_2": "Plane Of Motion #2",
+    "plane_of_motion_3": "Plane Of Motion #3",
+    "body_region": "Body Region",
+    "force_type": "Force Type",
+    "mechanics": "Mechanics",
+    "laterality": "Laterality",
+}
+
+# Process-wide load counter, so every (re)load gets a version no other catalog had
+_versions = itertools.count(1)
+
+
+def normalize_equipment(series):
+    """
+    Stripped, lowercased equipment names, with missing values spelled 'nan' exactly
+    like str() of a missing cell.
+    """
+    return series.fillna('nan').astype(str).str.strip().str.lower()
+
+
+def file_checksum(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def encode_csv(csv_path=EXERCISE_CSV):
+    """
+    (header, {column: codes}) of the COLUMNS of `csv_path`, as stored in the artifact.
+    """
+    with open(csv_path, "rb") as f:
+        raw = f.read()
+    df = pd.read_csv(io.BytesIO(raw), usecols=list(COLUMNS.values()))
+    header = {"format": ARTIFACT_FORMAT, "source_sha256": hashlib.sha256(raw).hexdigest(), "rows": len(df),
+              "columns": {}}
+    codes = {}
+    for name, source in COLUMNS.items():
+        column_codes, dictionary = pd.factorize(df[source])
+        dtype = np.int16 if len(dictionary) < np.iinfo(np.int16).max else np.int32
+        codes[name] = column_codes.astype(dtype)
+        header["columns"][name] = {"source": source, "dictionary": [str(value) for value in dictionary]}
+    return header, codes
+
+
+def build_artifact(csv_path=EXERCISE_CSV, path=ARTIFACT_PATH):
+    """
+    Encode `csv_path` into the columnar artifact at `path` and return its header.
+
+    The new artifact is written next to `path` and swapped in with renames, so a
+    concurrent loader sees either the old or the new one, never a mix.
+    """
+    header, codes = encode_csv(csv_path)
+    staging = f"{path}.tmp{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name in COLUMNS:
+        np.save(os.path.join(staging, f"{name}.npy"), codes[name])
+    with open(os.path.join(staging, "catalog.json"), "w") as f:
+        json.dump(header, f)
+
+    retired = f"{path}.old{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, retired)
+    os.replace(staging, path)
+    # Mappings of the retired files stay valid after they are unlinked
+    shutil.rmtree(retired, ignore_errors=True)
+    return header
+
+
+def read_artifact(path=ARTIFACT_PATH):
+    """
+    (header, {column: memory-mapped codes}) of a built artifact, or None when it is
+    missing or in an older format.
+    """
+    try:
+        with open(os.path.join(path, "catalog.json")) as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if header.get("format") != ARTIFACT_FORMAT or header.get("columns", {}).keys() != COLUMNS.keys():
+        return None
+    codes = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+    return header, codes
+
+
+def load_artifact(csv_path=EXERCISE_CSV, path=ARTIFACT_PATH):
+    """
+    Header and code arrays for `csv_path`, rebuilding the artifact first when it is
+    missing, outdated or was built from a different CSV.
+    """
+    checksum = file_checksum(csv_path)
+    artifact = read_artifact(path)
+    if artifact is None or artifact[0]["source_sha256"] != checksum:
+        try:
+            build_artifact(csv_path, path)
+        except OSError:
+            # Read-only deployment: use an in-memory build for this process
+            logger.warning("Could not write %s; building the catalog in memory", path, exc_info=True)
+            return encode_csv(csv_path)
+        artifact = read_artifact(path)
+    return artifact
+
+
+def decode(codes, dictionary):
+    """
+    Object array of the column's values, NaN where the cell was missing.
+    """
+    values = np.array(list(dictionary) + [np.nan], dtype=object)
+    # Code -1 picks the trailing NaN
+    return values[codes]
+
+
+def _positions(codes, keys):
+    """
+    Map every distinct key to the sorted row positions whose code has that key.
+    keys[code] is the key of dictionary entry `code` and keys[-1] the key of missing
+    cells; entries whose key is None are left out.
+    """
+    positions = {}
+    for code, key in zip(list(range(len(keys) - 1)) + [-1], keys):
+        if key is None:
+            continue
+        rows = np.flatnonzero(codes == code)
+        if len(rows):
+            positions[key] = np.union1d(positions[key], rows) if key in positions else rows
+    return positions
+
+
+class ExerciseCatalog:
+    """
+    In-process exercise catalog backed by the columnar artifact of exercise.csv.
+
+    Holds the exercise names by row position, `by_primary_equipment` (stripped,
+    lowercased primary equipment -> sorted positions of the rows that use it) and
+    `equipment_vocabulary`, one integer code per stripped, lowercased equipment name of
+    either equipment column.
+
+    `index` holds the bitsets of every stored column for multi-constraint queries
+    (see exercise_query.py); the planner runs on it.
+
+    `df` (normalized column names, RangeIndex so that row labels are catalog
+    positions) is only materialized when first accessed.
+
+    A catalog never changes once built: a reload builds a new one and swaps the
+    registry entry, so a request that took one catalog sees a single consistent load.
+    """
+
+    def __init__(self, csv_path=EXERCISE_CSV, artifact_path=ARTIFACT_PATH):
+        self.csv_path = csv_path
+        self.artifact_path = artifact_path
+        self.mtime = os.path.getmtime(csv_path)
+        header, codes = load_artifact(csv_path, artifact_path)
+        dictionaries = {name: column["dictionary"] for name, column in header["columns"].items()}
+
+        self.codes = codes
+        self.dictionaries = dictionaries
+        self.size = header["rows"]
+        self._df = None
+        self.exercise_names = decode(codes["exercise"], dictionaries["exercise"])
+
+        # Per-column equipment keys (missing cells read as 'nan'), then one vocabulary for both
+        primary_keys = [value.strip().lower() for value in dictionaries["primary_equipment"]] + ['nan']
+        secondary_keys = [value.strip().lower() for value in dictionaries["secondary_equipment"]] + ['nan']
+        vocabulary = {}
+        for key in primary_keys + secondary_keys:
+            vocabulary.setdefault(key, len(vocabulary))
+        self.equipment_vocabulary = vocabulary
+        self.by_primary_equipment = _positions(codes["primary_equipment"], primary_keys)
+        # One bitset per facet value for multi-constraint queries
+        self.index = ExerciseIndex(codes, dictionaries, self.size)
+        self.checksum = header["source_sha256"]
+        self.version = next(_versions)
+
+    @property
+    def df(self):
+        """
+        The catalog columns as a DataFrame, built on first access.
+        """
+        df = self._df
+        if df is None:
+            df = self._df = pd.DataFrame({name: decode(self.codes[name], self.dictionaries[name])
+                                          for name in COLUMNS})
+        return df
+
+    def is_stale(self):
+        """
+        True when the CSV's modification time changed since this catalog was loaded.
+        """
+        try:
+            return os.path.getmtime(self.csv_path) != self.mtime
+        except OSError:
+            return False
+
+    def records(self, rows):
+        """
+        Every stored column of the given rows, as dicts with None for missing cells.
+        """
+        return [{name: (self.dictionaries[name][code] if code >= 0 else None)
+                 for name, code in zip(COLUMNS, codes)}
+                for codes in zip(*(self.codes[name][rows].tolist() for name in COLUMNS))]
+
+    def __len__(self):
+        return self.size
+
+
+registry.register("exercise_catalog", lambda: ExerciseCatalog(EXERCISE_CSV))
+_reload_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    Return the shared catalog, building it on first use and replacing it with a fresh
+    load when the underlying CSV has been modified (the artifact is rebuilt if its
+    content changed too). Callers should take it once per request and keep using that
+    object.
+    """
+    catalog = registry.get("exercise_catalog")
+    if catalog.is_stale():
+        with _reload_lock:
+            catalog = registry.get("exercise_catalog")
+            if catalog.is_stale():
+                catalog = registry.reload("exercise_catalog")
+    return catalog
+
+
+def check_artifact(header, codes, csv_path=EXERCISE_CSV):
+    """
+    Names of the columns whose decoded values differ from the CSV.
+    """
+    df = pd.read_csv(csv_path, usecols=list(COLUMNS.values()))
+    mismatched = []
+    for name, source in COLUMNS.items():
+        decoded = pd.Series(decode(codes[name], header["columns"][name]["dictionary"]))
+        if not decoded.equals(pd.Series(df[source].to_numpy(dtype=object))):
+            mismatched.append(name)
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the columnar exercise catalog artifact from the CSV.")
+    parser.add_argument("--csv", default=EXERCISE_CSV)
+    parser.add_argument("--output", default=ARTIFACT_PATH)
+    parser.add_argument("--check", action="store_true", help="verify the artifact decodes back to the CSV")
+    args = parser.parse_args()
+
+    header = build_artifact(args.csv, args.output)
+    size = sum(os.path.getsize(os.path.join(args.output, name)) for name in os.listdir(args.output))
+    print(f"Wrote {args.output}: {header['rows']} rows, {len(COLUMNS)} columns, {size} bytes "
+          f"(source {os.path.getsize(args.csv)} bytes)")
+
+    if args.check:
+        mismatched = check_artifact(*read_artifact(args.output), args.csv)
+        print(f"Columns differing from the CSV: {', '.join(mismatched) or 'none'}")
+        if mismatched:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Bitset query engine over the exercise catalog.
+
+Every (facet, value) pair of the catalog gets one bitset over the catalog rows, built
+once per catalog load from the artifact's code arrays. A query is then a handful of
+AND/OR/NOT operations on uint64 words (49 words for the shipped 3079 rows) followed by
+one unpack into row positions; no rows are copied and no DataFrame is built.
+
+Bitsets are read-only uint64 arrays where bit i % 64 of word i // 64 is set when row
+i matches. Values are normalized like the planner's filters (stripped, lowercased) and
+missing cells are filed under 'nan'.
+
+Constraints supported by ExerciseIndex.match:
+- facet=[values]: the row's value is one of `values` (OR within a facet, AND across)
+- muscle=[names]: the target muscle group contains one of the names, the substring
+  rule /workout_planner uses for its day muscles
+- equipment=[names]: doable with that equipment only (primary available, secondary
+  missing or available)
+- exclude_injuries=[zones]: drop rows whose target muscle group or prime mover
+  contains one of the zones
+"""
+import numpy as np
+
+# Query facet -> catalog columns it is built from; a row has a value if any of them holds it
+FACETS = {
+    "difficulty": ["difficulty_level"],
+    "target_muscle": ["target_muscle_group"],
+    "prime_mover": ["prime_mover_muscle"],
+    "secondary_muscle": ["secondary_muscle"],
+    "tertiary_muscle": ["tertiary_muscle"],
+    "primary_equipment": ["primary_equipment"],
+    "secondary_equipment": ["secondary_equipment"],
+    "classification": ["primary_exercise_classification"],
+    "body_region": ["body_region"],
+    "movement_pattern": ["movement_pattern_1", "movement_pattern_2", "movement_pattern_3"],
+    "plane_of_motion": ["plane_of_motion_1", "plane_of_motion_2", "plane_of_motion_3"],
+    "force_type": ["force_type"],
+    "mechanics": ["mechanics"],
+    "laterality": ["laterality"],
+    "posture": ["posture"],
+}
+
+# Secondary Equipment values that mean "no secondary equipment needed"
+NO_EQUIPMENT = {'', 'none', 'nan'}
+
+# Facets an injury zone is matched against
+INJURY_FACETS = ("target_muscle", "prime_mover")
+
+# Substring and exact-value lookups remembered per index (queries can carry arbitrary text)
+MAX_CACHED_SUBSTRINGS = 1024
+
+WORD_BITS = 64
+
+
+def normalize(value):
+    return str(value).strip().lower()
+
+
+class ExerciseIndex:
+    """
+    Per-value bitsets of one catalog load.
+    """
+
+    def __init__(self, codes, dictionaries, size):
+        self.size = size
+        self.words = -(-size // WORD_BITS)
+        self._codes = codes
+        self._dictionaries = dictionaries
+        self.all = self._freeze(self.pack(np.ones(size, dtype=bool)))
+        self.facets = {}
+        rows = np.arange(size)
+        for facet, columns in FACETS.items():
+            # Normalized key -> row of the facet's bitset matrix; raw values that normalize
+            # to the same key (and the same value in several columns) share one row
+            key_ids = {}
+            column_ids = []
+            for column in columns:
+                # Code -1 (missing) is looked up at position 0
+                lookup = np.array([key_ids.setdefault(key, len(key_ids))
+                                   for key in ['nan'] + [normalize(value) for value in dictionaries[column]]])
+                column_ids.append(lookup[np.asarray(codes[column]) + 1])
+            mask = np.zeros((len(key_ids), size), dtype=bool)
+            for ids in column_ids:
+                mask[ids, rows] = True
+            matrix = self._freeze(self.pack(mask))
+            present = mask.any(axis=1)
+            self.facets[facet] = {key: matrix[i] for key, i in key_ids.items() if present[i]}
+        self._substrings = {}
+        self._exact = {}
+
+    @staticmethod
+    def _freeze(bits):
+        bits.flags.writeable = False
+        return bits
+
+    def pack(self, mask):
+        """
+        Bitsets of boolean row masks; `mask` is (size,) or (n_masks, size).
+        """
+        padded = np.zeros(mask.shape[:-1] + (self.words * WORD_BITS,), dtype=bool)
+        padded[..., :self.size] = mask
+        return np.packbits(padded, axis=-1, bitorder="little").view("<u8")
+
+    def empty(self):
+        return np.zeros(self.words, dtype="<u8")
+
+    def from_positions(self, rows):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return self.pack(mask)
+
+    def positions(self, bits):
+        """
+        Sorted row positions of the set bits.
+        """
+        return np.flatnonzero(np.unpackbits(bits.view(np.uint8), count=self.size, bitorder="little"))
+
+    def count(self, bits):
+        return int(np.bitwise_count(bits).sum())
+
+    def invert(self, bits):
+        return ~bits & self.all
+
+    def values(self, facet):
+        """
+        The normalized values present for a facet.
+        """
+        return list(self._facet(facet))
+
+    def _facet(self, facet):
+        try:
+            return self.facets[facet]
+        except KeyError:
+            raise ValueError(f"Unknown facet '{facet}', expected one of {', '.join(FACETS)}") from None
+
+    def any_of(self, facet, values, exact=False):
+        """
+        Rows whose value for `facet` is one of `values`; unknown values match nothing.
+        With exact=True the values are compared as stored, without normalizing.
+        """
+        index = self._facet(facet)
+        result = self.empty()
+        if exact:
+            for value in set(values):
+                result |= self._exact_bits(facet, value)
+            return result
+        for key in {normalize(value) for value in values}:
+            if key in index:
+                result |= index[key]
+        return result
+
+    def _exact_bits(self, facet, value):
+        bits = self._exact.get((facet, value))
+        if bits is None:
+            mask = np.zeros(self.size, dtype=bool)
+            for column in FACETS[facet]:
+                dictionary = self._dictionaries[column]
+                if value in dictionary:
+                    mask |= np.asarray(self._codes[column]) == dictionary.index(value)
+            bits = self._freeze(self.pack(mask))
+            if len(self._exact) < MAX_CACHED_SUBSTRINGS:
+                self._exact[(facet, value)] = bits
+        return bits
+
+    def containing(self, facet, text):
+        """
+        Rows whose (non-missing) value for `facet` contains `text`, case-insensitively.
+        """
+        needle = normalize(text)
+        bits = self._substrings.get((facet, needle))
+        if bits is None:
+            bits = self.empty()
+            for key, key_bits in self._facet(facet).items():
+                if key != 'nan' and needle in key:
+                    bits |= key_bits
+            self._freeze(bits)
+            if len(self._substrings) < MAX_CACHED_SUBSTRINGS:
+                self._substrings[(facet, needle)] = bits
+        return bits
+
+    def usable_with(self, equipment):
+        """
+        Rows whose primary equipment is in `equipment` and whose secondary equipment
+        is missing or in it too (the /workout_planner equipment rule).
+        """
+        avail = {normalize(name) for name in equipment}
+        return self.any_of("primary_equipment", avail) & self.any_of("secondary_equipment", avail | NO_EQUIPMENT)
+
+    def affecting(self, zones):
+        """
+        Rows that load one of the injury `zones`: the zone is part of the target muscle
+        group or of the prime mover muscle.
+        """
+        result = self.empty()
+        for zone in zones:
+            if normalize(zone):
+                for facet in INJURY_FACETS:
+                    result |= self.containing(facet, zone)
+        return result
+
+    def match(self, equipment=None, muscle=None, exclude_injuries=None, **constraints):
+        """
+        Bitset of the rows meeting every given constraint (see the module docstring);
+        None or an omitted constraint does not restrict.
+        """
+        bits = self.all.copy()
+        for facet, values in constraints.items():
+            if values is not None:
+                bits &= self.any_of(facet, values)
+        if muscle is not None:
+            found = self.empty()
+            for name in muscle:
+                found |= self.containing("target_muscle", name)
+            bits &= found
+        if equipment is not None:
+            bits &= self.usable_with(equipment)
+        if exclude_injuries:
+            bits &= self.invert(self.affecting(exclude_injuries))
+        return bits
+
+
+def search(catalog, text=None, limit=50, offset=0, **constraints):
+    """
+    (total, [exercise record, ...]) of the catalog rows matching `constraints` (as in
+    ExerciseIndex.match) whose name contains `text`, in catalog order, paginated.
+    """
+    rows = catalog.index.positions(catalog.index.match(**constraints))
+    if text:
+        needle = text.strip().lower()
+        names = catalog.exercise_names
+        # A catalog row without an exercise name decodes to NaN and never matches
+        rows = [row for row in rows.tolist() if isinstance(names[row], str) and needle in names[row].lower()]
+    return len(rows), catalog.records(rows[offset:offset + limit])
@@ -1,21 +1,79 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List
+import asyncio
+from contextlib import asynccontextmanager
+import logging
+import os
+import time
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, Field, RootModel, ValidationInfo, conlist, field_validator, model_validator
+from pydantic_core import PydanticKnownError
+from typing import Dict, List, Optional, Union
 from workout_generator import generate_plan
-from workout_planner import main
-from nutrient import get_macros_from_user_input
-import json
-import joblib
-import numpy as np
-import pandas as pd
+# Only light modules are imported here; endpoints import the subsystems they use (pandas,
+# NumPy, the catalog, the calorie kernel) on first call, see readiness.py
+from nutrient import MACRO_TABLES, activity_level_for_training, get_macros_from_user_input
+from model_registry import registry
+from plan_cache import plan_cache
+from cpu_pool import (PoolSaturated, TaskTimeout, cpu, group_cohort, nutrition_batch, plan_cohort_group, plan_program,
+                      plan_workout, score_series, search_catalog)
+from metrics import metrics
+from profiler import profiles, request_profiles
+from readiness import subsystems
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
-# Load model components
-scaler = joblib.load("calorie_burned/scaler.pkl")
-poly = joblib.load("calorie_burned/poly.pkl")
-model = joblib.load("calorie_burned/lasso_model.pkl")
+# Set MODEL_WARMUP=0 to load every subsystem on first use instead of warming up at startup
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "1") != "0"
+
+STARTED = time.time()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Thread or pre-warmed process pool for the CPU-bound work (see cpu_pool.py); process
+    # workers warm up in parallel with this process
+    cpu.start(wait=False)
+    if cpu.mode == "process":
+        # The workers load the catalog, models and caches for their tasks themselves
+        subsystems.main_process_only()
+    # Load every subsystem (the calorie kernel, the exercise catalog, ...) in the
+    # background: /healthz answers at once and /readyz turns 200 when this is done
+    if MODEL_WARMUP:
+        app.state.warmup = asyncio.create_task(asyncio.to_thread(subsystems.warm))
+    else:
+        subsystems.warmup = "disabled"
+    yield
+    cpu.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    # Opt-in profiling: while enabled (REQUEST_PROFILING=1 or POST /admin/profiling),
+    # requests sent with "X-Profile: 1" get their CPU-pool work sampled
+    collected = [] if profiles.enabled and request.headers.get("x-profile") == "1" else None
+    token = request_profiles.set(collected)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_profiles.reset(token)
+    # Route templates, not raw URLs, keep the label set bounded
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    metrics.observe("http_request_duration_seconds", time.perf_counter() - start,
+                    path=path, method=request.method, status=response.status_code)
+    if collected:
+        response.headers["X-Profile-Id"] = profiles.add(path, collected)
+    return response
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    return JSONResponse(status_code=429, content={"detail": "Server busy, retry later"})
+
+@app.exception_handler(TaskTimeout)
+async def task_timeout_handler(request: Request, exc: TaskTimeout):
+    return JSONResponse(status_code=504, content={"detail": "Request timed out"})
 
 class CalorieInput(BaseModel):
     Gender: str
@@ -26,74 +84,201 @@ class CalorieInput(BaseModel):
     Heart_Rate: float
     Body_Temp: float
 
-def encode_gender(gender: str) -> int:
-    return 0 if gender.lower() == "male" else 1
+# Upper bound on records accepted by /predict_calories_batch
+MAX_BATCH_RECORDS = 10000
+# Upper bound on samples accepted by /predict_calories_series
+MAX_SERIES_SAMPLES = 24 * 60 * 60
+
+async def memoized_calories(record):
+    """
+    Calories for one feature row through the calorie cache (see calorie_cache.py): hits
+    are answered without the CPU pool, misses score the row's cells there, once for all
+    the concurrent calls (and, on a shared backend, workers) missing the same cells.
+    """
+    from cache_backends import call_backend
+    from calorie_cache import calorie_cache, score_cells
+    from calorie_models import calorie_models
+    from calorie_predictor import predict_records
+
+    cells = calorie_cache.cells(record)
+    backend = calorie_cache.backend
 
-def predict_for_duration(data_dict):
-    """Helper function to predict calories for a given input dict"""
-    df = pd.DataFrame([data_dict])
-    scaled = scaler.transform(df)
-    poly_feat = poly.transform(scaled)
-    pred = model.predict(poly_feat)[0]
-    return pred
+    def lookup():
+        version = calorie_models.current().source_digest
+        return (version, *calorie_cache.lookup(cells, version))
+
+    # A shared backend is read and written in threads, never on the event loop
+    version, total, servable = await call_backend(backend, lookup)
+    if total is not None:
+        return total
+    exact = None
+
+    async def score():
+        nonlocal exact
+        # Filled under the version that scored the cells, which a hot swap may have changed
+        exact, values, bounds, scored_version = await cpu.run(score_cells, record, [cell[1] for cell in cells],
+                                                              [cell[2] for cell in cells])
+        return await call_backend(backend, calorie_cache.fill, cells, values, bounds, scored_version)
+
+    if servable:
+        total = await calorie_cache.flights.run_async(calorie_cache.flight_key(cells, version), backend,
+                                                      lambda: calorie_cache.peek(cells, version), score)
+    if total is not None:
+        return total
+    # A cell exceeds max_error: scored exactly, already if this call scored the cells
+    return exact if exact is not None else (await cpu.run(predict_records, record[None]))[0]
 
 @app.post("/predict_calories")
-def predict_calories(data: CalorieInput):
-    gender_encoded = encode_gender(data.Gender)
-
-    # Max chunk size (minutes)
-    MAX_DURATION = 60
-
-    # Total duration in minutes
-    total_duration = data.Duration
-
-    # Number of full chunks + remainder
-    full_chunks = int(total_duration // MAX_DURATION)
-    remainder = total_duration % MAX_DURATION
-
-    calories_total = 0.0
-
-    # Predict calories for each full chunk
-    for _ in range(full_chunks):
-        input_chunk = {
-            'Gender': gender_encoded,
-            'Age': data.Age,
-            'Height': data.Height,
-            'Weight': data.Weight,
-            'Duration': MAX_DURATION,
-            'Heart_Rate': data.Heart_Rate,
-            'Body_Temp': data.Body_Temp
-        }
-        calories_total += predict_for_duration(input_chunk)
-
-    # Predict calories for remainder duration if any
-    if remainder > 0:
-        input_remainder = {
-            'Gender': gender_encoded,
-            'Age': data.Age,
-            'Height': data.Height,
-            'Weight': data.Weight,
-            'Duration': remainder,
-            'Heart_Rate': data.Heart_Rate,
-            'Body_Temp': data.Body_Temp
-        }
-        calories_total += predict_for_duration(input_remainder)
+async def predict_calories(data: CalorieInput):
+    from calorie_batcher import calorie_batcher
+    from calorie_cache import calorie_cache
+    from calorie_predictor import predict_records, records_matrix
+
+    # Sessions longer than 60 minutes are scored as 60-minute chunks plus a remainder
+    if calorie_cache.enabled:
+        calories_total = await memoized_calories(records_matrix([data])[0])
+    elif calorie_batcher.enabled:
+        # Scored together with the other calls arriving within the batching window
+        calories_total = await calorie_batcher.predict(records_matrix([data])[0])
+    else:
+        calories_total = (await cpu.run(predict_records, records_matrix([data])))[0]
 
     return {
-        "predicted_calories": round(calories_total, 2)
+        "predicted_calories": round(float(calories_total), 2)
     }
 
+@app.post("/predict_calories_batch")
+async def predict_calories_batch(data: conlist(CalorieInput, max_length=MAX_BATCH_RECORDS)):
+    from calorie_predictor import predict_records, records_matrix
+
+    # Every chunk of every record goes through scaler -> poly -> lasso in one pass
+    calories = await cpu.run(predict_records, records_matrix(data))
+
+    return {
+        "predicted_calories": [round(float(c), 2) for c in calories]
+    }
+
+# ========== Input Schema ==========
+class CalorieSeriesInput(BaseModel):
+    Gender: str
+    Age: int
+    Height: float
+    Weight: float
+    # One reading per minute, or per sample when Timestamps (seconds since start) are given
+    Heart_Rate: conlist(float, min_length=1, max_length=MAX_SERIES_SAMPLES)
+    Body_Temp: Union[float, List[float]]
+    Timestamps: Optional[List[float]] = None
+    max_points: Optional[int] = Field(None, ge=2)
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        n = len(self.Heart_Rate)
+        if isinstance(self.Body_Temp, list) and len(self.Body_Temp) != n:
+            raise ValueError("Body_Temp must be a single value or one reading per Heart_Rate sample")
+        if self.Timestamps is not None:
+            if len(self.Timestamps) != n:
+                raise ValueError("Timestamps must have one entry per Heart_Rate sample")
+            if any(b <= a for a, b in zip([0.0] + self.Timestamps, self.Timestamps)):
+                raise ValueError("Timestamps must be positive and strictly increasing")
+        return self
+
+@app.post("/predict_calories_series")
+async def predict_calories_series(data: CalorieSeriesInput):
+    body_temp = data.Body_Temp
+    if not isinstance(body_temp, list):
+        body_temp = [body_temp] * len(data.Heart_Rate)
+
+    return await cpu.run(
+        score_series,
+        data.model_dump(include={"Gender", "Age", "Height", "Weight"}),
+        data.Heart_Rate,
+        body_temp,
+        data.Timestamps,
+        data.max_points,
+    )
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is generated while the request body is still being
+    read. StreamingResponse would also listen for a client disconnect on receive(),
+    consuming request body chunks; here a disconnect surfaces when a send fails.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+async def read_blocks(reader, chunks):
+    """
+    Blocks of whole input lines from an async stream of body chunks.
+    """
+    async for chunk in chunks:
+        for block in reader.feed(chunk):
+            yield block
+    for block in reader.close():
+        yield block
+
+@app.post("/predict_calories_bulk")
+async def predict_calories_bulk(request: Request, format: Optional[str] = None):
+    """
+    Score a CSV or NDJSON body of sessions (User_ID plus the /predict_calories fields),
+    streaming one NDJSON line per record back (see bulk_scoring.py). The input format
+    comes from `format` or else the Content-Type; the body is read block by block, so
+    memory stays flat for any upload size.
+    """
+    from bulk_scoring import BlockReader, detect_format, score_block
+
+    try:
+        reader = BlockReader(format or detect_format(request.headers.get("content-type")))
+        blocks = read_blocks(reader, request.stream())
+        # Read the header and first block before answering, so a bad header (422) or a
+        # saturated pool (429) still gets a status code
+        first = await anext(blocks, None)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    head = await cpu.run(score_block, reader.fmt, reader.columns, *first) if first else b""
+
+    async def results():
+        yield head
+        async for block, first_row in blocks:
+            try:
+                yield await cpu.run_when_free(score_block, reader.fmt, reader.columns, block, first_row)
+            except TaskTimeout:
+                yield b'{"error":"Request timed out"}\n'
+                return
+
+    return UploadStreamingResponse(results(), media_type="application/x-ndjson")
+
 # ========== Input Schema ==========
 class WorkoutRequest(BaseModel):
     fitness_level: str
     goal: str
     availability: int
     equipment_str: str
+    # Comma-separated body parts to keep load off, e.g. "Shoulder,Lower Back"
+    injury_str: str = ""
     age: int
     gender: str
     height: float
     weight: float
-    
+
+# ========== Response Schema ==========
+class PlannedExercise(BaseModel):
+    exercise_name: str
+    primary_muscle: str
+    sets: int
+    reps: int
+    rest: str
+    intensity: str
+
+class WorkoutPlan(RootModel[Dict[str, List[PlannedExercise]]]):
+    # {'Day 1 - Push': [PlannedExercise, ...], ...}
+    pass
+
 
 # @app.post("/workout_generation")
 # def workout_generation(data: WorkoutRequest):
@@ -106,12 +291,206 @@ class WorkoutRequest(BaseModel):
 #     )
 #     return result
 
-@app.post("/workout_planner")
-def workout_generation(data: WorkoutRequest):
-    print("Received Request:", data)
-    result = main(data)
-    workout_plan = json.loads(result)
-    return JSONResponse(content=workout_plan)
+@app.post("/workout_planner", response_model=WorkoutPlan)
+async def workout_generation(data: WorkoutRequest):
+    logger.debug("Received Request: %s", data)
+    # The plan dict is validated against WorkoutPlan and serialized to JSON once, by pydantic
+    return await cpu.run(plan_workout, data.model_dump())
+
+class WorkoutProgramRequest(WorkoutRequest):
+    weeks: int = Field(4, ge=1)
+
+    @field_validator("weeks")
+    @classmethod
+    def check_weeks(cls, value: int):
+        # Bounded here rather than in Field(le=...), which would load the planner on import
+        from workout_program import MAX_WEEKS
+
+        if value > MAX_WEEKS:
+            raise PydanticKnownError("less_than_equal", {"le": MAX_WEEKS})
+        return value
+
+class ProgramWeek(BaseModel):
+    week: int
+    # base, build, peak or deload
+    phase: str
+    days: WorkoutPlan
+
+@app.post("/workout_program", response_model=List[ProgramWeek])
+async def workout_program(data: WorkoutProgramRequest):
+    """
+    /workout_planner extended to `weeks` weeks of periodized progression, with exercises
+    rotating every 4-week mesocycle (see workout_program.py).
+    """
+    return await cpu.run(plan_program, data.model_dump(include={"fitness_level", "goal", "availability",
+                                                                 "equipment_str", "injury_str", "weeks"}))
+
+# ========== Exercise Search ==========
+class ExerciseSearchResponse(BaseModel):
+    # Matching exercises before limit/offset
+    total: int
+    # Every catalog column of each exercise (see exercise_catalog.COLUMNS), None when empty
+    exercises: List[Dict[str, Optional[str]]]
+
+def query_values(values):
+    """Repeated and comma-separated query parameter values as one list (None when absent)."""
+    if not values:
+        return None
+    return [item.strip() for value in values for item in value.split(",") if item.strip()]
+
+@app.get("/exercises/search", response_model=ExerciseSearchResponse)
+async def search_exercises(
+    q: Optional[str] = None,
+    difficulty: Optional[List[str]] = Query(None),
+    equipment: Optional[List[str]] = Query(None),
+    muscle: Optional[List[str]] = Query(None),
+    prime_mover: Optional[List[str]] = Query(None),
+    classification: Optional[List[str]] = Query(None),
+    body_region: Optional[List[str]] = Query(None),
+    movement_pattern: Optional[List[str]] = Query(None),
+    plane_of_motion: Optional[List[str]] = Query(None),
+    force_type: Optional[List[str]] = Query(None),
+    mechanics: Optional[List[str]] = Query(None),
+    laterality: Optional[List[str]] = Query(None),
+    posture: Optional[List[str]] = Query(None),
+    exclude_injury: Optional[List[str]] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Exercises matching every given filter, in catalog order. Each filter takes repeated
+    or comma-separated values and matches any of them (case-insensitive); `equipment`
+    keeps what can be done with only that equipment, `muscle` matches target muscle
+    groups containing the name, `exclude_injury` drops exercises loading those body
+    parts, and `q` is a substring of the exercise name.
+    """
+    facets = {"difficulty": difficulty, "prime_mover": prime_mover, "classification": classification,
+              "body_region": body_region, "movement_pattern": movement_pattern, "plane_of_motion": plane_of_motion,
+              "force_type": force_type, "mechanics": mechanics, "laterality": laterality, "posture": posture}
+    constraints = {"equipment": query_values(equipment), "muscle": query_values(muscle),
+                   "exclude_injuries": query_values(exclude_injury),
+                   **{facet: query_values(values) for facet, values in facets.items()}}
+    # The catalog is loaded (or rebuilt after a CSV change) and queried on the CPU pool
+    total, exercises = await cpu.run(search_catalog, q, limit, offset, constraints)
+    return {"total": total, "exercises": exercises}
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness: the process is up and its event loop answers. Loads nothing.
+    """
+    return {"status": "ok", "uptime_seconds": round(time.time() - STARTED, 3)}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: 200 once the startup warm-up has loaded every subsystem and the CPU
+    pool's workers have started, 503 until then (or if the warm-up failed). Lists which
+    subsystems are warm either way.
+    """
+    status = subsystems.stats()
+    status["subsystems"]["cpu_pool"] = {"warm": cpu.ready, "mode": cpu.mode}
+    status["ready"] = subsystems.ready and cpu.ready
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/admin/artifacts")
+def artifact_stats():
+    return registry.stats()
+
+@app.get("/admin/pool")
+def pool_stats():
+    return cpu.stats()
+
+@app.get("/admin/plan_cache")
+def plan_cache_stats():
+    lookup = registry.get("plan_lookup")
+    return {
+        "cache": plan_cache.stats(),
+        "lookup": lookup.stats() if lookup is not None else None,
+    }
+
+@app.get("/admin/calorie_cache")
+def calorie_cache_stats():
+    from calorie_cache import calorie_cache
+
+    return calorie_cache.stats()
+
+@app.get("/admin/calorie_batcher")
+def calorie_batcher_stats():
+    from calorie_batcher import calorie_batcher
+
+    return calorie_batcher.stats()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profiling")
+def profiling_status():
+    return {"enabled": profiles.enabled, "profiles": profiles.list()}
+
+@app.post("/admin/profiling")
+def set_profiling(enabled: bool):
+    profiles.enabled = enabled
+    return {"enabled": profiles.enabled}
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown profile id")
+    return profile
+
+@app.get("/admin/models")
+def model_stats():
+    """
+    Stored calorie model versions with their training scores, the active and shadow
+    version, and how the shadow has compared with production so far.
+    """
+    from calorie_models import BASELINE, calorie_models
+
+    store = calorie_models.store
+    return {
+        **calorie_models.stats(),
+        "versions": [store.manifest(version) for version in [BASELINE] + store.versions()],
+    }
+
+@app.post("/admin/models/activate")
+def activate_model(version: str):
+    """
+    Hot-swap the production calorie model: requests already scoring finish on the old
+    version, every later one (in every worker) uses `version`.
+    """
+    from calorie_models import calorie_models
+
+    try:
+        calorie_models.store.activate(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"active": calorie_models.current().version}
+
+@app.post("/admin/models/shadow")
+def shadow_model(version: Optional[str] = None):
+    """
+    Score `version` alongside production on live traffic without returning its output;
+    omit `version` to stop.
+    """
+    from calorie_models import calorie_models
+
+    try:
+        calorie_models.store.set_shadow(version or None)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    calorie_models.current()
+    return calorie_models.stats()
+
+@app.post("/admin/reload_catalog")
+def reload_catalog():
+    # Registers the catalog loader when no request has used the catalog yet
+    import exercise_catalog
+
+    catalog = registry.reload("exercise_catalog")
+    return {"version": catalog.version, "exercises": len(catalog)}
 
 # ========== Input Schema ==========
 class NutritionRequest(BaseModel):
@@ -123,15 +502,180 @@ class NutritionRequest(BaseModel):
     height: float
     weight: float
 
+    @field_validator("fitness_level", "goal", "activity_level")
+    @classmethod
+    def check_category(cls, value: str, info: ValidationInfo):
+        # Unknown values are rejected with a 422; aliases become the canonical name
+        return MACRO_TABLES.canonical(info.field_name, value)
+
 # ========== Endpoint ==========
 @app.post("/nutrition_plan")
 def generate_nutrition_plan(data: NutritionRequest):
-    print("Received Request:", data)
+    logger.debug("Received Request: %s", data)
 
     # Convert Pydantic object to plain dict
-    input_data = data.dict()
+    input_data = data.model_dump()
 
     # Call the nutrient calculator function
     result = get_macros_from_user_input(input_data)
 
-    return JSONResponse(content=result)
\ No newline at end of file
+    return JSONResponse(content=result)
+
+# Upper bound on users accepted by /nutrition_plan/batch
+MAX_NUTRITION_BATCH = 100000
+
+# ========== Input Schema ==========
+class NutritionBatchRequest(BaseModel):
+    # One entry per user in every column
+    fitness_level: conlist(str, max_length=MAX_NUTRITION_BATCH)
+    goal: List[str]
+    activity_level: List[str]
+    age: List[int]
+    gender: List[str]
+    height: List[float]
+    weight: List[float]
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        n = len(self.fitness_level)
+        if any(len(getattr(self, field)) != n for field in type(self).model_fields):
+            raise ValueError("Every column must have one entry per user")
+        return self
+
+# ========== Endpoint ==========
+@app.post("/nutrition_plan/batch")
+async def generate_nutrition_plan_batch(data: NutritionBatchRequest):
+    # Columnar in, columnar out: result[field][i] is the /nutrition_plan field for user i
+    try:
+        return await cpu.run(nutrition_batch, data.model_dump())
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+# ========== Input Schema ==========
+class FullProfileRequest(BaseModel):
+    age: int
+    gender: str
+    height: float
+    weight: float
+    fitness_level: str
+    goal: str
+    availability: int
+    equipment_str: str
+    injury_str: str = ""
+    # Derived from the workout plan's training days when omitted
+    activity_level: Optional[str] = None
+    # A typical training session, scored for the calorie estimate
+    duration: float
+    heart_rate: float
+    body_temp: float
+
+    @field_validator("fitness_level", "goal", "activity_level")
+    @classmethod
+    def check_category(cls, value: Optional[str], info: ValidationInfo):
+        # Normalized once here; every component below receives the canonical names
+        return value if value is None else MACRO_TABLES.canonical(info.field_name, value)
+
+# ========== Response Schema ==========
+class WeeklyVolume(BaseModel):
+    training_days: int
+    exercises: int
+    sets: int
+    # Session calorie estimate times training days
+    training_kcal: float
+
+class FullProfileResponse(BaseModel):
+    predicted_calories: float
+    workout_plan: WorkoutPlan
+    weekly_volume: WeeklyVolume
+    activity_level: str
+    nutrition: Dict[str, Union[int, float]]
+
+# ========== Endpoint ==========
+@app.post("/full_profile", response_model=FullProfileResponse)
+async def full_profile(data: FullProfileRequest):
+    """
+    /predict_calories, /workout_planner and /nutrition_plan for one profile in a single call.
+
+    Calorie scoring and workout planning run concurrently on the CPU pool; the macro
+    targets then only need arithmetic, using the plan's weekly volume to pick the
+    activity level when the request leaves it out.
+    """
+    from calorie_predictor import predict_records, records_matrix
+    from workout_planner import weekly_volume
+
+    session = CalorieInput(Gender=data.gender, Age=data.age, Height=data.height, Weight=data.weight,
+                           Duration=data.duration, Heart_Rate=data.heart_rate, Body_Temp=data.body_temp)
+    calories, workout_plan = await asyncio.gather(
+        cpu.run(predict_records, records_matrix([session])),
+        cpu.run(plan_workout, data.model_dump(include={"fitness_level", "goal", "availability", "equipment_str",
+                                                       "injury_str"})),
+    )
+    session_kcal = round(float(calories[0]), 2)
+
+    volume = weekly_volume(workout_plan)
+    activity_level = data.activity_level or activity_level_for_training(volume["training_days"])
+    nutrition = get_macros_from_user_input({
+        **data.model_dump(include={"weight", "height", "age", "gender", "goal", "fitness_level"}),
+        "activity_level": activity_level,
+    })
+
+    return {
+        "predicted_calories": session_kcal,
+        "workout_plan": workout_plan,
+        "weekly_volume": {**volume, "training_kcal": round(session_kcal * volume["training_days"], 2)},
+        "activity_level": activity_level,
+        "nutrition": nutrition,
+    }
+
+# Upper bound on profiles accepted by /cohort_plan
+MAX_COHORT = 10000
+
+# ========== Input Schema ==========
+class CohortProfile(BaseModel):
+    # Echoed back with the profile's results
+    client_id: Optional[str] = None
+    age: int
+    gender: str
+    height: float
+    weight: float
+    fitness_level: str
+    goal: str
+    availability: int
+    equipment_str: str
+    injury_str: str = ""
+    # Derived from the workout plan's training days when omitted
+    activity_level: Optional[str] = None
+
+    @field_validator("fitness_level", "goal", "activity_level")
+    @classmethod
+    def check_category(cls, value: Optional[str], info: ValidationInfo):
+        return value if value is None else MACRO_TABLES.canonical(info.field_name, value)
+
+class CohortRequest(BaseModel):
+    profiles: conlist(CohortProfile, min_length=1, max_length=MAX_COHORT)
+
+# ========== Endpoint ==========
+@app.post("/cohort_plan")
+async def cohort_plan(data: CohortRequest):
+    """
+    /workout_planner and /nutrition_plan for every profile of a cohort, streamed as
+    NDJSON: profiles sharing a planning key are planned together as one CPU-pool task,
+    and each group's line is sent as soon as it finishes (see cohort.py).
+    """
+    from cohort import encode_record, stream_groups, summary_record
+
+    start = time.perf_counter()
+    # Grouping needs the catalog's equipment vocabulary, loaded on the CPU pool like the planning
+    groups = await cpu.run(group_cohort, [profile.model_dump() for profile in data.profiles])
+    # The first group is planned before answering, so a saturated pool still gets a 429
+    head = await cpu.run(plan_cohort_group, groups[0])
+    window = min(cpu.max_pending, cpu.workers * 2)
+
+    async def results():
+        yield head
+        async for line in stream_groups(groups[1:], lambda group: cpu.run_when_free(plan_cohort_group, group),
+                                        window):
+            yield line
+        yield encode_record(summary_record(groups, start))
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
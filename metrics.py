@@ -0,0 +1,242 @@
+"""
+Lightweight in-process metrics exposed on /metrics in the Prometheus text format.
+
+- Histograms of request latency per endpoint and of time spent in each hot-path stage
+  (catalog filters, plan assembly, calorie kernel steps), recorded with `stage()`.
+- Histograms of the number of rows left after each exercise filter, via `rows()`.
+- Collectors registered by other modules (CPU pool, plan cache, artifact registry)
+  that report their counters and gauges when /metrics is scraped.
+
+Recording costs two perf_counter calls, a bisect and a short locked update per
+observation. In a process-pool worker (see cpu_pool.py) observations are buffered
+instead and shipped back with each task result, so the main process reports the work
+done by every worker. The same goes for the counters of the caches a worker uses
+(share_counters()): each result carries their increments, which the main process adds
+to its own counts.
+"""
+import bisect
+import threading
+import time
+
+# Bucket upper bounds (seconds) for latency histograms
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0)
+# Bucket upper bounds for row-count histograms
+ROW_BUCKETS = (0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # counts[i] is the number of observations in (buckets[i-1], buckets[i]]; the last slot is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self._families = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        # Observations held back for the parent process (see buffer()/drain())
+        self._buffer = None
+        # Counters shipped by process-pool workers (see share_counters())
+        self._counter_sources = {}
+        self._shipped = {}
+        self._worker_counters = {}
+
+    def family(self, name, help_text, buckets=LATENCY_BUCKETS):
+        """
+        Declare a histogram family; observing an undeclared family declares it with
+        default buckets.
+        """
+        with self._lock:
+            self._families.setdefault(name, (help_text, buckets, {}))
+
+    def observe(self, name, value, **labels):
+        self.record(name, tuple(sorted(labels.items())), value)
+
+    def record(self, name, key, value):
+        """
+        observe() with the labels already as a sorted tuple of (label, value) pairs.
+        """
+        with self._lock:
+            if self._buffer is not None:
+                self._buffer.append((name, key, value))
+                return
+            _, buckets, series = self._families.setdefault(name, (name, LATENCY_BUCKETS, {}))
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def stage(self, stage):
+        """
+        Context manager timing the enclosed block into stage_duration_seconds{stage=...}.
+        """
+        return StageTimer(self, (("stage", stage),))
+
+    def rows(self, stage, count):
+        self.record("filter_rows", (("stage", stage),), count)
+
+    def buffer(self):
+        """
+        Hold observations for drain() instead of recording them (process-pool workers).
+        """
+        with self._lock:
+            self._buffer = []
+
+    def drain(self):
+        """
+        (observations, counter increments) since the last drain(): the buffered
+        observations and, per shared counter source, {counter: increment}. Both are
+        empty unless buffer() was called.
+        """
+        with self._lock:
+            if self._buffer is None:
+                return [], {}
+            drained, self._buffer = self._buffer, []
+            sources = list(self._counter_sources.items())
+        increments = {}
+        # Read outside _lock: the sources take their own locks
+        for name, read in sources:
+            current = read()
+            shipped = self._shipped.get(name, {})
+            delta = {counter: value - shipped.get(counter, 0) for counter, value in current.items()
+                     if value != shipped.get(counter, 0)}
+            if delta:
+                increments[name] = delta
+            self._shipped[name] = current
+        return drained, increments
+
+    def merge(self, drained):
+        """
+        Record what drain() returned in a worker.
+        """
+        observations, increments = drained
+        for name, key, value in observations:
+            self.record(name, key, value)
+        with self._lock:
+            for name, delta in increments.items():
+                totals = self._worker_counters.setdefault(name, {})
+                for counter, value in delta.items():
+                    totals[counter] = totals.get(counter, 0) + value
+
+    def share_counters(self, name, read):
+        """
+        Ship the counters of `read()` (a zero-argument callable returning {counter:
+        value}, see counter_values()) from process-pool workers to the main process,
+        where worker_counters(name) sums them over every worker. Registering a name
+        again starts its counters over.
+        """
+        with self._lock:
+            self._counter_sources[name] = read
+            self._shipped.pop(name, None)
+
+    def worker_counters(self, name):
+        """
+        {counter: value} of source `name` summed over the process-pool workers; empty in
+        thread mode and in the workers themselves.
+        """
+        with self._lock:
+            return dict(self._worker_counters.get(name, {}))
+
+    def add_worker_counters(self, name, stats):
+        """
+        Add worker_counters(name) to a stats dict in place; "outer.inner" counters go to
+        stats[outer][inner].
+        """
+        for counter, value in self.worker_counters(name).items():
+            outer, _, inner = counter.rpartition(".")
+            target = stats[outer] if outer else stats
+            target[inner] = target.get(inner, 0) + value
+        return stats
+
+    def totals(self, name):
+        """
+        {labels: (count, sum)} of every series of a histogram family recorded here.
+        """
+        with self._lock:
+            _, _, series = self._families.get(name, (None, None, {}))
+            return {key: (histogram.count, histogram.sum) for key, histogram in series.items()}
+
+    def register_collector(self, collector):
+        """
+        Register a zero-argument callable returning (name, type, help, [(labels, value), ...])
+        tuples, called on every render().
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Every histogram and collected sample in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            families = [(name, help_text, buckets, {key: (list(h.counts), h.sum, h.count) for key, h in series.items()})
+                        for name, (help_text, buckets, series) in sorted(self._families.items())]
+        for name, help_text, buckets, series in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (counts, total, count) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{name}_bucket{format_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(key)} {total!r}")
+                lines.append(f"{name}_count{format_labels(key)} {count}")
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(tuple(sorted(labels.items())))} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    __slots__ = ("metrics", "key", "start")
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.record("stage_duration_seconds", self.key, time.perf_counter() - self.start)
+
+
+def counter_values(stats, counters):
+    """
+    {counter: value} of the `counters` present in a stats dict; "outer.inner" names a
+    counter of the nested dict stats[outer].
+    """
+    values = {}
+    for counter in counters:
+        outer, _, inner = counter.rpartition(".")
+        source = stats[outer] if outer else stats
+        if inner in source:
+            values[counter] = source[inner]
+    return values
+
+
+def format_labels(key):
+    if not key:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in key)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(key, escaped)) + "}"
+
+
+metrics = Metrics()
+metrics.family("http_request_duration_seconds", "Request latency by endpoint, method and status.")
+metrics.family("stage_duration_seconds", "Time spent in each hot-path stage.")
+metrics.family("filter_rows", "Exercises left after each catalog filter.", ROW_BUCKETS)
@@ -0,0 +1,109 @@
+"""
+Lazily loaded, process-wide registry of model and data artifacts.
+
+Modules register a loader under a name at import time; the artifact itself is only
+built the first time it is requested (or when warm() is called from the app startup
+hook), and the registry records how long each load took and how much resident memory
+it added so per-worker cost is visible on /admin/artifacts.
+"""
+import os
+import resource
+import threading
+import time
+
+from metrics import metrics
+
+
+def resident_memory():
+    """
+    Current resident set size of this process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Peak RSS (kilobytes on Linux) is the best portable fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._artifacts = {}
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, loader):
+        """
+        Register a zero-argument loader for `name`; nothing is loaded yet.
+        """
+        with self._lock:
+            self._loaders[name] = loader
+            self._artifacts.pop(name, None)
+
+    def get(self, name):
+        artifact = self._artifacts.get(name)
+        if artifact is not None:
+            return artifact
+        with self._lock:
+            if name not in self._artifacts:
+                self._load(name)
+            return self._artifacts[name]
+
+    def reload(self, name):
+        with self._lock:
+            self._load(name)
+            return self._artifacts[name]
+
+    def _load(self, name):
+        loader = self._loaders[name]
+        rss_before = resident_memory()
+        start = time.perf_counter()
+        artifact = loader()
+        elapsed = time.perf_counter() - start
+        self._artifacts[name] = artifact
+        self._stats[name] = {
+            "load_seconds": round(elapsed, 6),
+            "rss_delta_bytes": max(resident_memory() - rss_before, 0),
+            "loads": self._stats.get(name, {}).get("loads", 0) + 1,
+        }
+
+    def is_loaded(self, name):
+        return name in self._artifacts
+
+    def warm(self, names=None):
+        """
+        Load every registered artifact (or just `names`) ahead of the first request.
+        """
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def stats(self):
+        return {
+            "resident_memory_bytes": resident_memory(),
+            "artifacts": {
+                name: {"loaded": name in self._artifacts, **self._stats.get(name, {})}
+                for name in self._loaders
+            },
+        }
+
+
+registry = ModelRegistry()
+
+
+def _collect():
+    stats = registry.stats()
+    loaded = {name: artifact for name, artifact in stats["artifacts"].items() if artifact["loaded"]}
+    return [
+        ("process_resident_memory_bytes", "gauge", "Resident set size of this process.",
+         [({}, stats["resident_memory_bytes"])]),
+        ("artifact_load_seconds", "gauge", "Time the last load of each artifact took.",
+         [({"artifact": name}, artifact["load_seconds"]) for name, artifact in loaded.items()]),
+        ("artifact_rss_delta_bytes", "gauge", "Resident memory added by the last load of each artifact.",
+         [({"artifact": name}, artifact["rss_delta_bytes"]) for name, artifact in loaded.items()]),
+        ("artifact_loads_total", "counter", "Loads of each artifact.",
+         [({"artifact": name}, artifact["loads"]) for name, artifact in loaded.items()]),
+    ]
+
+
+metrics.register_collector(_collect)
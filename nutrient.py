@@ -1,5 +1,7 @@
-import pandas as pd
-import numpy as np
+from functools import cached_property
+
+# NumPy and pandas are only imported by the batch path (get_macros_batch), so
+# /nutrition_plan loads neither
 
 # Macronutrient guidelines
 MACRO_GUIDELINES = {
@@ -35,61 +37,161 @@ MACRO_GUIDELINES = {
     }
 }
 
-def calculate_calories(weight_kg, height_cm, age, gender, activity_level, goal):
+# TDEE multiplier per activity level
+ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,
+    'light': 1.375,
+    'moderate': 1.55,
+    'active': 1.725,
+    'very_active': 1.9
+}
+
+# Calorie adjustment per goal on top of TDEE
+GOAL_CALORIE_OFFSETS = {
+    'fatloss': -500,
+    'musclegain': 300,
+    'endurance': 150,
+    'strength': 0,
+}
+
+FITNESS_LEVELS = ['beginner', 'intermediate', 'advanced']
+
+# Activity level implied by the number of training days per week (index), for callers
+# that know a user's workout plan but not their activity level
+TRAINING_DAYS_ACTIVITY = ['sedentary', 'light', 'light', 'moderate', 'moderate', 'active', 'active', 'very_active']
+
+# Spellings accepted besides the case and separator variants of the names above
+EXTRA_ALIASES = {
+    "goal": {"fat loss": "fatloss", "muscle gain": "musclegain"},
+    "fitness_level": {"advance": "advanced"},
+}
+
+
+def alias_key(value: str) -> str:
+    """
+    Case- and separator-insensitive form of a categorical value ('Very-Active' -> 'veryactive').
+    """
+    return value.strip().lower().replace(" ", "").replace("_", "").replace("-", "")
+
+
+class MacroTables:
+    """
+    MACRO_GUIDELINES, ACTIVITY_MULTIPLIERS and GOAL_CALORIE_OFFSETS compiled once at import.
+
+    Every accepted spelling of an activity level, goal and fitness level maps to an
+    integer code, and each (activity, goal, fitness) code triple maps to its precomputed
+    profile: (TDEE multiplier, calorie offset, protein g/kg, fat share, carb share) of the
+    calories left after protein. The same values are laid out as dense arrays for the
+    batch path (built on its first use), so both paths do identical float arithmetic.
+    """
+
+    def __init__(self, guidelines=MACRO_GUIDELINES):
+        goals = list(next(iter(guidelines.values())))
+        self.names = {
+            "activity_level": list(guidelines),
+            "goal": goals,
+            "fitness_level": list(FITNESS_LEVELS),
+        }
+        self.aliases = {field: self._alias_table(field, names) for field, names in self.names.items()}
+
+        self.profiles = {}
+        for a, activity in enumerate(guidelines):
+            for g, goal in enumerate(goals):
+                entry = guidelines[activity][goal]
+                protein_range = entry["protein_g_per_kg"]
+                fat_pct = entry["fat_pct"] / 100
+                carb_pct = entry["carb_pct"] / 100
+                total_pct = fat_pct + carb_pct
+                protein_per_kg = [protein_range[0], sum(protein_range) / 2, protein_range[1]]
+                for f in range(len(FITNESS_LEVELS)):
+                    self.profiles[a, g, f] = (
+                        ACTIVITY_MULTIPLIERS[activity],
+                        GOAL_CALORIE_OFFSETS[goal],
+                        protein_per_kg[f],
+                        fat_pct / total_pct,
+                        carb_pct / total_pct,
+                    )
+
+    @cached_property
+    def arrays(self):
+        """
+        (multiplier[activity], offset[goal], protein_per_kg[activity, goal, fitness],
+        fat_share[activity, goal], carb_share[activity, goal]) as NumPy arrays.
+        """
+        import numpy as np
+
+        shape = tuple(len(names) for names in self.names.values())
+        profiles = np.array([self.profiles[index] for index in sorted(self.profiles)]).reshape(shape + (5,))
+        return (profiles[:, 0, 0, 0], profiles[0, :, 0, 1], profiles[:, :, :, 2], profiles[:, :, 0, 3],
+                profiles[:, :, 0, 4])
+
+    @staticmethod
+    def _alias_table(field, names):
+        # Common spellings are stored verbatim so they resolve with one dict hit;
+        # alias_key entries catch every other case/separator variant
+        table = {}
+        for code, name in enumerate(names):
+            spaced = name.replace("_", " ")
+            for spelling in (name, spaced, spaced.title(), spaced.capitalize(), spaced.upper(), alias_key(name)):
+                table[spelling] = code
+        for alias, name in EXTRA_ALIASES.get(field, {}).items():
+            table[alias] = table[alias_key(alias)] = names.index(name)
+        return table
+
+    def code(self, field, value, default=None):
+        """
+        Integer code of `value` for `field`, or `default` if it is not an accepted spelling.
+        """
+        aliases = self.aliases[field]
+        code = aliases.get(value)
+        if code is None:
+            code = aliases.get(alias_key(value), default)
+        return code
+
+    def resolve(self, field, value):
+        code = self.code(field, value)
+        if code is None:
+            raise ValueError(f"Invalid {field} '{value}'. Accepted values: {self.names[field]}")
+        return code
+
+    def canonical(self, field, value):
+        """
+        Canonical name of `value` (e.g. 'Very Active' -> 'very_active'); ValueError if unknown.
+        """
+        return self.names[field][self.resolve(field, value)]
+
+    def profile(self, activity_level, goal, fitness_level):
+        return self.profiles[
+            self.resolve("activity_level", activity_level),
+            self.resolve("goal", goal),
+            self.resolve("fitness_level", fitness_level),
+        ]
+
+
+MACRO_TABLES = MacroTables()
+
+
+def calculate_bmr(weight_kg, height_cm, age, gender):
     if gender.lower() == 'male':
-        bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age + 5
-    else:
-        bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age - 161
-
-    activity_multipliers = {
-        'sedentary': 1.2,
-        'light': 1.375,
-        'moderate': 1.55,
-        'active': 1.725,
-        'very active': 1.9
-    }
-    activity_multiplier = activity_multipliers.get(activity_level.lower(), 1.2)
-    tdee = bmr * activity_multiplier
-
-    goal = goal.lower()
-    if goal == 'fat_loss':
-        return tdee - 500
-    elif goal == 'muscle_gain':
-        return tdee + 300
-    elif goal == 'endurance':
-        return tdee + 150
-    elif goal == 'strength':
-        return tdee
-    else:
-        return tdee  # maintenance
+        return 10 * weight_kg + 6.25 * height_cm - 5 * age + 5
+    return 10 * weight_kg + 6.25 * height_cm - 5 * age - 161
+
+def calculate_calories(weight_kg, height_cm, age, gender, activity_level, goal):
+    tdee = calculate_bmr(weight_kg, height_cm, age, gender) * ACTIVITY_MULTIPLIERS[
+        MACRO_TABLES.canonical("activity_level", activity_level)]
+    return tdee + GOAL_CALORIE_OFFSETS[MACRO_TABLES.canonical("goal", goal)]
 
 def calculate_macros(goal, activity_level, tdee, weight_kg, fitness_level):
-    goal = goal.lower()
-    activity_level = activity_level.lower()
-    fitness_level = fitness_level.lower()
-
-    guidelines = MACRO_GUIDELINES[activity_level][goal]
-
-    protein_range = guidelines["protein_g_per_kg"]
-    if fitness_level == "beginner":
-        protein_per_kg = protein_range[0]
-    elif fitness_level == "intermediate":
-        protein_per_kg = sum(protein_range) / 2
-    elif fitness_level == "advanced":
-        protein_per_kg = protein_range[1]
-    else:
-        raise ValueError("Invalid fitness_level")
+    _, _, protein_per_kg, fat_share, carb_share = MACRO_TABLES.profile(activity_level, goal, fitness_level)
+    return macros_from_profile(tdee, weight_kg, protein_per_kg, fat_share, carb_share)
 
+def macros_from_profile(tdee, weight_kg, protein_per_kg, fat_share, carb_share):
     protein_g = round(protein_per_kg * weight_kg)
     protein_kcal = protein_g * 4
 
-    fat_pct = guidelines["fat_pct"] / 100
-    carb_pct = guidelines["carb_pct"] / 100
-    total_pct = fat_pct + carb_pct
-
     remaining_kcal = tdee - protein_kcal
-    fat_kcal = round((fat_pct / total_pct) * remaining_kcal)
-    carb_kcal = round((carb_pct / total_pct) * remaining_kcal)
+    fat_kcal = round(fat_share * remaining_kcal)
+    carb_kcal = round(carb_share * remaining_kcal)
 
     fat_g = round(fat_kcal / 9)
     carb_g = round(carb_kcal / 4)
@@ -129,20 +231,96 @@ def get_macros_from_user_input(data: dict):
     - activity_level
     - goal
     - fitness_level
+
+    activity_level, goal and fitness_level accept any spelling MACRO_TABLES knows
+    ('very active', 'Very_Active', 'fat loss', ...); other values raise ValueError.
     """
+    weight = data["weight"]
+    multiplier, offset, protein_per_kg, fat_share, carb_share = MACRO_TABLES.profile(
+        data["activity_level"], data["goal"], data["fitness_level"])
 
-    def normalize(value: str) -> str:
-        return value.lower().replace(" ", "").replace("_", "")
+    tdee = calculate_bmr(weight, data["height"], data["age"], data["gender"]) * multiplier + offset
+    return macros_from_profile(tdee, weight, protein_per_kg, fat_share, carb_share)
+
+
+def activity_level_for_training(training_days):
+    return TRAINING_DAYS_ACTIVITY[min(max(int(training_days), 0), len(TRAINING_DAYS_ACTIVITY) - 1)]
+
+
+# ========== Vectorized batch path ==========
+def map_distinct(values, fn, dtype):
+    """
+    fn applied to every element of `values`, calling it once per distinct value.
+    """
+    import numpy as np
+    import pandas as pd
+
+    inverse, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return np.array([fn(str(value)) for value in uniques], dtype=dtype)[inverse]
 
-    weight = data["weight"]
-    height = data["height"]
-    age = data["age"]
-    gender = data["gender"]
-    activity_level = normalize(data["activity_level"])
-    goal = normalize(data["goal"])
-    fitness_level = normalize(data["fitness_level"])
 
-    tdee = calculate_calories(weight, height, age, gender, activity_level, goal)
-    macros = calculate_macros(goal, activity_level, tdee, weight, fitness_level)
-    return macros
+def encode(values, field, tables=MACRO_TABLES):
+    """
+    Integer codes of `values` for `field`; raises ValueError naming unknown values.
+    """
+    import numpy as np
+
+    encoded = map_distinct(values, lambda value: tables.code(field, value, -1), np.intp)
+    unknown = encoded < 0
+    if unknown.any():
+        bad = sorted({str(value) for value in np.asarray(values, dtype=object)[unknown]})
+        raise ValueError(f"Invalid {field} values: {bad}. Accepted values: {tables.names[field]}")
+    return encoded
+
+
+def get_macros_batch(data, tables=MACRO_TABLES):
+    """
+    Vectorized get_macros_from_user_input over a columnar batch.
+
+    `data` is a DataFrame or a mapping with the same keys as get_macros_from_user_input
+    ('weight', 'height', 'age', 'gender', 'activity_level', 'goal', 'fitness_level'),
+    each holding one value per user.
+
+    Returns a dict of NumPy arrays keyed like the calculate_macros result; element i of
+    every array equals that field of get_macros_from_user_input for user i. Raises
+    ValueError if any activity level, goal or fitness level is not recognized.
+    """
+    import numpy as np
 
+    from calorie_predictor import round2
+
+    multiplier, offset, protein_per_kg, fat_share, carb_share = tables.arrays
+    weight = np.asarray(data["weight"], dtype=np.float64)
+    height = np.asarray(data["height"], dtype=np.float64)
+    age = np.asarray(data["age"], dtype=np.float64)
+    male = map_distinct(data["gender"], lambda value: value.lower() == 'male', bool)
+    activity = encode(data["activity_level"], "activity_level", tables)
+    goal = encode(data["goal"], "goal", tables)
+    fitness = encode(data["fitness_level"], "fitness_level", tables)
+
+    bmr = 10 * weight + 6.25 * height - 5 * age + np.where(male, 5, -161)
+    tdee = bmr * multiplier[activity] + offset[goal]
+
+    protein_g = np.rint(protein_per_kg[activity, goal, fitness] * weight).astype(np.int64)
+    protein_kcal = protein_g * 4
+    remaining_kcal = tdee - protein_kcal
+    fat_kcal = np.rint(fat_share[activity, goal] * remaining_kcal).astype(np.int64)
+    carb_kcal = np.rint(carb_share[activity, goal] * remaining_kcal).astype(np.int64)
+
+    return {
+        "calories_kcal": np.rint(tdee).astype(np.int64),
+
+        "protein_g": protein_g,
+        "protein_kcal": protein_kcal,
+        "protein_pct_of_total_kcal": round2(protein_kcal / tdee * 100),
+
+        "fat_g": np.rint(fat_kcal / 9).astype(np.int64),
+        "fat_kcal": fat_kcal,
+        "fat_pct_of_total_kcal": round2(fat_kcal / tdee * 100),
+
+        "carbohydrate_g": np.rint(carb_kcal / 4).astype(np.int64),
+        "carb_kcal": carb_kcal,
+        "carb_pct_of_total_kcal": round2(carb_kcal / tdee * 100),
+
+        "total_kcal_from_macros": protein_kcal + fat_kcal + carb_kcal,
+    }
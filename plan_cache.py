@@ -0,0 +1,212 @@
+"""
+Caching for /workout_planner.
+
+A plan depends only on (fitness level, goal, availability, equipment set, injury
+zones): the split and the seeded exercise choices are deterministic, and
+age/gender/height/weight are unused. plan_key normalizes a request to that tuple,
+keeping only equipment names the catalog knows about since other names cannot change
+the plan.
+
+Two layers sit in front of the planner:
+- PlanCache: plans on a pluggable backend (cache_backends.py) with TTL. By default a
+  bounded in-process LRU with size-based eviction, cleared whenever the exercise
+  catalog changes; a SQLite file or Redis server shares the plans between the
+  workers of a node or of every node, and keeps them across restarts. Concurrent
+  misses of one plan build it once (single-flight).
+- PlanTable (plan_table.py): an optional memory-mapped file written offline by
+  precompute_plans.py holding every plan of a bounded input space, answered with one
+  hash probe and shared by all workers through the page cache.
+
+Configured through environment variables:
+- PLAN_CACHE_BACKEND: "memory" (default), "sqlite:///path/to/cache.db" or
+  "redis://host:port/db".
+- PLAN_CACHE_ENTRIES: entry cap of the memory and SQLite backends (default: 4096).
+- PLAN_CACHE_MAX_BYTES: cap on the JSON size of the plans in memory (default: 64 MiB).
+- PLAN_CACHE_TTL: seconds a plan is kept (default: 3600).
+"""
+import json
+import os
+import threading
+
+from cache_backends import BACKEND_COUNTERS, FLIGHT_COUNTERS, MemoryBackend, SingleFlight, open_backend
+from cache_codec import PLAN_FORMAT, decode_plan, encode_plan
+from metrics import counter_values, metrics
+from model_registry import registry
+
+PLAN_LOOKUP_PATH = os.environ.get("PLAN_LOOKUP_PATH", "plan_table.bin")
+
+# The counters of PlanCache.stats()
+COUNTERS = ("hits", "misses", "invalidations") + BACKEND_COUNTERS + tuple(
+    f"single_flight.{counter}" for counter in FLIGHT_COUNTERS)
+
+
+def plan_key(fitness_level, goal, availability, equipment_list, vocabulary, injury_zones=()):
+    """
+    Normalized cache key for a planner request. `vocabulary` is the set of normalized
+    equipment names present in the catalog. Requests without injury zones keep the
+    4-tuple the lookup file is keyed by.
+    """
+    equipment = {eq.strip().lower() for eq in equipment_list} & vocabulary.keys()
+    key = (
+        fitness_level.lower(),
+        goal.lower().replace(" ", ""),
+        int(availability),
+        tuple(sorted(equipment)),
+    )
+    injuries = {zone.strip().lower() for zone in injury_zones} - {""}
+    return key + (tuple(sorted(injuries)),) if injuries else key
+
+
+def key_string(key):
+    fitness_level, goal, availability, equipment, *injuries = key
+    text = f"{fitness_level}|{goal}|{availability}|{','.join(equipment)}"
+    return f"{text}|{','.join(injuries[0])}" if injuries else text
+
+
+def plan_size(plan):
+    return len(json.dumps(plan))
+
+
+class PlanCache:
+    """
+    Plans by plan_key() on a cache backend (cache_backends.py) with a time-to-live. The
+    default in-process backend holds the plan dicts themselves, capped in entries and
+    in the total serialized size of the plans; shared backends hold them encoded with
+    cache_codec. Their entry keys carry the plan encoding and the catalog checksum, so
+    workers on another catalog or release never read each other's plans; the
+    in-process backend is cleared when the catalog changes instead.
+
+    With `counters`, process-pool workers ship the cache's counters to the main
+    process under that name (metrics.share_counters), and stats() there includes them.
+    """
+
+    def __init__(self, backend=None, ttl_seconds=3600, counters=None):
+        self.backend = backend if backend is not None else MemoryBackend("plans", sizeof=plan_size)
+        self.ttl_seconds = ttl_seconds
+        self.flights = SingleFlight()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.counters = counters
+        if counters is not None:
+            metrics.share_counters(counters, lambda: counter_values(self.stats(), COUNTERS))
+
+    def _check_version(self, version):
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    if self._version is not None:
+                        self.invalidations += 1
+                    if not self.backend.shared:
+                        self.backend.clear()
+                    self._version = version
+
+    def _entry_key(self, key, version):
+        # The in-process backend is cleared on a new version and takes the tuple itself
+        if not self.backend.shared:
+            return key
+        return f"{PLAN_FORMAT}:{version[:16]}|{key_string(key)}".encode()
+
+    def _fetch(self, entry_key):
+        value = self.backend.get(entry_key)
+        return decode_plan(value) if value is not None and self.backend.shared else value
+
+    def get(self, key, version):
+        """
+        Cached plan for `key`, or None. `version` is the checksum of the catalog the
+        caller is planning against.
+        """
+        self._check_version(version)
+        plan = self._fetch(self._entry_key(key, version))
+        with self._lock:
+            if plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return plan
+
+    def put(self, key, plan, version):
+        self._check_version(version)
+        self.backend.set(self._entry_key(key, version), encode_plan(plan) if self.backend.shared else plan,
+                         self.ttl_seconds)
+
+    def get_or_build(self, key, version, build):
+        """
+        The plan for `key` after a miss: build() and cache it, or wait for the caller
+        already building it, in this process or (shared backends) in another worker.
+        """
+        entry_key = self._entry_key(key, version)
+
+        def compute():
+            plan = build()
+            self.put(key, plan, version)
+            return plan
+
+        return self.flights.run(entry_key, self.backend, lambda: self._fetch(entry_key), compute)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        backend = self.backend.stats()
+        with self._lock:
+            stats = {
+                **backend,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": None,
+                "invalidations": self.invalidations,
+                "single_flight": self.flights.stats(),
+            }
+        if self.counters is not None:
+            metrics.add_worker_counters(self.counters, stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def _load_lookup():
+    # plan_table builds on key_string above
+    from plan_table import PlanTable
+
+    # None when no table has been built
+    return PlanTable(PLAN_LOOKUP_PATH, counters="plan_lookup") if os.path.exists(PLAN_LOOKUP_PATH) else None
+
+
+registry.register("plan_lookup", _load_lookup)
+
+plan_cache = PlanCache(
+    open_backend(os.environ.get("PLAN_CACHE_BACKEND", "memory"), "plans",
+                 max_entries=int(os.environ.get("PLAN_CACHE_ENTRIES", 4096)),
+                 max_bytes=int(os.environ.get("PLAN_CACHE_MAX_BYTES", 64 * 1024 * 1024)), sizeof=plan_size),
+    ttl_seconds=float(os.environ.get("PLAN_CACHE_TTL", 3600)),
+    counters="plan_cache",
+)
+
+
+def _collect():
+    stats = plan_cache.stats()
+    samples = [(f"plan_cache_{name}", "gauge", text, [({}, stats[name])]) for name, text in (
+        ("entries", "Plans held in the plan cache."), ("bytes", "Size of the cached plans.")) if name in stats]
+    # The Redis backend only knows its errors; evictions and expirations happen on the server
+    for name in ("hits", "misses", "evictions", "expirations", "invalidations", "errors"):
+        if name in stats:
+            samples.append((f"plan_cache_{name}_total", "counter", f"Plan cache {name}.", [({}, stats[name])]))
+    samples.append(("plan_cache_builds_total", "counter", "Plans built after a cache miss, by single-flight outcome.",
+                    [({"outcome": outcome}, stats["single_flight"][outcome])
+                     for outcome in FLIGHT_COUNTERS]))
+    # Only reported once the lookup file has been loaded (here or, in process mode, by a
+    # worker), so scraping never loads it
+    table = registry.get("plan_lookup") if registry.is_loaded("plan_lookup") else None
+    lookup = table.stats() if table is not None else metrics.worker_counters("plan_lookup")
+    if lookup:
+        samples.append(("plan_lookup_hits_total", "counter", "Precomputed plan lookup hits.",
+                        [({}, lookup.get("hits", 0))]))
+        samples.append(("plan_lookup_misses_total", "counter", "Precomputed plan lookup misses.",
+                        [({}, lookup.get("misses", 0))]))
+    return samples
+
+
+metrics.register_collector(_collect)
@@ -0,0 +1,225 @@
+"""
+Binary, memory-mapped table of precomputed /workout_planner plans.
+
+precompute_plans.py enumerates a bounded input space and writes it here; the service
+maps the file read-only, so every worker shares the same page-cache pages and a
+lookup decodes one plan without loading anything else.
+
+Layout (little-endian, sections 8-byte aligned):
+    magic               b"PLANTBL1"
+    header length       uint32, then a JSON header: catalog checksum, enumerated
+                        equipment, counts and the (offset, length) of each section
+    key_hashes          uint64[n_keys]  sorted key hashes, binary-searched
+    key_plans           uint32[n_keys]  offset into `plans` of each key's plan
+    string_offsets      uint32[n_strings + 1]
+    strings             UTF-8 blob of every day label, exercise name, muscle, rest
+                        and intensity text, each stored once
+    exercises           uint32[n_exercises, 6]  name, muscle, sets, reps, rest,
+                        intensity of each distinct planned exercise, text as string ids
+    days                uint32 words; a day is [label, n_exercises, exercise ids]
+    plans               uint32 words; a plan is [n_days, offset of each day in `days`]
+
+Keys are the plan_key() tuples, hashed from their key_string() to 64 bits. Identical
+plans are stored once and pointed at by every key producing them, identical days once
+per table (plans for neighbouring equipment subsets and availabilities mostly differ in
+a few days) and identical exercise prescriptions once. The builder refuses colliding
+hashes among the keys it writes; an uncovered request colliding with a covered one
+has a chance of about n_keys / 2**64.
+
+Usage: see precompute_plans.py.
+"""
+import hashlib
+import json
+import mmap
+import os
+import sys
+
+import numpy as np
+
+from cache_codec import EXERCISE_FIELDS, TEXT_FIELDS
+from metrics import metrics
+from plan_cache import key_string
+
+MAGIC = b"PLANTBL1"
+FORMAT_VERSION = 1
+
+
+def key_hash(key):
+    """
+    64-bit hash of a plan_key() tuple.
+    """
+    return int.from_bytes(hashlib.blake2b(key_string(key).encode(), digest_size=8).digest(), "little")
+
+
+def _align(offset):
+    return -(-offset // 8) * 8
+
+
+def write_table(path, plans, catalog_checksum, equipment):
+    """
+    Write {plan_key tuple: plan dict} to `path` (through a temporary file, so readers
+    never map a partial table). Returns (keys, distinct plans, file size).
+    """
+    strings, exercise_ids = {}, {}
+    day_words, plan_words = [], []
+    day_offsets, plan_offsets, key_offsets = {}, {}, {}
+    for key, plan in plans.items():
+        encoded_plan = [len(plan)]
+        for label, exercises in plan.items():
+            encoded = [strings.setdefault(label, len(strings)), len(exercises)]
+            for exercise in exercises:
+                fields = tuple(strings.setdefault(exercise[field], len(strings)) if field in TEXT_FIELDS
+                               else int(exercise[field]) for field in EXERCISE_FIELDS)
+                encoded.append(exercise_ids.setdefault(fields, len(exercise_ids)))
+            encoded = tuple(encoded)
+            if encoded not in day_offsets:
+                day_offsets[encoded] = len(day_words)
+                day_words += encoded
+            encoded_plan.append(day_offsets[encoded])
+        encoded_plan = tuple(encoded_plan)
+        if encoded_plan not in plan_offsets:
+            plan_offsets[encoded_plan] = len(plan_words)
+            plan_words += encoded_plan
+        key_offsets[key_hash(key)] = plan_offsets[encoded_plan]
+    if len(key_offsets) != len(plans):
+        raise ValueError("Plan key hash collision; the table cannot be built")
+
+    key_hashes = np.fromiter(key_offsets, dtype="<u8", count=len(key_offsets))
+    key_plans = np.fromiter(key_offsets.values(), dtype="<u4", count=len(key_offsets))
+    order = np.argsort(key_hashes)
+
+    blobs = [text.encode() for text in strings]
+    string_offsets = np.concatenate([[0], np.cumsum([len(blob) for blob in blobs])]).astype("<u4")
+    sections = [("key_hashes", key_hashes[order].tobytes()), ("key_plans", key_plans[order].tobytes()),
+                ("string_offsets", string_offsets.tobytes()), ("strings", b"".join(blobs)),
+                ("exercises", np.asarray(list(exercise_ids), dtype="<u4").reshape(-1, len(EXERCISE_FIELDS)).tobytes()),
+                ("days", np.asarray(day_words, dtype="<u4").tobytes()),
+                ("plans", np.asarray(plan_words, dtype="<u4").tobytes())]
+
+    header = {"format": FORMAT_VERSION, "catalog_checksum": catalog_checksum, "equipment": list(equipment),
+              "keys": len(key_offsets), "plans": len(plan_offsets), "days": len(day_offsets),
+              "exercises": len(exercise_ids), "strings": len(strings)}
+    # Section offsets depend on the header's length, which depends on them: reserve room
+    prefix = _align(len(MAGIC) + 4 + len(json.dumps({**header, "sections": {
+        name: [2 ** 40, 2 ** 40] for name, _ in sections}}).encode()))
+    offset = prefix
+    header["sections"] = {}
+    for name, blob in sections:
+        header["sections"][name] = [offset, len(blob)]
+        offset = _align(offset + len(blob))
+    encoded_header = json.dumps(header).encode()
+
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, "wb") as f:
+        f.write(MAGIC + len(encoded_header).to_bytes(4, "little") + encoded_header)
+        for name, blob in sections:
+            f.write(b"\0" * (header["sections"][name][0] - f.tell()))
+            f.write(blob)
+    os.replace(staging, path)
+    return len(key_offsets), len(plan_offsets), os.path.getsize(path)
+
+
+class PlanTable:
+    """
+    Read-only view of a table written by write_table(). Only used while the catalog
+    checksum recorded in the file matches the live catalog. `counters` ships the hit
+    and miss counts of process-pool workers to the main process, as in PlanCache.
+    """
+
+    def __init__(self, path, counters=None):
+        self.path = path
+        self.counters = counters
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a plan table")
+        length = int.from_bytes(self._map[len(MAGIC):len(MAGIC) + 4], "little")
+        header = json.loads(self._map[len(MAGIC) + 4:len(MAGIC) + 4 + length])
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has format {header['format']}, expected {FORMAT_VERSION}")
+        self.catalog_checksum = header["catalog_checksum"]
+        self.equipment = header["equipment"]
+        self.keys = header["keys"]
+        self.plans = header["plans"]
+        self.days = header["days"]
+        sections = header["sections"]
+        self._key_hashes = self._section(sections["key_hashes"], "<u8")
+        self._key_plans = self._section(sections["key_plans"], "<u4")
+        self._string_offsets = self._section(sections["string_offsets"], "<u4").tolist()
+        self._strings_start = sections["strings"][0]
+        # Plans are decoded through memoryviews: element access yields Python ints without
+        # NumPy's per-call overhead, and the file is little-endian like every supported host
+        if sys.byteorder != "little":
+            raise ValueError("Plan tables can only be read on little-endian hosts")
+        self._exercises = self._words(sections["exercises"])
+        self._days = self._words(sections["days"])
+        self._plans = self._words(sections["plans"])
+        # Decoded strings and exercise dicts, filled on first use
+        self._texts = [None] * header["strings"]
+        self._exercise_dicts = [None] * header["exercises"]
+        self.hits = 0
+        self.misses = 0
+        if counters is not None:
+            metrics.share_counters(counters, lambda: {"hits": self.hits, "misses": self.misses})
+
+    def _words(self, section):
+        offset, length = section
+        return memoryview(self._map)[offset:offset + length].cast("I")
+
+    def _section(self, section, dtype):
+        offset, length = section
+        return np.frombuffer(self._map, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset)
+
+    def _text(self, i):
+        text = self._texts[i]
+        if text is None:
+            start, end = self._string_offsets[i], self._string_offsets[i + 1]
+            text = self._texts[i] = self._map[self._strings_start + start:self._strings_start + end].decode()
+        return text
+
+    def find(self, key):
+        """
+        Offset of the key's plan in the `plans` words, or None.
+        """
+        h = key_hash(key)
+        i = int(np.searchsorted(self._key_hashes, h))
+        if i < len(self._key_hashes) and int(self._key_hashes[i]) == h:
+            return int(self._key_plans[i])
+        return None
+
+    def _exercise(self, i):
+        exercise = self._exercise_dicts[i]
+        if exercise is None:
+            width = len(EXERCISE_FIELDS)
+            name, muscle, sets, reps, rest, intensity = self._exercises[i * width:(i + 1) * width].tolist()
+            text = self._text
+            exercise = self._exercise_dicts[i] = {"exercise_name": text(name), "primary_muscle": text(muscle),
+                                                  "sets": sets, "reps": reps, "rest": text(rest),
+                                                  "intensity": text(intensity)}
+        return exercise
+
+    def decode(self, offset):
+        """
+        The plan stored at `offset`. Exercise dicts are shared between the plans
+        returned, like the plans of the in-process cache, and must not be modified.
+        """
+        days, exercise = self._days, self._exercise
+        plan = {}
+        for day in self._plans[offset + 1:offset + 1 + self._plans[offset]].tolist():
+            plan[self._text(days[day])] = [exercise(i) for i in days[day + 2:day + 2 + days[day + 1]].tolist()]
+        return plan
+
+    def get(self, key, catalog_checksum):
+        if catalog_checksum != self.catalog_checksum:
+            return None
+        offset = self.find(key)
+        if offset is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.decode(offset)
+
+    def stats(self):
+        stats = {"path": self.path, "keys": self.keys, "plans": self.plans, "days": self.days,
+                 "bytes": len(self._map), "hits": self.hits, "misses": self.misses}
+        return metrics.add_worker_counters(self.counters, stats) if self.counters is not None else stats
@@ -0,0 +1,95 @@
+"""
+Offline job: precompute /workout_planner plans for a bounded input space.
+
+Every fitness level x goal x availability (1-7 days) x subset of the chosen equipment
+list is planned once and written to a memory-mapped plan table (see plan_table.py),
+which the service answers with one hash probe and no catalog query. Requests outside
+the enumerated space (other equipment, injury zones) are planned live.
+
+Equipment subsets that leave the same candidate exercises produce the same plans, so
+each distinct candidate set is assembled once and stored once.
+
+Usage (from the repository root):
+    python precompute_plans.py                       # subsets of the 12 most common primary equipment
+    python precompute_plans.py --top-equipment 8
+    python precompute_plans.py --equipment "Bodyweight,Dumbbell,Barbell,Bench (Flat)"
+    python precompute_plans.py --check               # also verify every key against the table
+"""
+import argparse
+import itertools
+import sys
+import time
+
+from exercise_catalog import get_catalog
+from plan_cache import PLAN_LOOKUP_PATH, plan_key
+from plan_table import PlanTable, write_table
+from workout_planner import (
+    DIFFICULTY_LEVELS,
+    assemble_plan_from_bits,
+    candidate_bits,
+    generate_plan_split_simple,
+    primary_exercise_classification,
+)
+
+MAX_AVAILABILITY = 7
+
+
+def equipment_subsets(equipment):
+    for size in range(len(equipment) + 1):
+        yield from itertools.combinations(equipment, size)
+
+
+def precompute(catalog, equipment):
+    """
+    {plan_key tuple: plan} over the whole input space.
+    """
+    plans = {}
+    for fitness_level, goal in itertools.product(DIFFICULTY_LEVELS, primary_exercise_classification):
+        # candidate bitset -> plan per availability, shared by the subsets that select the same candidates
+        assembled = {}
+        for subset in equipment_subsets(equipment):
+            # Query once per (level, goal, equipment); only the split differs per availability
+            bits = candidate_bits(catalog, fitness_level, goal, subset)
+            candidates = bits.tobytes()
+            if candidates not in assembled:
+                assembled[candidates] = [
+                    assemble_plan_from_bits(catalog, bits, generate_plan_split_simple(availability), goal,
+                                            fitness_level)
+                    for availability in range(1, MAX_AVAILABILITY + 1)]
+            for availability, plan in enumerate(assembled[candidates], start=1):
+                plans[plan_key(fitness_level, goal, availability, subset, catalog.equipment_vocabulary)] = plan
+    return plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute workout plans into a memory-mapped plan table.")
+    parser.add_argument("--output", default=PLAN_LOOKUP_PATH)
+    parser.add_argument("--equipment", help="comma-separated equipment list to enumerate subsets of")
+    parser.add_argument("--top-equipment", type=int, default=12,
+                        help="without --equipment, use the N most common primary equipment values")
+    parser.add_argument("--check", action="store_true", help="read every key back from the written table")
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    if args.equipment:
+        equipment = [eq.strip() for eq in args.equipment.split(",") if eq.strip()]
+    else:
+        counts = sorted(catalog.by_primary_equipment.items(), key=lambda item: -len(item[1]))
+        equipment = [name for name, _ in counts[:args.top_equipment]]
+
+    start = time.perf_counter()
+    plans = precompute(catalog, equipment)
+    keys, distinct, size = write_table(args.output, plans, catalog.checksum, equipment)
+    print(f"Wrote {keys} keys ({distinct} distinct plans, {size / 1e6:.1f}MB) over {', '.join(equipment)} "
+          f"to {args.output} in {time.perf_counter() - start:.1f}s")
+
+    if args.check:
+        table = PlanTable(args.output)
+        mismatches = sum(table.get(key, catalog.checksum) != plan for key, plan in plans.items())
+        print(f"Checked {len(plans)} keys: {mismatches} mismatches")
+        if mismatches:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
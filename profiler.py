@@ -0,0 +1,99 @@
+"""
+Opt-in sampling profiler for individual requests.
+
+While a SamplingProfiler is running, a background thread captures the stack of the
+profiled thread every `interval` seconds; the result is the sample count per distinct
+stack in the collapsed format flame-graph tools read ("outer;inner;leaf count").
+Nothing runs unless a profile is requested, so it costs nothing otherwise.
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# Profiles kept for GET /admin/profiles/{id}
+MAX_PROFILES = 50
+
+# Set by the request middleware to a list when the current request is being profiled;
+# CpuExecutor.run then profiles the request's tasks and appends their profiles to it
+request_profiles = contextvars.ContextVar("request_profiles", default=None)
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.001, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.collapsed()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+def profile_call(fn, *args):
+    """
+    (fn(*args), collapsed profile of the call) for the calling thread.
+    """
+    profiler = SamplingProfiler().start()
+    try:
+        result = fn(*args)
+    finally:
+        profile = profiler.stop()
+    return result, profile
+
+
+class ProfileStore:
+    """
+    Most recent request profiles by id.
+    """
+
+    def __init__(self, max_profiles=MAX_PROFILES):
+        self.max_profiles = max_profiles
+        self.enabled = os.environ.get("REQUEST_PROFILING", "0") == "1"
+        self._profiles = OrderedDict()
+        self._ids = iter(range(1, sys.maxsize))
+        self._lock = threading.Lock()
+
+    def add(self, path, profiles):
+        with self._lock:
+            profile_id = str(next(self._ids))
+            self._profiles[profile_id] = {"path": path, "created": time.time(), "profiles": profiles}
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+            return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [{"id": profile_id, "path": entry["path"], "created": entry["created"]}
+                    for profile_id, entry in self._profiles.items()]
+
+
+profiles = ProfileStore()
@@ -0,0 +1,115 @@
+"""
+The service's subsystems, loaded lazily, and the warm-up that loads them ahead of
+traffic.
+
+main.py imports none of the modules below at import time: pandas, NumPy, the exercise
+catalog and the calorie kernel are pulled in by the first request of an endpoint that
+needs them (its function-level imports, then the model registry), or by the warm-up
+the app starts in the background at startup. /healthz answers as soon as the process
+serves requests; /readyz reports which subsystems are warm and turns 200 once the
+warm-up has finished, so orchestrators route traffic to a worker only then. With a
+process pool (cpu_pool.py), every pool worker loads the subsystems in its initializer
+and the main process only warms MAIN_PROCESS_SUBSYSTEMS, the parts it serves itself.
+
+Subsystems:
+- nutrition: /nutrition_plan (pure Python; the batch endpoint adds NumPy on first use)
+- calories: /predict_calories*, the calorie cache, batcher and bulk scoring
+- planner: /workout_planner, /workout_program, /cohort_plan, /exercises/search and the
+  planning half of /full_profile
+
+Startup benchmark and regression thresholds (from the repository root):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --check
+"""
+import importlib
+import logging
+import sys
+import threading
+import time
+
+from model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+# name -> (modules imported, registry artifacts loaded), in warm-up order
+SUBSYSTEMS = {
+    "nutrition": (("nutrient",), ()),
+    "calories": (("calorie_predictor", "calorie_cache", "calorie_batcher", "bulk_scoring"), ("calorie_kernel",)),
+    "planner": (("exercise_catalog", "exercise_query", "workout_planner", "workout_program", "cohort"),
+                ("exercise_catalog", "plan_lookup")),
+}
+# What the main process uses itself when the CPU-bound work runs in process workers,
+# which load SUBSYSTEMS on their own: request validation and streaming, /nutrition_plan,
+# the calorie cache (keyed by the kernel's digest) and /full_profile's weekly volume.
+# The catalog and the plan table are only read by the workers.
+MAIN_PROCESS_SUBSYSTEMS = {
+    "nutrition": (("nutrient",), ()),
+    "calories": (("calorie_predictor", "calorie_cache", "calorie_batcher", "bulk_scoring"), ("calorie_kernel",)),
+    "planner": (("workout_planner", "workout_program", "cohort"), ()),
+}
+
+
+class Subsystems:
+    def __init__(self, subsystems=SUBSYSTEMS):
+        self.subsystems = subsystems
+        # pending, running, done, failed, or disabled when everything loads on first use
+        self.warmup = "pending"
+        self.error = None
+        self._seconds = {}
+        self._lock = threading.Lock()
+
+    def main_process_only(self):
+        """
+        Warm up and report MAIN_PROCESS_SUBSYSTEMS only (EXECUTION_MODE=process).
+        """
+        self.subsystems = MAIN_PROCESS_SUBSYSTEMS
+
+    def is_warm(self, name):
+        """
+        Whether every module and artifact of `name` is loaded, by the warm-up or by
+        the requests that needed them.
+        """
+        modules, artifacts = self.subsystems[name]
+        return all(module in sys.modules for module in modules) and all(map(registry.is_loaded, artifacts))
+
+    def load(self, name):
+        modules, artifacts = self.subsystems[name]
+        start = time.perf_counter()
+        for module in modules:
+            importlib.import_module(module)
+        for artifact in artifacts:
+            registry.get(artifact)
+        self._seconds[name] = round(time.perf_counter() - start, 6)
+
+    def warm(self, names=None):
+        """
+        Load every subsystem (or just `names`); on failure the warm-up is marked failed
+        and the service stays unready, the error logged and reported on /readyz.
+        """
+        with self._lock:
+            self.warmup = "running"
+            try:
+                for name in names or self.subsystems:
+                    self.load(name)
+            except Exception as exc:
+                logger.exception("Warm-up failed")
+                self.warmup = "failed"
+                self.error = f"{type(exc).__name__}: {exc}"
+                return False
+            self.warmup = "done"
+            return True
+
+    @property
+    def ready(self):
+        return self.warmup in ("done", "disabled")
+
+    def stats(self):
+        return {
+            "warmup": self.warmup,
+            "error": self.error,
+            "subsystems": {name: {"warm": self.is_warm(name), "warmup_seconds": self._seconds.get(name)}
+                           for name in self.subsystems},
+        }
+
+
+subsystems = Subsystems()
@@ -0,0 +1,10 @@
+"""
+Tests run against the repository root: its modules are imported as top-level modules and
+read their artifacts (exercise.csv, calorie_burned/...) through relative paths.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
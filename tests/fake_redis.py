@@ -0,0 +1,138 @@
+"""
+Fake Redis server implementing the subset of Redis that RedisBackend uses
+(cache_backends.py), for the tests and benchmarks without a Redis installation.
+
+Usage (from the repository root):
+    python tests/fake_redis.py --port 6390   # serve the fake until Ctrl-C
+"""
+import argparse
+import fnmatch
+import os
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_backends import RedisError, read_reply
+
+
+class _FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            if server.delay:
+                time.sleep(server.delay)
+            try:
+                reply = server.execute([arg.upper() if i == 0 else arg for i, arg in enumerate(command)])
+            except RedisError as exc:
+                self.wfile.write(b"-ERR %s\r\n" % str(exc).encode())
+                continue
+            self.wfile.write(_encode_reply(reply))
+
+
+def _encode_reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(map(_encode_reply, value))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """
+    In-process server of the Redis commands RedisBackend uses (PING, SELECT, GET, MGET,
+    SET with EX/PX/NX, DEL, SCAN, DBSIZE, FLUSHDB), one database, expiry on access.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+    # Every thread of a benchmark connects at once
+    request_queue_size = 128
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _FakeRedisHandler)
+        self.port = self.server_address[1]
+        self.data = {}
+        self.data_lock = threading.Lock()
+        # Seconds added before every reply, to stand in for a slow server
+        self.delay = 0.0
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def _value(self, key, now):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] <= now:
+            del self.data[key]
+            return None
+        return entry and entry[0]
+
+    def execute(self, command):
+        name, args = command[0], command[1:]
+        now = time.monotonic()
+        with self.data_lock:
+            if name == b"PING":
+                return "PONG"
+            if name == b"SELECT":
+                return "OK"
+            if name == b"GET":
+                return self._value(args[0], now)
+            if name == b"MGET":
+                return [self._value(key, now) for key in args]
+            if name == b"SET":
+                key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+                expires = float("inf")
+                for unit, scale in ((b"EX", 1.0), (b"PX", 1e-3)):
+                    if unit in options:
+                        expires = now + int(options[options.index(unit) + 1]) * scale
+                if b"NX" in options and self._value(key, now) is not None:
+                    return None
+                self.data[key] = (value, expires)
+                return "OK"
+            if name == b"DEL":
+                return sum(self.data.pop(key, None) is not None for key in args)
+            if name == b"SCAN":
+                options = [arg.upper() for arg in args]
+                pattern = args[options.index(b"MATCH") + 1] if b"MATCH" in options else b"*"
+                # The whole keyspace in one page
+                return [b"0", [key for key in list(self.data) if self._value(key, now) is not None
+                                and fnmatch.fnmatchcase(key, pattern)]]
+            if name == b"DBSIZE":
+                return len(self.data)
+            if name == b"FLUSHDB":
+                self.data.clear()
+                return "OK"
+        raise RedisError(f"unknown command '{name.decode(errors='replace')}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Redis server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    server = FakeRedisServer(args.host, args.port)
+    print(f"Fake Redis listening on {args.host}:{server.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
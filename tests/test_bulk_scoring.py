@@ -0,0 +1,35 @@
+import json
+
+from bulk_scoring import score_stream
+
+SESSION = {"Gender": "male", "Age": 30, "Height": 180, "Weight": 80, "Duration": 30, "Heart_Rate": 100,
+           "Body_Temp": 39}
+HEADER = "User_ID,Gender,Age,Height,Weight,Duration,Heart_Rate,Body_Temp\n"
+ROW = "male,30,180,80,30,100,39\n"
+
+
+def score(text, fmt):
+    return [json.loads(line) for line in b"".join(score_stream([text.encode()], fmt)).decode().splitlines()]
+
+
+def keys(lines):
+    return [{key: value for key, value in line.items() if key in ("User_ID", "row")} for line in lines]
+
+
+def test_ndjson_records_without_an_id_are_keyed_by_row():
+    records = [{"User_ID": 1, **SESSION}, SESSION, {"User_ID": None, **SESSION}, {"User_ID": "a", **SESSION}]
+    text = "".join(json.dumps(record) + "\n" for record in records) + "not json\n"
+    lines = score(text, "ndjson")
+    assert keys(lines) == [{"User_ID": 1}, {"row": 1}, {"row": 2}, {"User_ID": "a"}, {"row": 4}]
+    assert lines[4]["error"] == "invalid record"
+
+
+def test_csv_records_without_an_id_are_keyed_by_row():
+    lines = score(HEADER + "1," + ROW + "," + ROW + "ab," + ROW, "csv")
+    assert keys(lines) == [{"User_ID": 1}, {"row": 1}, {"User_ID": "ab"}]
+    assert keys(score(HEADER.split(",", 1)[1] + ROW, "csv")) == [{"row": 0}]
+
+
+def test_formats_agree():
+    ndjson = score(json.dumps({"User_ID": 7, **SESSION}) + "\n" + json.dumps(SESSION) + "\n", "ndjson")
+    assert ndjson == score(HEADER + "7," + ROW + "," + ROW, "csv")
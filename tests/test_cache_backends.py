@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from cache_backends import CacheBackend, MemoryBackend, RedisBackend, SingleFlight, SQLiteBackend
+from cache_codec import decode_plan, encode_plan
+from fake_redis import FakeRedisServer
+
+PLAN = {"Day 1 - Full Body": [{"exercise_name": "Push-up", "primary_muscle": "Chest", "sets": 3, "reps": 12,
+                               "rest": "60 sec", "intensity": "Moderate"}], "Day 2 - Rest": []}
+
+
+@pytest.fixture
+def redis_server():
+    server = FakeRedisServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend("check", max_entries=3)
+    if request.param == "sqlite":
+        return SQLiteBackend("check", str(tmp_path / "cache.db"), max_entries=3)
+    return RedisBackend("check", port=request.getfixturevalue("redis_server").port)
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_get_set_and_expiry(backend):
+    backend.set_many({b"a": b"1", b"b": encode_plan(PLAN)}, ttl=60)
+    assert backend.get_many([b"a", b"b", b"c"])[0] == b"1"
+    assert backend.get(b"c") is None
+    assert decode_plan(backend.get(b"b")) == PLAN
+    backend.set(b"short", b"x", ttl=0.05)
+    time.sleep(0.1)
+    assert backend.get(b"short") is None
+
+
+def test_add_delete_and_clear(backend):
+    assert backend.add(b"lock", b"1", 60)
+    assert not backend.add(b"lock", b"2", 60)
+    backend.delete(b"lock")
+    assert backend.get(b"lock") is None
+    assert backend.add(b"lock", b"3", 60)
+    backend.set(b"a", b"1", ttl=60)
+    backend.clear()
+    assert backend.get_many([b"a", b"lock"]) == [None, None]
+
+
+def test_single_flight_computes_once(backend):
+    flights = SingleFlight(lock_ttl=5.0)
+    calls, results = [], []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        backend.set(b"flight", b"value", ttl=60)
+        return b"value"
+
+    threads = [threading.Thread(target=lambda: results.append(
+        flights.run(b"flight", backend, lambda: backend.get(b"flight"), compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [b"value"] * 8
+
+
+def test_async_single_flight_computes_once(backend):
+    flights = SingleFlight(lock_ttl=5.0)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        backend.set(b"async", b"value", ttl=60)
+        return b"value"
+
+    async def stampede():
+        return await asyncio.gather(*(flights.run_async(b"async", backend, lambda: backend.get(b"async"), compute)
+                                      for _ in range(8)))
+
+    assert asyncio.run(stampede()) == [b"value"] * 8
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("make", [lambda path: MemoryBackend("check", max_entries=3),
+                                  lambda path: SQLiteBackend("check", str(path / "cache.db"), max_entries=3)],
+                         ids=["memory", "sqlite"])
+def test_entries_beyond_max_entries_are_evicted(make, tmp_path):
+    backend = make(tmp_path)
+    # SQLite evicts every EVICT_EVERY writes
+    backend.EVICT_EVERY = 1
+    backend.set_many({b"%d" % i: b"v" for i in range(5)}, ttl=60)
+    assert backend.stats()["entries"] == 3
+
+
+def test_memory_add_admits_one_of_many_concurrent_callers():
+    for _ in range(50):
+        backend = MemoryBackend("locks")
+        barrier = threading.Barrier(8)
+        taken = []
+
+        def take():
+            barrier.wait()
+            taken.append(backend.add(b"lock:key", b"1", 10.0))
+
+        threads = [threading.Thread(target=take) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert taken.count(True) == 1
+
+
+def test_unreachable_redis_reads_as_a_miss():
+    server = FakeRedisServer().start()
+    redis = RedisBackend("check", port=server.port, retry_seconds=0.0)
+    server.stop()
+    assert redis.get(b"a") is None
+    assert redis.stats()["errors"]
+
+
+def test_slow_shared_backend_does_not_block_the_event_loop(monkeypatch, redis_server):
+    import main
+    from calorie_cache import calorie_cache
+
+    redis_server.delay = 0.05
+    monkeypatch.setattr(calorie_cache, "enabled", True)
+    monkeypatch.setattr(calorie_cache, "backend", RedisBackend("loop", port=redis_server.port, timeout=2.0))
+    record = np.array([0.0, 30, 180, 80, 30, 100, 39.5])
+
+    async def score_while_ticking():
+        gaps, scoring = [], True
+
+        async def tick():
+            last = time.perf_counter()
+            while scoring:
+                await asyncio.sleep(0.002)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticker = asyncio.create_task(tick())
+        # A miss (lookup, lock, fill) and then a hit, each a few slow round trips
+        totals = [await main.memoized_calories(record) for _ in range(2)]
+        scoring = False
+        await ticker
+        return totals, max(gaps)
+
+    (miss, hit), longest_gap = asyncio.run(score_while_ticking())
+    assert hit == pytest.approx(miss)
+    assert calorie_cache.stats()["hits"] >= 1
+    # Every round trip takes 50 ms; none of them may hold up the loop
+    assert longest_gap < 0.04
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from calorie_cache import CalorieCache, check, parse_steps
+from calorie_predictor import MAX_DURATION
+
+
+@pytest.mark.parametrize("steps, max_error", [(None, 4.0), ("Duration=0.25,Heart_Rate=1", 5.0)])
+def test_memoized_sessions_stay_within_the_bound(steps, max_error):
+    cache = CalorieCache(parse_steps(steps), max_entries=10 ** 6, max_error=max_error, enabled=True)
+    sessions, worst, worst_ratio, violations = check(cache, rows=1000, seed=1)
+    assert violations == 0
+    assert worst_ratio <= 1.0
+    assert cache.stats()["hits"] > 0
+    # check() scores sessions of up to 300 minutes and 20 seconds, so at most 6 chunks each
+    assert worst <= max_error * np.ceil((300 + 20 / 60) / MAX_DURATION)
+
+
+def test_bound_holds_across_seeds():
+    for seed in range(3):
+        cache = CalorieCache(max_entries=10 ** 6, enabled=True)
+        assert check(cache, rows=300, seed=seed)[3] == 0
@@ -0,0 +1,18 @@
+import numpy as np
+
+from calorie_kernel import check_parity, compile_pipeline, load_kernel, load_pipeline, pipeline_digest
+
+
+def test_kernel_matches_sklearn_pipeline():
+    pipeline = load_pipeline()
+    kernel = compile_pipeline(*pipeline, pipeline_digest())
+    assert check_parity(kernel, pipeline) <= 1e-9
+
+
+def test_exported_kernel_matches_compiled_one():
+    pipeline = load_pipeline()
+    compiled = compile_pipeline(*pipeline, pipeline_digest())
+    loaded = load_kernel()
+    assert loaded.source_digest == compiled.source_digest
+    X = np.random.default_rng(0).uniform([0, 18, 150, 40, 1, 70, 37], [1, 80, 210, 130, 300, 130, 42], (1000, 7))
+    np.testing.assert_allclose(loaded.predict(X), compiled.predict(X), rtol=0, atol=1e-9)
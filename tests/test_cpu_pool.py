@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import pytest
+
+from cpu_pool import CpuExecutor, PoolSaturated, TaskTimeout
+
+
+def test_default_admits_a_burst_on_one_core():
+    executor = CpuExecutor("thread", workers=1)
+    executor.start()
+
+    async def burst():
+        return await asyncio.gather(*(executor.run(time.sleep, 0.01) for _ in range(16)))
+
+    try:
+        assert asyncio.run(burst()) == [None] * 16
+        assert executor.rejected == 0
+    finally:
+        executor.shutdown()
+
+
+def test_timed_out_task_keeps_its_slot_until_it_finishes():
+    executor = CpuExecutor("thread", workers=1, max_pending=1, timeout=0.05)
+    executor.start()
+
+    async def scenario():
+        with pytest.raises(TaskTimeout):
+            await executor.run(time.sleep, 0.3)
+        # Still running in the pool: the slot is not free yet
+        assert executor.pending == 1
+        with pytest.raises(PoolSaturated):
+            await executor.run(time.sleep, 0)
+        await asyncio.sleep(0.4)
+        assert executor.pending == 0
+        await executor.run(time.sleep, 0)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+
+def test_process_workers_ship_cache_counters():
+    from cpu_pool import plan_workout
+    from plan_cache import plan_cache
+
+    # Injury zones keep the request out of the precomputed plan table
+    request = {"fitness_level": "Beginner", "goal": "strength", "availability": 2, "equipment_str": "Kettlebell",
+               "injury_str": "Wrist", "age": 30, "gender": "male", "height": 180, "weight": 80}
+    before = plan_cache.stats()
+    executor = CpuExecutor("process", workers=1)
+    executor.start()
+
+    async def plan_twice():
+        return [await executor.run(plan_workout, request) for _ in range(2)]
+
+    try:
+        first, second = asyncio.run(plan_twice())
+    finally:
+        executor.shutdown()
+    assert first == second
+    after = plan_cache.stats()
+    # Planned in the worker, counted in this process
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+    assert after["single_flight"]["computed"] - before["single_flight"]["computed"] == 1
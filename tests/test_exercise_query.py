@@ -0,0 +1,49 @@
+import os
+
+from fastapi.testclient import TestClient
+
+from exercise_catalog import get_catalog
+from exercise_query import search
+
+
+def test_text_search_skips_the_row_without_a_name():
+    catalog = get_catalog()
+    unnamed = [row for row, name in enumerate(catalog.exercise_names) if not isinstance(name, str)]
+    # exercise.csv has one exercise without a name; the text filter used to fail on it
+    assert unnamed
+    total, records = search(catalog, text="press", limit=500)
+    assert total == len(records) > 0
+    assert all("press" in record["exercise"].lower() for record in records)
+
+
+def test_search_endpoint_answers_text_queries():
+    import main
+
+    with TestClient(main.app) as client:
+        response = client.get("/exercises/search", params={"q": "Press", "limit": 5})
+    assert response.status_code == 200
+    assert response.json()["total"] > 0
+
+
+def test_reload_swaps_in_a_new_catalog(monkeypatch, tmp_path):
+    import exercise_catalog
+    from model_registry import ModelRegistry
+
+    csv_path = tmp_path / "exercise.csv"
+    lines = open(exercise_catalog.EXERCISE_CSV, "rb").read().splitlines(keepends=True)
+    csv_path.write_bytes(b"".join(lines))
+    registry = ModelRegistry()
+    registry.register("exercise_catalog",
+                      lambda: exercise_catalog.ExerciseCatalog(str(csv_path), str(tmp_path / "columns")))
+    monkeypatch.setattr(exercise_catalog, "registry", registry)
+
+    before = get_catalog()
+    state = (before.version, before.size, before.index, before.exercise_names)
+    csv_path.write_bytes(b"".join(lines[:-1]))
+    os.utime(csv_path, (before.mtime + 10, before.mtime + 10))
+    after = get_catalog()
+    # A request holding the old catalog keeps seeing the whole of the old load
+    assert after is not before
+    assert (before.version, before.size, before.index, before.exercise_names) == state
+    assert after.size == before.size - 1 and after.version > before.version
+    assert get_catalog() is after
@@ -0,0 +1,33 @@
+from metrics import Metrics, metrics
+from plan_cache import PlanCache
+
+
+def test_worker_counters_are_shipped_as_increments():
+    worker, main = Metrics(), Metrics()
+    counts = {"hits": 0, "misses": 0}
+    worker.share_counters("cache", lambda: dict(counts))
+    worker.buffer()
+    counts["hits"] += 2
+    main.merge(worker.drain())
+    counts["hits"] += 1
+    counts["misses"] += 1
+    main.merge(worker.drain())
+    # Nothing new since the last drain
+    assert worker.drain() == ([], {})
+    assert main.worker_counters("cache") == {"hits": 3, "misses": 1}
+
+
+def test_nothing_is_shipped_without_buffering():
+    metrics = Metrics()
+    metrics.share_counters("cache", lambda: {"hits": 1})
+    assert metrics.drain() == ([], {})
+
+
+def test_cache_stats_include_worker_counters():
+    cache = PlanCache(counters="test_plan_cache")
+    cache.get(("beginner", "fatloss", 3, ()), "v1")
+    # What a process worker's drain() returns after two hits and one build
+    metrics.merge(([], {"test_plan_cache": {"hits": 2, "single_flight.computed": 1}}))
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 1, 0.6667)
+    assert stats["single_flight"]["computed"] == 1
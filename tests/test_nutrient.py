@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from calorie_predictor import round2
+from nutrient import MACRO_TABLES, get_macros_batch, get_macros_from_user_input
+
+FIELDS = ("activity_level", "goal", "fitness_level")
+
+
+def mixed_case(value, rng):
+    return "".join(c.upper() if rng.random() < 0.5 else c.lower() for c in value)
+
+
+def spellings(field, rng):
+    """
+    Every alias MACRO_TABLES stores for `field`, plus mixed-case and separator variants.
+    """
+    aliases = list(MACRO_TABLES.aliases[field])
+    variants = [mixed_case(alias, rng) for alias in aliases]
+    variants += [f" {name.replace('_', '-')} " for name in MACRO_TABLES.names[field]]
+    return aliases + variants
+
+
+def assert_parity(users):
+    batch = get_macros_batch({key: [user[key] for user in users] for key in users[0]})
+    batch = {field: values.tolist() for field, values in batch.items()}
+    for i, user in enumerate(users):
+        expected = get_macros_from_user_input(user)
+        assert {field: values[i] for field, values in batch.items()} == expected, user
+
+
+def test_batch_matches_scalar_on_random_users():
+    rng = np.random.default_rng(7)
+    choices = {field: spellings(field, rng) for field in FIELDS}
+    users = [{
+        "weight": round(float(rng.uniform(35, 180)), int(rng.integers(0, 3))),
+        "height": round(float(rng.uniform(140, 210)), int(rng.integers(0, 2))),
+        "age": int(rng.integers(14, 90)),
+        "gender": str(rng.choice(["male", "Male", "MALE", "female", "Female", "other"])),
+        **{field: str(rng.choice(choices[field])) for field in FIELDS},
+    } for _ in range(5000)]
+    assert_parity(users)
+
+
+def test_batch_matches_scalar_for_every_alias():
+    rng = np.random.default_rng(11)
+    users = []
+    for field in FIELDS:
+        for spelling in spellings(field, rng):
+            user = {"weight": 72.5, "height": 175.0, "age": 30, "gender": "female",
+                    "activity_level": "moderate", "goal": "strength", "fitness_level": "beginner"}
+            user[field] = spelling
+            users.append(user)
+    assert_parity(users)
+
+
+def test_batch_matches_scalar_on_rounding_boundaries():
+    # Quarter-kilogram weights put protein_per_kg * weight and the kcal splits on exact
+    # halves, where round() and np.rint must both round to even
+    users = [{"weight": weight, "height": height, "age": 40, "gender": gender, "activity_level": activity,
+              "goal": goal, "fitness_level": fitness}
+             for weight in np.arange(40, 120.25, 0.25).tolist()
+             for height in (150.0, 162.5, 180.0)
+             for gender in ("male", "female")
+             for activity in MACRO_TABLES.names["activity_level"]
+             for goal in MACRO_TABLES.names["goal"]
+             for fitness in MACRO_TABLES.names["fitness_level"]]
+    assert_parity(users)
+
+
+def test_round2_matches_round_on_ties():
+    values = np.array([k / 1000 for k in range(-100005, 100005, 10)] + [0.125, 2.675, 1.005, 1e6 + 0.005])
+    assert round2(values).tolist() == [round(value, 2) for value in values.tolist()]
+
+
+def test_batch_rejects_unknown_values_like_scalar():
+    user = {"weight": 70, "height": 170, "age": 30, "gender": "male", "activity_level": "moderate",
+            "goal": "bulk", "fitness_level": "beginner"}
+    with pytest.raises(ValueError):
+        get_macros_from_user_input(user)
+    with pytest.raises(ValueError, match="bulk"):
+        get_macros_batch({key: [value] for key, value in user.items()})
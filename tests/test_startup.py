@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_startup import ENDPOINTS, LIGHT_ENDPOINTS, THRESHOLDS, measure
+
+# Multiplies every threshold, for machines slower than the reference one
+SCALE = float(os.environ.get("STARTUP_SCALE", "1"))
+
+
+@pytest.mark.parametrize("target", list(ENDPOINTS) + ["ready"])
+def test_startup_within_thresholds(target):
+    result = measure(target, repeat=1)
+    assert result["heavy"] == [], f"import main loads {', '.join(result['heavy'])}"
+    assert result["import"] <= THRESHOLDS["import"] * SCALE
+    assert result["seconds"] <= THRESHOLDS[target] * SCALE
+    if target in LIGHT_ENDPOINTS:
+        assert result["heavy_after"] == []
+
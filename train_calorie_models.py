@@ -0,0 +1,187 @@
+"""
+Reproducible training of calorie model candidates into the model store.
+
+Every candidate is fitted on the same seeded 80/20 split of calorie_burned/exercise.csv
+joined with calorie_burned/calories.csv, compiled into a NumPy kernel (see
+calorie_kernel.py), checked against its sklearn model, then scored on the holdout:
+- accuracy: MAE, RMSE and R² in kcal;
+- inference cost: row_us, microseconds per row in a holdout-sized batch
+  (/predict_calories_batch, bulk scoring), and call_us, microseconds for a single-row
+  call (/predict_calories).
+
+Each candidate is stored as a version named after the candidate and a digest of the
+data, parameters and sklearn version, so retraining unchanged inputs rewrites the same
+version. The winner is the lowest-MAE candidate within the latency budget; with
+--activate it becomes the active model (hot-swapped by running services, see
+calorie_models.py) when it beats the active one by at least --min-gain kcal MAE.
+
+Usage (from the repository root):
+    python train_calorie_models.py
+    python train_calorie_models.py --candidates lasso_poly3,gbr --max-row-us 5 --activate
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+
+from calorie_kernel import MODEL_DIR, compile_boosted_trees, compile_pipeline
+from calorie_models import STORE_PATH, ModelStore
+from calorie_predictor import FEATURES, encode_gender
+
+DATA_FILES = ["exercise.csv", "calories.csv"]
+
+# name -> (kind, parameters); lasso_poly3 is the notebook's pipeline, gbr its GradientBoostingRegressor
+CANDIDATES = {
+    "lasso_poly2": ("polynomial", {"degree": 2, "alpha": 1.0}),
+    "lasso_poly3": ("polynomial", {"degree": 3, "alpha": 1.0}),
+    "lasso_poly3_a0.1": ("polynomial", {"degree": 3, "alpha": 0.1}),
+    "lasso_poly4_a0.1": ("polynomial", {"degree": 4, "alpha": 0.1}),
+    "gbr": ("tree_ensemble", {"n_estimators": 100, "max_depth": 3, "learning_rate": 0.1}),
+    "gbr_300_d4": ("tree_ensemble", {"n_estimators": 300, "max_depth": 4, "learning_rate": 0.1}),
+}
+
+SEED = 42
+TEST_SIZE = 0.2
+
+# Kernel vs sklearn model on the holdout, kcal
+PARITY_TOLERANCE = 1e-6
+
+
+def load_dataset(data_dir=MODEL_DIR):
+    """
+    (X, y, digest) of the training data; the digest covers both CSV files.
+    """
+    import pandas as pd
+
+    digest = hashlib.sha256()
+    for name in DATA_FILES:
+        with open(os.path.join(data_dir, name), "rb") as f:
+            digest.update(f.read())
+    df = pd.read_csv(os.path.join(data_dir, "exercise.csv")).merge(
+        pd.read_csv(os.path.join(data_dir, "calories.csv")), on="User_ID")
+    df["Gender"] = df["Gender"].map(encode_gender)
+    return df[FEATURES].to_numpy(dtype=np.float64), df["Calories"].to_numpy(dtype=np.float64), digest.hexdigest()
+
+
+def fit(kind, params, X, y):
+    """
+    (fitted sklearn predictor as a callable, compiled kernel) for one candidate.
+    """
+    if kind == "polynomial":
+        from sklearn.linear_model import Lasso
+        from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+        scaler = StandardScaler().fit(X)
+        poly = PolynomialFeatures(degree=params["degree"]).fit(scaler.transform(X))
+        model = Lasso(alpha=params["alpha"], max_iter=10000).fit(poly.transform(scaler.transform(X)), y)
+        return lambda X: model.predict(poly.transform(scaler.transform(X))), compile_pipeline(scaler, poly, model)
+    if kind == "tree_ensemble":
+        from sklearn.ensemble import GradientBoostingRegressor
+
+        model = GradientBoostingRegressor(random_state=SEED, **params).fit(X, y)
+        return model.predict, compile_boosted_trees(model)
+    raise ValueError(f"Unknown model kind '{kind}'")
+
+
+def evaluate(kernel, X, y):
+    """
+    Holdout accuracy and inference cost of a compiled kernel.
+    """
+    predicted = kernel.predict(X)
+    error = predicted - y
+    row_seconds = min(timeit.repeat(lambda: kernel.predict(X), number=3, repeat=5)) / 3 / len(X)
+    call_seconds = min(timeit.repeat(lambda: kernel.predict(X[:1]), number=200, repeat=5)) / 200
+    return {
+        "mae": round(float(np.abs(error).mean()), 4),
+        "rmse": round(float(np.sqrt((error ** 2).mean())), 4),
+        "r2": round(float(1 - (error ** 2).sum() / ((y - y.mean()) ** 2).sum()), 6),
+        "row_us": round(row_seconds * 1e6, 3),
+        "call_us": round(call_seconds * 1e6, 1),
+    }
+
+
+def version_name(name, kind, params, data_digest):
+    import sklearn
+
+    key = json.dumps({"kind": kind, "params": params, "data": data_digest, "seed": SEED, "test_size": TEST_SIZE,
+                      "sklearn": sklearn.__version__}, sort_keys=True)
+    return f"{name}-{hashlib.sha256(key.encode()).hexdigest()[:10]}"
+
+
+def pick_winner(results, max_row_us, max_call_us):
+    """
+    The lowest-MAE result within the latency budget (faster first on ties), or None.
+    """
+    eligible = [r for r in results if r["metrics"]["row_us"] <= max_row_us and r["metrics"]["call_us"] <= max_call_us]
+    return min(eligible, key=lambda r: (r["metrics"]["mae"], r["metrics"]["row_us"]), default=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train, evaluate and store calorie model candidates.")
+    parser.add_argument("--candidates", default=",".join(CANDIDATES), help="comma-separated candidate names")
+    parser.add_argument("--store", default=os.environ.get("CALORIE_MODEL_STORE", STORE_PATH))
+    parser.add_argument("--max-row-us", type=float, default=5.0, help="budget per row of a batch, microseconds")
+    parser.add_argument("--max-call-us", type=float, default=250.0, help="budget per single-row call, microseconds")
+    parser.add_argument("--min-gain", type=float, default=0.05, help="kcal of holdout MAE the winner must gain")
+    parser.add_argument("--activate", action="store_true", help="make the winner the active model")
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+
+    names = [name.strip() for name in args.candidates.split(",") if name.strip()]
+    unknown = set(names) - set(CANDIDATES)
+    if unknown:
+        parser.error(f"unknown candidates {', '.join(sorted(unknown))}, expected some of {', '.join(CANDIDATES)}")
+
+    X, y, data_digest = load_dataset()
+    train, test = train_test_split(np.arange(len(X)), test_size=TEST_SIZE, random_state=SEED)
+    store = ModelStore(args.store)
+
+    active = store.serving()[1]["active"]
+    baseline = {"version": active, "metrics": evaluate(store.load(active), X[test], y[test])}
+    results = []
+    for name in names:
+        kind, params = CANDIDATES[name]
+        version = version_name(name, kind, params, data_digest)
+        predict, kernel = fit(kind, params, X[train], y[train])
+        kernel.source_digest = version.rsplit("-", 1)[1]
+        parity = float(np.max(np.abs(kernel.predict(X[test]) - predict(X[test]))))
+        if parity > PARITY_TOLERANCE:
+            sys.exit(f"{name}: compiled kernel differs from the sklearn model by {parity:.3e} kcal")
+        manifest = {
+            "version": version,
+            "candidate": name,
+            "kind": kind,
+            "params": params,
+            "data": {"digest": data_digest, "rows": len(X), "train_rows": len(train), "test_rows": len(test),
+                     "seed": SEED},
+            "metrics": evaluate(kernel, X[test], y[test]),
+            "nbytes": kernel.nbytes,
+        }
+        store.add(kernel, manifest)
+        results.append(manifest)
+
+    winner = pick_winner(results, args.max_row_us, args.max_call_us)
+    print(f"{'version':<32} {'MAE':>7} {'RMSE':>7} {'R2':>8} {'us/row':>8} {'us/call':>8}")
+    for result in [baseline] + results:
+        m = result["metrics"]
+        note = " (active)" if result is baseline else " <- winner" if result is winner else ""
+        print(f"{result['version']:<32} {m['mae']:>7.3f} {m['rmse']:>7.3f} {m['r2']:>8.5f} "
+              f"{m['row_us']:>8.2f} {m['call_us']:>8.1f}{note}")
+
+    if winner is None:
+        sys.exit(f"No candidate within {args.max_row_us}us/row and {args.max_call_us}us/call")
+    if args.activate:
+        if winner["metrics"]["mae"] <= baseline["metrics"]["mae"] - args.min_gain:
+            store.activate(winner["version"])
+            print(f"Activated {winner['version']}")
+        else:
+            print(f"Kept {active}: {winner['version']} does not gain {args.min_gain} kcal MAE")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
 
+from exercise_catalog import get_catalog, normalize_equipment
+from exercise_query import NO_EQUIPMENT
+from metrics import metrics
+from model_registry import registry
+from plan_cache import plan_cache, plan_key
+
+logger = logging.getLogger(__name__)
+
 def load_data(csv_path):
     """
     Load exercise data from a CSV file into a pandas DataFrame.
@@ -17,6 +30,13 @@ def load_data(csv_path):
         return pd.DataFrame()
     return df
 
+# Difficulty Level values (lowercased) accepted for each fitness level
+DIFFICULTY_LEVELS = {
+    'beginner': ['beginner', 'novice'],
+    'intermediate': ['beginner', 'intermediate'],
+    'advanced': ['intermediate', 'advanced'],
+}
+
 def filter_by_difficulty(df, fitness_level):
     """
     Filter exercises based on fitness level.
@@ -24,9 +44,9 @@ def filter_by_difficulty(df, fitness_level):
     Intermediate: include Beginner and Intermediate.
     Advanced: include Intermediate and Advanced.
     """
+    level = fitness_level.lower()
     if 'Difficulty Level' not in df.columns:
         return df
-    level = fitness_level.lower()
     # print(level)
     # if level == 'beginner':
     #     mask = df['Difficulty'].str.lower() == 'beginner'
@@ -56,34 +76,22 @@ def filter_by_equipment(df, equipment_list):
     - Primary Equipment is in user's list (required)
     - Secondary Equipment is either empty/none or also in user's list
     """
+    # Prepare cleaned equipment list
+    avail = set(eq.strip().lower() for eq in equipment_list)
+
     # Clean column names
     # df.columns = df.columns.str.strip()
 
     if 'Primary Equipment ' not in df.columns or 'Secondary Equipment' not in df.columns:
-        print("Missing equipment columns.")
+        logger.debug("Missing equipment columns.")
         return df
 
-    # Prepare cleaned equipment list
-    avail = set(eq.strip().lower() for eq in equipment_list)
-    print("available")
-
-    def equipment_ok(row):
-        primary = str(row.get('Primary Equipment ', '')).strip().lower()
-        secondary = str(row.get('Secondary Equipment', '')).strip().lower()
-
-        # Primary equipment must match
-        if primary not in avail:
-            return False
+    logger.debug("Available equipment: %s", avail)
 
-        # Accept if secondary is missing or also in available equipment
-        if secondary in ('', 'none', 'nan'):
-            return True
-        if secondary in avail:
-            return True
-
-        return False
-
-    mask = df.apply(equipment_ok, axis=1)
+    # Primary equipment must match; accept if secondary is missing or also available
+    primary = normalize_equipment(df['Primary Equipment '])
+    secondary = normalize_equipment(df['Secondary Equipment'])
+    mask = primary.isin(avail) & secondary.isin(avail | NO_EQUIPMENT)
     return df[mask].reset_index(drop=True)
 
 # def filter_by_injury(df, injury_zones):
@@ -185,6 +193,71 @@ GOAL_DETAILS = {
     }
 }
 
+# Muscle group mapping
+MUSCLE_MAP = {
+    'Full Body': ['Chest', 'Back', 'Shoulders', 'Triceps', 'Biceps', 'Quadriceps', 'Hamstrings', 'Glutes'],
+    'Upper Body': ['Chest', 'Back', 'Shoulders', 'Triceps', 'Biceps'],
+    'Lower Body': ['Quadriceps', 'Hamstrings', 'Glutes', 'Calves'],
+    'Push': ['Chest', 'Shoulders', 'Triceps'],
+    'Pull': ['Back', 'Biceps'],
+    'Legs': ['Quadriceps', 'Hamstrings', 'Glutes', 'Calves']
+}
+
+def goal_prescription(goal, experience):
+    """
+    (goal_key, sets, reps, rest, intensity) for a goal and experience level.
+    """
+    goal_key = goal.lower().replace(" ", "")
+    goal_data = GOAL_DETAILS.get(goal_key, GOAL_DETAILS["musclegain"])
+    logger.debug("goal key: %s, goal data: %s", goal_key, goal_data)
+
+    # Pick lower end for beginners, upper for advanced
+    sets = goal_data["sets"][0] if experience == "beginner" else  goal_data["sets"][1] if experience == "intermediate" else  goal_data["sets"][2]
+    reps = goal_data["reps"][0] if experience == "beginner" else goal_data["reps"][1] if experience == "intermediate" else goal_data["reps"][2]
+    logger.debug("sets: %s, experience: %s", sets, experience)
+    return goal_key, sets, reps, goal_data["rest"], goal_data["intensity"]
+
+@lru_cache(maxsize=4096)
+def selection_seed(experience, goal_key, day_label, muscle):
+    """
+    Deterministic sampling seed from key features, so plans are reproducible.
+    """
+    seed_input = f"{experience}_{goal_key}_{day_label}_{muscle}"
+    return int(hashlib.sha256(seed_input.encode()).hexdigest(), 16) % (10**8)
+
+_random_states = threading.local()
+
+@lru_cache(maxsize=65536)
+def sample_position(seed, n):
+    """
+    Position `DataFrame.sample(1, random_state=seed)` picks from an n-row frame: pandas
+    draws `RandomState(seed).choice(n, 1, replace=False)`, which is the first entry of
+    `RandomState(seed).permutation(n)`. Reseeding a per-thread RandomState gives the
+    same stream as constructing a new one, at a fraction of the cost.
+    """
+    return int(_permutation(seed, n)[0])
+
+@lru_cache(maxsize=16384)
+def rotation_positions(seed, n, count):
+    """
+    The first `count` positions of `RandomState(seed).permutation(n)` (all n if fewer):
+    the sample_position pick followed by distinct alternatives, for rotating exercises.
+    """
+    return tuple(_permutation(seed, n)[:count].tolist())
+
+def _permutation(seed, n):
+    random_state = getattr(_random_states, 'value', None)
+    if random_state is None:
+        random_state = _random_states.value = np.random.RandomState()
+    random_state.seed(seed)
+    return random_state.permutation(n)
+
+def pick_row(candidates, seed):
+    """
+    The element the seeded DataFrame.sample(1) would return from a frame whose rows are `candidates`.
+    """
+    return candidates[sample_position(seed, len(candidates))]
+
 def assemble_workout_plan(df, split_plan, goal, experience="beginner"):
     """
     Assemble a workout plan with exercises and set/rep/rest/intensity based on goal and experience.
@@ -199,43 +272,19 @@ def assemble_workout_plan(df, split_plan, goal, experience="beginner"):
         dict: Plan with days as keys, and list of exercises with full prescription as values.
     """
     plan = {}
-    goal_key = goal.lower().replace(" ", "")
-    goal_data = GOAL_DETAILS.get(goal_key, GOAL_DETAILS["musclegain"])
-    print(f'goal key : {goal_key}, goal data = {goal_data}')
-
-    # Pick lower end for beginners, upper for advanced
-    sets = goal_data["sets"][0] if experience == "beginner" else  goal_data["sets"][1] if experience == "intermediate" else  goal_data["sets"][2]
-    reps = goal_data["reps"][0] if experience == "beginner" else goal_data["reps"][1] if experience == "intermediate" else goal_data["reps"][2]
-    rest = goal_data["rest"]
-    intensity = goal_data["intensity"]
-    print(f'sets : {sets} and experience : {experience}')
-
-    # Muscle group mapping
-    muscle_map = {
-        'Full Body': ['Chest', 'Back', 'Shoulders', 'Triceps', 'Biceps', 'Quadriceps', 'Hamstrings', 'Glutes'],
-        'Upper Body': ['Chest', 'Back', 'Shoulders', 'Triceps', 'Biceps'],
-        'Lower Body': ['Quadriceps', 'Hamstrings', 'Glutes', 'Calves'],
-        'Push': ['Chest', 'Shoulders', 'Triceps'],
-        'Pull': ['Back', 'Biceps'],
-        'Legs': ['Quadriceps', 'Hamstrings', 'Glutes', 'Calves']
-    }
+    goal_key, sets, reps, rest, intensity = goal_prescription(goal, experience)
 
     df.columns = df.columns.str.strip()
 
     for i, (day_label, day_type_list) in enumerate(split_plan.items(), start=1):
         day_type = day_type_list[0] if isinstance(day_type_list, list) else day_type_list
-        target_muscles = muscle_map.get(day_type, [])
+        target_muscles = MUSCLE_MAP.get(day_type, [])
         selected_exercises = []
 
         for muscle in target_muscles:
             subset = df[df['Target Muscle Group'].str.contains(muscle, case=False, na=False)]
             if not subset.empty:
-                import hashlib
-
-                # Generate a deterministic seed from key features
-                seed_input = f"{experience}_{goal_key}_{day_label}_{muscle}"
-                seed = int(hashlib.sha256(seed_input.encode()).hexdigest(), 16) % (10**8)
-
+                seed = selection_seed(experience, goal_key, day_label, muscle)
                 choice = subset.sample(1, random_state=seed).iloc[0]
 
                 selected_exercises.append({
@@ -251,6 +300,53 @@ def assemble_workout_plan(df, split_plan, goal, experience="beginner"):
 
     return plan
 
+def assemble_plan_from_bits(catalog, bits, split_plan, goal, experience="beginner"):
+    """
+    Same plan as assemble_workout_plan, for candidates given as a catalog bitset (see
+    exercise_query.py).
+
+    Each muscle's candidates are the AND with the muscle's bitset (computed once per
+    muscle, not per day), and the pick reproduces the seeded DataFrame.sample choice, so
+    no intermediate DataFrames are built.
+    """
+    plan = {}
+    goal_key, sets, reps, rest, intensity = goal_prescription(goal, experience)
+    index = catalog.index
+    candidates = {}
+
+    for i, (day_label, day_type_list) in enumerate(split_plan.items(), start=1):
+        day_type = day_type_list[0] if isinstance(day_type_list, list) else day_type_list
+        selected_exercises = []
+
+        for muscle in MUSCLE_MAP.get(day_type, []):
+            if muscle not in candidates:
+                candidates[muscle] = index.positions(bits & index.containing("target_muscle", muscle))
+            if len(candidates[muscle]):
+                row = pick_row(candidates[muscle], selection_seed(experience, goal_key, day_label, muscle))
+
+                selected_exercises.append({
+                    "exercise_name": catalog.exercise_names[row],
+                    "primary_muscle": muscle,
+                    "sets": sets,
+                    "reps": reps,
+                    "rest": rest,
+                    "intensity": intensity
+                })
+
+        plan[f'Day {i} - {day_type}'] = selected_exercises
+
+    return plan
+
+def weekly_volume(plan):
+    """
+    Training days, exercises and working sets per week of an assembled plan.
+    """
+    days = [exercises for exercises in plan.values() if exercises]
+    return {
+        "training_days": len(days),
+        "exercises": sum(len(exercises) for exercises in days),
+        "sets": sum(exercise["sets"] for exercises in days for exercise in exercises),
+    }
 
 
 
@@ -299,7 +395,7 @@ primary_exercise_classification = {
     # "flexibility": ["Mobility", "Animal Flow"]
 }
 
-def primary_classification(df, goal):
+def goal_classifications(goal):
     # Step 1: Clean the goal string
     cleaned_goal = goal.lower().replace(" ", "")
 
@@ -309,13 +405,101 @@ def primary_classification(df, goal):
 
     # Step 3: Get the allowed classifications for the goal
     allowed_classifications = primary_exercise_classification[cleaned_goal]
-    print(allowed_classifications)
+    logger.debug("Allowed classifications: %s", allowed_classifications)
+    return allowed_classifications
+
+def primary_classification(df, goal):
+    allowed_classifications = goal_classifications(goal)
 
     # Step 4: Filter the DataFrame
     filtered_df = df[df["Primary Exercise Classification"].isin(allowed_classifications)].reset_index(drop=True)
 
     return filtered_df
 
+def candidate_bits(catalog, fitness_level, goal, equipment_available, injury_zones=()):
+    """
+    Catalog bitset (see exercise_query.py) of the candidate exercises for a fitness
+    level, goal and equipment list, without those that load one of `injury_zones`.
+    The difficulty, equipment and classification filters, as one query; equipment
+    None leaves equipment unrestricted.
+    """
+    index = catalog.index
+    levels = DIFFICULTY_LEVELS.get(fitness_level.lower(), DIFFICULTY_LEVELS['advanced'])
+    # Classifications compare exactly as stored, like primary_classification: the CSV's
+    # padded 'Olympic Weightlifting ' has never been a goal classification
+    return (index.match(difficulty=levels, equipment=equipment_available, exclude_injuries=injury_zones)
+            & index.any_of("classification", goal_classifications(goal), exact=True))
+
+def query_candidates(catalog, fitness_level, goal, equipment_available, injury_zones=()):
+    """
+    candidate_bits, timed and counted as the exercise_query stage.
+    """
+    with metrics.stage("exercise_query"):
+        bits = candidate_bits(catalog, fitness_level, goal, equipment_available, injury_zones)
+    metrics.rows("exercise_query", catalog.index.count(bits))
+    return bits
+
+def build_workout_plan(catalog, fitness_level, goal, availability, equipment_available, injury_zones=(), bits=None):
+    """
+    Query the catalog for the candidates and assemble the plan dict (uncached); `bits`
+    passes the candidates already queried for the same request at another availability.
+    """
+    if bits is None:
+        bits = query_candidates(catalog, fitness_level, goal, equipment_available, injury_zones)
+
+    # # Generate workout split plan
+    split_plan = generate_plan_split_simple(availability)
+    logger.debug("Split plan: %s", split_plan)
+
+    # # Assemble final workout plan
+    with metrics.stage("assemble_workout_plan"):
+        workout_plan = assemble_plan_from_bits(catalog, bits, split_plan, goal, fitness_level.lower())
+    return workout_plan
+
+def get_workout_plan(fitness_level, goal, availability, equipment_available, injury_zones=()):
+    """
+    Plan for a request, served from the plan cache or the precomputed plan table when
+    possible, otherwise built and cached. Table hits are decoded from the shared mapping
+    on every request rather than cached, so per-worker memory does not grow with them.
+    """
+    return get_workout_plans(fitness_level, goal, [availability], equipment_available, injury_zones)[availability]
+
+def get_workout_plans(fitness_level, goal, availabilities, equipment_available, injury_zones=()):
+    """
+    {availability: plan} for requests differing only in availability, each served like
+    get_workout_plan; the plans that have to be built share one catalog query.
+    """
+    # Shared exercise catalog (exercise.csv parsed and indexed once per process)
+    with metrics.stage("load_catalog"):
+        catalog = get_catalog()
+    bits = None
+
+    def build(availability):
+        nonlocal bits
+        if bits is None:
+            bits = query_candidates(catalog, fitness_level, goal, equipment_available, injury_zones)
+        return build_workout_plan(catalog, fitness_level, goal, availability, equipment_available, injury_zones,
+                                  bits)
+
+    plans = {}
+    for availability in availabilities:
+        if availability in plans:
+            continue
+        key = plan_key(fitness_level, goal, availability, equipment_available, catalog.equipment_vocabulary,
+                       injury_zones)
+        with metrics.stage("plan_cache_lookup"):
+            workout_plan = plan_cache.get(key, catalog.checksum)
+        if workout_plan is None:
+            lookup = registry.get("plan_lookup")
+            if lookup is not None:
+                with metrics.stage("plan_lookup_file"):
+                    workout_plan = lookup.get(key, catalog.checksum)
+            if workout_plan is None:
+                # Built once however many requests (or workers) miss it together
+                workout_plan = plan_cache.get_or_build(key, catalog.checksum, lambda: build(availability))
+        plans[availability] = workout_plan
+    return plans
+
 def main(data):
     # # ====== Hardcoded Inputs for Testing ======
     # fitness_level = "Beginner"
@@ -330,47 +514,10 @@ def main(data):
     # bmi = "22.9"
 
     equipment_available = [eq.strip() for eq in data.equipment_str.split(',') if eq.strip()]
-    print(equipment_available)
-    fitness_level = data.fitness_level.lower()
-    # injury_zones = [iz.strip() for iz in data.injury_str.split(',') if iz.strip()]
-
-    # Load dataset (e.g., 'exercise.csv')
-    df = load_data('exercise.csv')
-    # print(df.head())
-
-     # Apply filters in sequence
-    filtered = filter_by_difficulty(df, data.fitness_level)
-    # print(filtered['Difficulty Level'].value_counts(dropna=False))
-    filtered = filter_by_equipment(filtered, equipment_available)
-    # print(filtered['Primary Equipment '].value_counts(dropna=False))
-    # print(filtered['Secondary Equipment'].value_counts(dropna=False))
-    # filtered = filter_by_injury(filtered, injury_zones)
-    # print(filtered.shape)
-    # filtered = filter_by_program(filtered, goal)
-    # print(filtered.shape)
-    filtered = primary_classification(filtered, data.goal)
-
-    # # Generate workout split plan
-    split_plan = generate_plan_split_simple(data.availability)
-    print("Split plan:",split_plan)
-
-    # # Assemble final workout plan
-    workout_plan = assemble_workout_plan(filtered, split_plan, data.goal, fitness_level)
-
-    # Print the plan dictionary
-    print("\nFinal Workout Plan (Day-by-day):")
-    print(workout_plan)
-    print(filtered["Primary Exercise Classification"].value_counts())
-
-    import json
-
-    # Convert workout plan to JSON
-    workout_json = json.dumps(workout_plan, indent=4)
-
-    # Print or return to frontend
-    print("\nWorkout Plan in JSON format:")
-    print(workout_json)
-
-    # Optionally return from main or send as API response
-    return workout_json
+    logger.debug("Equipment available: %s", equipment_available)
+    # Optional: requests built before injury zones were supported have no injury_str
+    injury_str = getattr(data, "injury_str", None) or ""
+    injury_zones = [iz.strip() for iz in injury_str.split(',') if iz.strip()]
 
+    # Plan dict ({'Day 1 - Push': [exercise, ...], ...}); serialized once by the caller
+    return get_workout_plan(data.fitness_level, data.goal, data.availability, equipment_available, injury_zones)
@@ -0,0 +1,273 @@
+"""
+Multi-week periodized workout programs built on the /workout_planner selection.
+
+Weeks are grouped into 4-week mesocycles (base, build, peak, deload):
+- sets and reps come from GOAL_DETAILS, starting at the experience level's entry and
+  moving one entry up per completed mesocycle (capped at the advanced entry);
+- intensity climbs through the goal's %1RM range within a mesocycle and drops back
+  to the bottom of it, with one set fewer, in the deload week;
+- exercises rotate per mesocycle: each (day, muscle) slot walks the same seeded
+  permutation of its candidates that /workout_planner takes the first entry of, so
+  the first mesocycle uses the single-week plan's exercises and later ones use
+  distinct alternatives from the same pool.
+
+A week's prescription depends only on its number, and an exercise slot only on its
+mesocycle and candidates, so the filtered pool is computed once per program and each
+(mesocycle, day, muscle) selection once, however many weeks are requested.
+WorkoutProgram.update() keeps everything a parameter change does not affect: extra
+weeks only build the new weeks, an extra day only that day, and new equipment only
+the days of muscles whose candidates changed.
+
+Usage (from the repository root):
+    python workout_program.py --level intermediate --goal "muscle gain" --days 4 \\
+        --equipment "Barbell,Dumbbell" --weeks 12
+"""
+import argparse
+import copy
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from exercise_catalog import get_catalog
+from metrics import metrics
+from plan_cache import plan_key
+from workout_planner import (GOAL_DETAILS, MUSCLE_MAP, candidate_bits, generate_plan_split_simple, rotation_positions,
+                             selection_seed)
+
+# %1RM range of each goal, matching the GOAL_DETAILS intensity text
+INTENSITY_RANGES = {
+    "strength": (85, 95),
+    "musclegain": (67, 85),
+    "fatloss": (67, 75),
+    "endurance": (50, 67),
+}
+
+# (phase, position within the goal's intensity range) of each week of a mesocycle
+MESOCYCLE = [("base", 0.0), ("build", 0.5), ("peak", 1.0), ("deload", 0.0)]
+
+# GOAL_DETAILS entry each experience level starts from
+EXPERIENCE_TIERS = {"beginner": 0, "intermediate": 1, "advanced": 2}
+
+MAX_WEEKS = 52
+
+
+def week_prescription(goal_key, experience, week):
+    """
+    (phase, sets, reps, rest, intensity) for a 1-based week of a program.
+    """
+    goal_data = GOAL_DETAILS.get(goal_key, GOAL_DETAILS["musclegain"])
+    low, high = INTENSITY_RANGES.get(goal_key, INTENSITY_RANGES["musclegain"])
+    mesocycle, offset = divmod(week - 1, len(MESOCYCLE))
+    phase, position = MESOCYCLE[offset]
+
+    tier = min(EXPERIENCE_TIERS.get(experience, 2) + mesocycle, 2)
+    sets, reps = goal_data["sets"][tier], goal_data["reps"][tier]
+    if phase == "deload":
+        sets = max(sets - 1, 2)
+    return phase, sets, reps, goal_data["rest"], f"{round(low + position * (high - low))}% 1RM"
+
+
+class WorkoutProgram:
+    """
+    An N-week program for one profile, holding the pieces it is assembled from so that
+    update() can reuse them.
+    """
+
+    def __init__(self, catalog, fitness_level, goal, availability, equipment_available, weeks=4, injury_zones=()):
+        self.catalog = catalog
+        self.fitness_level = fitness_level
+        self.goal = goal
+        self.injury_zones = tuple(injury_zones)
+        self.availability = int(availability)
+        self.equipment_available = list(equipment_available)
+        self.weeks = int(weeks)
+        if not 1 <= self.weeks <= MAX_WEEKS:
+            raise ValueError(f"weeks must be between 1 and {MAX_WEEKS}")
+        self.experience = fitness_level.lower()
+        self.goal_key = goal.lower().replace(" ", "")
+        self.split = generate_plan_split_simple(self.availability)
+        self.catalog_version = catalog.version
+        self.equipment_key = self._equipment_key(self.equipment_available)
+        # Work done by this object, for benchmarks and debugging
+        self.stats = {"pool_builds": 0, "selections": 0, "days_built": 0}
+        # The difficulty, goal and injury constraints do not depend on equipment, so they run once
+        self._base_bits = candidate_bits(catalog, fitness_level, goal, None, self.injury_zones)
+        self._bits = self._filter_pool()
+        # muscle -> candidate catalog positions
+        self._candidates = {}
+        # (mesocycle, day_label, muscle) -> exercise name, or None without candidates
+        self._selections = {}
+        # (week, day_label, day_type) -> [exercise dict, ...]
+        self._days = {}
+
+    def _equipment_key(self, equipment_available):
+        return plan_key(self.fitness_level, self.goal, self.availability, equipment_available,
+                        self.catalog.equipment_vocabulary)[3]
+
+    def _filter_pool(self):
+        """
+        The workout_planner.candidate_bits candidates, from the equipment-independent ones.
+        """
+        self.stats["pool_builds"] += 1
+        return self._base_bits & self.catalog.index.usable_with(self.equipment_available)
+
+    def _candidate_rows(self, muscle):
+        candidates = self._candidates.get(muscle)
+        if candidates is None:
+            index = self.catalog.index
+            candidates = self._candidates[muscle] = index.positions(self._bits
+                                                                    & index.containing("target_muscle", muscle))
+        return candidates
+
+    def _select(self, mesocycle, day_label, muscle):
+        key = (mesocycle, day_label, muscle)
+        if key not in self._selections:
+            self.stats["selections"] += 1
+            candidates = self._candidate_rows(muscle)
+            name = None
+            if len(candidates):
+                seed = selection_seed(self.experience, self.goal_key, day_label, muscle)
+                # Enough of the permutation for a year of mesocycles; shorter pools repeat
+                positions = rotation_positions(seed, len(candidates), -(-MAX_WEEKS // len(MESOCYCLE)))
+                name = self.catalog.exercise_names[candidates[positions[mesocycle % len(positions)]]]
+            self._selections[key] = name
+        return self._selections[key]
+
+    def _build_day(self, week, day_label, day_type):
+        self.stats["days_built"] += 1
+        _, sets, reps, rest, intensity = week_prescription(self.goal_key, self.experience, week)
+        mesocycle = (week - 1) // len(MESOCYCLE)
+        exercises = []
+        for muscle in MUSCLE_MAP.get(day_type, []):
+            name = self._select(mesocycle, day_label, muscle)
+            if name is not None:
+                exercises.append({
+                    "exercise_name": name,
+                    "primary_muscle": muscle,
+                    "sets": sets,
+                    "reps": reps,
+                    "rest": rest,
+                    "intensity": intensity
+                })
+        return exercises
+
+    def plan(self):
+        """
+        [{"week": 1, "phase": "base", "days": {"Day 1 - Push": [exercise, ...], ...}}, ...]
+        """
+        program = []
+        for week in range(1, self.weeks + 1):
+            days = {}
+            for i, (day_label, day_type_list) in enumerate(self.split.items(), start=1):
+                day_type = day_type_list[0]
+                key = (week, day_label, day_type)
+                exercises = self._days.get(key)
+                if exercises is None:
+                    exercises = self._days[key] = self._build_day(week, day_label, day_type)
+                days[f'Day {i} - {day_type}'] = exercises
+            program.append({"week": week, "phase": week_prescription(self.goal_key, self.experience, week)[0],
+                            "days": days})
+        return program
+
+    def update(self, availability=None, equipment_available=None, weeks=None):
+        """
+        The program with some parameters changed, sharing every selection and day the
+        change leaves as it was. A different fitness level or goal changes every
+        selection; build a new program for those (or for other injury zones).
+        """
+        if self.catalog.version != self.catalog_version:
+            # The catalog was reloaded: nothing carries over
+            return WorkoutProgram(self.catalog, self.fitness_level, self.goal,
+                                  self.availability if availability is None else availability,
+                                  self.equipment_available if equipment_available is None else equipment_available,
+                                  self.weeks if weeks is None else weeks, self.injury_zones)
+
+        program = copy.copy(self)
+        program.stats = {"pool_builds": 0, "selections": 0, "days_built": 0}
+        if weeks is not None:
+            program.weeks = int(weeks)
+            if not 1 <= program.weeks <= MAX_WEEKS:
+                raise ValueError(f"weeks must be between 1 and {MAX_WEEKS}")
+        if availability is not None:
+            program.availability = int(availability)
+            program.split = generate_plan_split_simple(program.availability)
+
+        changed = set()
+        program._candidates = dict(self._candidates)
+        if equipment_available is not None:
+            program.equipment_available = list(equipment_available)
+            program.equipment_key = program._equipment_key(program.equipment_available)
+            if program.equipment_key != self.equipment_key:
+                program._bits = program._filter_pool()
+                program._candidates = {}
+                # Muscles not planned yet have nothing to invalidate
+                for muscle, candidates in self._candidates.items():
+                    if not np.array_equal(program._candidate_rows(muscle), candidates):
+                        changed.add(muscle)
+
+        program._selections = {key: name for key, name in self._selections.items() if key[2] not in changed}
+        program._days = {(week, day_label, day_type): exercises
+                         for (week, day_label, day_type), exercises in self._days.items()
+                         if week <= program.weeks and program.split.get(day_label, [None])[0] == day_type
+                         and changed.isdisjoint(MUSCLE_MAP.get(day_type, []))}
+        return program
+
+
+class RecentPrograms:
+    """
+    The last program built for each (fitness level, goal, injury zones), so that a
+    follow-up request from the same profile with another day, piece of equipment or
+    program length is answered by WorkoutProgram.update(). Stored programs are fully built and never
+    modified afterwards, so threads can share them.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_plan(self, fitness_level, goal, availability, equipment_available, weeks, injury_zones=()):
+        with metrics.stage("load_catalog"):
+            catalog = get_catalog()
+        injury_zones = tuple(sorted({zone.strip().lower() for zone in injury_zones} - {""}))
+        key = (fitness_level.lower(), goal.lower().replace(" ", ""), injury_zones)
+        with self._lock:
+            previous = self._entries.get(key)
+        with metrics.stage("workout_program"):
+            if previous is None:
+                program = WorkoutProgram(catalog, fitness_level, goal, availability, equipment_available, weeks,
+                                         injury_zones)
+            else:
+                program = previous.update(availability, equipment_available, weeks)
+            plan = program.plan()
+        with self._lock:
+            self._entries[key] = program
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return plan
+
+
+recent_programs = RecentPrograms()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a periodized multi-week workout program as JSON.")
+    parser.add_argument("--level", default="beginner")
+    parser.add_argument("--goal", default="muscle gain")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--equipment", default="Bodyweight,Dumbbell")
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--injuries", default="", help='comma-separated injury zones to avoid, e.g. "Shoulder,Back"')
+    args = parser.parse_args()
+
+    equipment = [eq.strip() for eq in args.equipment.split(",") if eq.strip()]
+    injuries = [zone.strip() for zone in args.injuries.split(",") if zone.strip()]
+    program = WorkoutProgram(get_catalog(), args.level, args.goal, args.days, equipment, args.weeks, injuries)
+    print(json.dumps(program.plan(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()